@@ -0,0 +1,365 @@
+"""In-process ARP on a raw AF_PACKET socket (Linux, requires root).
+
+Frame helpers plus an ARP sweep scanner that replaces per-address
+`ping`/`arping` subprocesses: who-has requests for a whole range are sent from
+one socket and replies are collected in a single receive window. ArpAnnouncer
+likewise replaces `arping -U` with gratuitous ARP frames sent on a schedule.
+"""
+
+import errno
+import fcntl
+import heapq
+import ipaddress
+import itertools
+import logging
+import random
+import select
+import socket
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger("arpx.arp")
+
+ETH_P_ARP = 0x0806
+ARP_REQUEST = 1
+ARP_REPLY = 2
+BROADCAST_MAC = b"\xff" * 6
+ZERO_MAC = b"\x00" * 6
+
+# ioctl request numbers from <linux/sockios.h>
+SIOCGIFADDR = 0x8915
+SIOCGIFHWADDR = 0x8927
+
+_ETH_HEADER = struct.Struct("!6s6sH")
+# htype, ptype, hlen, plen, op, sha, spa, tha, tpa
+_ARP_BODY = struct.Struct("!HHBBH6s4s6s4s")
+ARP_FRAME_LEN = _ETH_HEADER.size + _ARP_BODY.size
+
+
+@dataclass
+class ArpPacket:
+    op: int
+    sender_mac: bytes
+    sender_ip: str
+    target_mac: bytes
+    target_ip: str
+    eth_src: bytes
+    eth_dst: bytes
+
+
+def mac_to_bytes(mac: str) -> bytes:
+    return bytes(int(part, 16) for part in mac.split(":"))
+
+
+def bytes_to_mac(raw: bytes) -> str:
+    return ":".join(f"{b:02x}" for b in raw)
+
+
+def build_arp_frame(
+    op: int,
+    sender_mac: bytes,
+    sender_ip: str,
+    target_mac: bytes,
+    target_ip: str,
+    eth_dst: bytes = BROADCAST_MAC,
+) -> bytes:
+    """Build an Ethernet II frame carrying an IPv4-over-Ethernet ARP packet."""
+    return _ETH_HEADER.pack(eth_dst, sender_mac, ETH_P_ARP) + _ARP_BODY.pack(
+        1, 0x0800, 6, 4, op,
+        sender_mac, socket.inet_aton(sender_ip),
+        target_mac, socket.inet_aton(target_ip),
+    )
+
+
+def build_arp_request(sender_mac: bytes, sender_ip: str, target_ip: str) -> bytes:
+    """Broadcast who-has target_ip."""
+    return build_arp_frame(ARP_REQUEST, sender_mac, sender_ip, ZERO_MAC, target_ip)
+
+
+def build_gratuitous_arp(sender_mac: bytes, ip: str) -> bytes:
+    """Broadcast announcement of ip (sender and target IP both ip), as sent by `arping -U`."""
+    return build_arp_frame(ARP_REQUEST, sender_mac, ip, ZERO_MAC, ip)
+
+
+def parse_arp_frame(frame: bytes) -> Optional[ArpPacket]:
+    """Parse an Ethernet ARP frame; None if it is not IPv4-over-Ethernet ARP."""
+    if len(frame) < ARP_FRAME_LEN:
+        return None
+    eth_dst, eth_src, ethertype = _ETH_HEADER.unpack_from(frame)
+    if ethertype != ETH_P_ARP:
+        return None
+    htype, ptype, hlen, plen, op, sha, spa, tha, tpa = _ARP_BODY.unpack_from(frame, _ETH_HEADER.size)
+    if htype != 1 or ptype != 0x0800 or hlen != 6 or plen != 4:
+        return None
+    return ArpPacket(op, sha, socket.inet_ntoa(spa), tha, socket.inet_ntoa(tpa), eth_src, eth_dst)
+
+
+def _ifreq_ioctl(interface: str, request: int) -> bytes:
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        ifreq = struct.pack("256s", interface.encode()[:15])
+        return fcntl.ioctl(s.fileno(), request, ifreq)
+
+
+def interface_mac(interface: str) -> bytes:
+    """Hardware address of interface (SIOCGIFHWADDR), without spawning `ip`."""
+    return _ifreq_ioctl(interface, SIOCGIFHWADDR)[18:24]
+
+
+def interface_ipv4(interface: str) -> Optional[str]:
+    """Primary IPv4 address of interface (SIOCGIFADDR), or None if it has none."""
+    try:
+        return socket.inet_ntoa(_ifreq_ioctl(interface, SIOCGIFADDR)[20:24])
+    except OSError:
+        return None
+
+
+def is_local_address(ip: str) -> bool:
+    """True if ip is assigned to this host (a raw ARP sweep cannot see our own addresses)."""
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        try:
+            s.bind((ip, 0))
+            return True
+        except OSError:
+            return False
+
+
+def open_arp_socket(interface: str) -> socket.socket:
+    sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ARP))
+    sock.bind((interface, ETH_P_ARP))
+    return sock
+
+
+class ArpScanner:
+    """Sweep a range of IPv4 addresses with ARP from one raw socket.
+
+    All who-has requests are sent back to back (`rounds` times), then replies
+    are collected until `window` seconds have passed. Addresses that answered
+    are in use.
+
+    When the transmit queue is full (ENOBUFS/EAGAIN, e.g. on a /16 sweep) the
+    scanner waits `backoff` seconds and retries the frame once; frames that
+    still fail are counted in send_errors and the sweep goes on.
+    """
+
+    backoff = 0.005
+
+    def __init__(self, interface: str, sender_mac: Optional[bytes] = None, sender_ip: Optional[str] = None):
+        self.interface = interface
+        self.sender_mac = sender_mac
+        self.sender_ip = sender_ip
+        self.frames_sent = 0
+        self.send_errors = 0
+
+    def _open_socket(self) -> socket.socket:
+        return open_arp_socket(self.interface)
+
+    def _send(self, sock: socket.socket, frame: bytes) -> bool:
+        for attempt in (0, 1):
+            try:
+                sock.send(frame)
+                self.frames_sent += 1
+                return True
+            except OSError as e:
+                if attempt == 0 and e.errno in (errno.ENOBUFS, errno.EAGAIN):
+                    # let the queue drain
+                    time.sleep(self.backoff)
+                    continue
+                self.send_errors += 1
+                logger.debug("ARP request send failed on %s: %s", self.interface, e)
+                return False
+        return False
+
+    def scan(self, ips: Iterable[str], window: float = 1.0, rounds: int = 2) -> Set[str]:
+        """Return the subset of ips that answered an ARP request."""
+        targets = {str(ip) for ip in ips}
+        if not targets:
+            return set()
+        sender_mac = self.sender_mac or interface_mac(self.interface)
+        # 0.0.0.0 makes the request an RFC 5227 probe if the interface has no address
+        sender_ip = self.sender_ip or interface_ipv4(self.interface) or "0.0.0.0"
+        used: Set[str] = set()
+        with self._open_socket() as sock:
+            frames = [build_arp_request(sender_mac, sender_ip, ip) for ip in sorted(targets)]
+            errors = self.send_errors
+            for _ in range(max(1, rounds)):
+                for frame in frames:
+                    self._send(sock, frame)
+            if self.send_errors > errors:
+                logger.warning(
+                    "ARP sweep on %s: %d request(s) could not be sent", self.interface, self.send_errors - errors
+                )
+            deadline = time.monotonic() + window
+            while len(used) < len(targets):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                ready, _w, _x = select.select([sock], [], [], remaining)
+                if not ready:
+                    break
+                pkt = parse_arp_frame(sock.recv(2048))
+                if pkt is None or pkt.sender_mac == sender_mac:
+                    continue
+                if pkt.sender_ip in targets:
+                    used.add(pkt.sender_ip)
+        logger.debug("ARP sweep on %s: %d/%d address(es) answered", self.interface, len(used), len(targets))
+        return used
+
+    def scan_network(self, network: ipaddress.IPv4Network, window: float = 1.0) -> bytearray:
+        """Return a used/free bitmap for all host addresses of network.
+
+        Bit i (LSB first) of the result is set when host number i, counted from
+        the first host address, answered.
+        """
+        hosts: List[str] = [str(ip) for ip in network.hosts()]
+        used = self.scan(hosts, window=window)
+        bitmap = bytearray((len(hosts) + 7) // 8)
+        for i, ip in enumerate(hosts):
+            if ip in used:
+                bitmap[i >> 3] |= 1 << (i & 7)
+        return bitmap
+
+
+class ArpAnnouncer:
+    """Keep neighbours' ARP caches fresh for many addresses from one raw socket.
+
+    add() announces new addresses at once and again `count - 1` times,
+    `spacing` seconds apart (what `arping -U -c 3` does), then re-announces
+    each one with a single frame every `interval` seconds +/- `jitter` (a
+    fraction of interval) so that hundreds of aliases do not all go out in the
+    same burst. Everything runs on one scheduler thread; frames_sent /
+    send_errors / announcements count the work done.
+    """
+
+    def __init__(
+        self,
+        interface: str,
+        sender_mac: Optional[bytes] = None,
+        interval: float = 30.0,
+        jitter: float = 0.2,
+        count: int = 3,
+        spacing: float = 1.0,
+    ):
+        self.interface = interface
+        self.sender_mac = sender_mac
+        self.interval = interval
+        self.jitter = jitter
+        self.count = max(1, count)
+        self.spacing = spacing
+        self.frames_sent = 0
+        self.send_errors = 0
+        self.announcements = 0
+        # ip -> generation; heap entries of a removed/re-added address are skipped.
+        # Generations come from one ever-increasing counter, so a re-added
+        # address never matches a heap entry left from before its remove().
+        self._generations = itertools.count(1)
+        self._addresses: Dict[str, int] = {}
+        self._frames: Dict[str, bytes] = {}
+        self._heap: List[Tuple[float, int, str, int, bool]] = []  # (due, generation, ip, frames left, new round)
+        self._cond = threading.Condition()
+        self._stop = False
+        self._sock: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def _open_socket(self) -> socket.socket:
+        return open_arp_socket(self.interface)
+
+    def _next_interval(self) -> float:
+        return self.interval * (1.0 + random.uniform(-self.jitter, self.jitter))
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        if self.sender_mac is None:
+            self.sender_mac = interface_mac(self.interface)
+        self._sock = self._open_socket()
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name="arpx-arp-announcer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def add(self, ips: Iterable[str]) -> None:
+        """Announce ips now and keep re-announcing them until remove()."""
+        now = time.monotonic()
+        with self._cond:
+            for ip in ips:
+                gen = next(self._generations)
+                self._addresses[ip] = gen
+                heapq.heappush(self._heap, (now, gen, ip, self.count, True))
+            self._cond.notify()
+
+    def remove(self, ips: Iterable[str]) -> None:
+        with self._cond:
+            for ip in ips:
+                self._addresses.pop(ip, None)
+                self._frames.pop(ip, None)
+
+    @property
+    def addresses(self) -> List[str]:
+        with self._cond:
+            return list(self._addresses)
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                "addresses": len(self._addresses),
+                "frames_sent": self.frames_sent,
+                "send_errors": self.send_errors,
+                "announcements": self.announcements,
+            }
+
+    def _due(self) -> List[bytes]:
+        """Pop entries that are due, reschedule them and return their frames. Caller holds _cond."""
+        now = time.monotonic()
+        frames: List[bytes] = []
+        while self._heap and self._heap[0][0] <= now:
+            _due, gen, ip, left, new_round = heapq.heappop(self._heap)
+            if self._addresses.get(ip) != gen:
+                continue
+            frame = self._frames.get(ip)
+            if frame is None:
+                # built on first use: sender_mac is only known once start() ran
+                frame = self._frames[ip] = build_gratuitous_arp(self.sender_mac, ip)
+            frames.append(frame)
+            if new_round:
+                self.announcements += 1
+            if left > 1:
+                heapq.heappush(self._heap, (now + self.spacing, gen, ip, left - 1, False))
+            else:
+                heapq.heappush(self._heap, (now + self._next_interval(), gen, ip, 1, True))
+        return frames
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._stop:
+                    timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                    if timeout is not None and timeout <= 0:
+                        break
+                    self._cond.wait(timeout)
+                if self._stop:
+                    return
+                frames = self._due()
+            sent = errors = 0
+            for frame in frames:
+                try:
+                    self._sock.send(frame)
+                    sent += 1
+                except OSError as e:
+                    errors += 1
+                    logger.debug("Gratuitous ARP send failed on %s: %s", self.interface, e)
+            with self._cond:
+                self.frames_sent += sent
+                self.send_errors += errors
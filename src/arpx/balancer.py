@@ -0,0 +1,233 @@
+"""Upstream groups: spread forwarded connections over several replicas.
+
+An UpstreamGroup picks a target per connection with one of POLICIES and
+marks a target down for fail_timeout seconds when connecting to it fails
+(passive health checking); the connection is then retried on the next
+target. Forwarders and terminators accept a group in place of a single
+target. Targets that fail active health checks (arpx.health) are not
+chosen at all.
+"""
+
+import asyncio
+import bisect
+import hashlib
+import logging
+import socket
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from .health import HealthChecker
+
+logger = logging.getLogger("arpx.balancer")
+
+POLICIES = ("round-robin", "least-conn", "hash")
+
+
+class Upstream:
+    """One target of a group and its connection/health counters."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.active = 0
+        self.total = 0
+        self.failures = 0
+        self.down_until = 0.0
+        # maintained by arpx.health.HealthChecker
+        self.healthy = True
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self.host, self.port
+
+    def __repr__(self) -> str:
+        return f"Upstream({self.host}:{self.port})"
+
+
+class NoHealthyUpstream(ConnectionError):
+    """Every target of a group failed its active health checks."""
+
+
+class UpstreamGroup:
+    """Targets sharing one listener, chosen per connection by `policy`.
+
+    round-robin rotates through the targets, least-conn picks the one with
+    the fewest open connections, hash maps each client IP onto a consistent
+    hash ring (vnodes points per target) so a client keeps hitting the same
+    replica while the set of healthy replicas does not change.
+
+    Targets marked down are skipped while any target is up; if all are down
+    they are tried anyway rather than refusing every connection. Targets
+    failing active health checks are never tried, so a group whose targets
+    are all unhealthy rejects connections straight away.
+    """
+
+    def __init__(
+        self,
+        targets: Sequence[Tuple[str, int]],
+        policy: str = "round-robin",
+        fail_timeout: float = 10.0,
+        vnodes: int = 64,
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown balancing policy: {policy}")
+        if not targets:
+            raise ValueError("An upstream group needs at least one target")
+        self.policy = policy
+        self.fail_timeout = fail_timeout
+        self.upstreams = [Upstream(host, port) for host, port in targets]
+        self._next = 0
+        self._lock = threading.Lock()
+        ring = []
+        for index, up in enumerate(self.upstreams):
+            for v in range(vnodes):
+                ring.append((self._hash(f"{up.host}:{up.port}#{v}"), index))
+        ring.sort()
+        self._ring_keys = [h for h, _i in ring]
+        self._ring = [i for _h, i in ring]
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+    def _candidates(self, exclude: Sequence[Upstream]) -> List[Upstream]:
+        now = time.monotonic()
+        remaining = [u for u in self.upstreams if u.healthy and u not in exclude]
+        return [u for u in remaining if u.down_until <= now] or remaining
+
+    def pick(self, client_ip: Optional[str] = None, exclude: Sequence[Upstream] = ()) -> Optional[Upstream]:
+        """Choose a target and count a connection on it; release() when done."""
+        with self._lock:
+            candidates = self._candidates(exclude)
+            if not candidates:
+                return None
+            chosen: Optional[Upstream] = None
+            n = len(self.upstreams)
+            if self.policy == "hash":
+                start = bisect.bisect(self._ring_keys, self._hash(client_ip or ""))
+                for offset in range(len(self._ring)):
+                    up = self.upstreams[self._ring[(start + offset) % len(self._ring)]]
+                    if up in candidates:
+                        chosen = up
+                        break
+            elif self.policy == "least-conn":
+                # ties go to the target after the last one chosen, so idle groups still rotate
+                order = {id(self.upstreams[(self._next + i) % n]): i for i in range(n)}
+                chosen = min(candidates, key=lambda u: (u.active, order[id(u)]))
+            else:
+                for i in range(n):
+                    up = self.upstreams[(self._next + i) % n]
+                    if up in candidates:
+                        chosen = up
+                        break
+            assert chosen is not None
+            self._next = (self.upstreams.index(chosen) + 1) % n
+            chosen.active += 1
+            chosen.total += 1
+            return chosen
+
+    def has_healthy(self) -> bool:
+        return any(u.healthy for u in self.upstreams)
+
+    def release(self, upstream: Upstream) -> None:
+        with self._lock:
+            upstream.active -= 1
+
+    def mark_failed(self, upstream: Upstream, error: Optional[BaseException] = None) -> None:
+        now = time.monotonic()
+        with self._lock:
+            already_down = upstream.down_until > now
+            upstream.failures += 1
+            upstream.down_until = now + self.fail_timeout
+        if already_down:
+            return
+        logger.warning("Upstream %s:%d marked down for %.0fs: %s", upstream.host, upstream.port, self.fail_timeout, error)
+
+    def mark_ok(self, upstream: Upstream) -> None:
+        if upstream.down_until:
+            with self._lock:
+                upstream.down_until = 0.0
+            logger.info("Upstream %s:%d is back up", upstream.host, upstream.port)
+
+    def connect(self, client_ip: Optional[str] = None, timeout: Optional[float] = None) -> Tuple[socket.socket, Upstream]:
+        """Connect to a target chosen by the policy, failing over to the others.
+
+        The returned Upstream must be passed to release() when the connection ends.
+        """
+        tried: List[Upstream] = []
+        last_error: Optional[OSError] = None
+        while True:
+            up = self.pick(client_ip, exclude=tried)
+            if up is None:
+                if not tried and not self.has_healthy():
+                    raise NoHealthyUpstream("no healthy upstream")
+                raise last_error or ConnectionError("no upstream available")
+            try:
+                sock = socket.create_connection(up.address, timeout=timeout)
+            except OSError as e:
+                self.release(up)
+                self.mark_failed(up, e)
+                tried.append(up)
+                last_error = e
+                continue
+            self.mark_ok(up)
+            return sock, up
+
+    async def open_connection(
+        self, client_ip: Optional[str] = None
+    ) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter, Upstream]:
+        """asyncio counterpart of connect()."""
+        tried: List[Upstream] = []
+        last_error: Optional[OSError] = None
+        while True:
+            up = self.pick(client_ip, exclude=tried)
+            if up is None:
+                if not tried and not self.has_healthy():
+                    raise NoHealthyUpstream("no healthy upstream")
+                raise last_error or ConnectionError("no upstream available")
+            try:
+                reader, writer = await asyncio.open_connection(up.host, up.port)
+            except OSError as e:
+                self.release(up)
+                self.mark_failed(up, e)
+                tried.append(up)
+                last_error = e
+                continue
+            self.mark_ok(up)
+            return reader, writer, up
+
+    def stats(self) -> List[Dict[str, object]]:
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "target": f"{u.host}:{u.port}",
+                    "active": u.active,
+                    "total": u.total,
+                    "failures": u.failures,
+                    "up": u.down_until <= now,
+                    "healthy": u.healthy,
+                }
+                for u in self.upstreams
+            ]
+
+
+def group_for(
+    target: Tuple[str, int],
+    targets: Optional[Sequence[Tuple[str, int]]],
+    policy: str,
+    health: Optional["HealthChecker"] = None,
+) -> Optional[UpstreamGroup]:
+    """Group for a manager's add(): several targets, or one that is health checked."""
+    if targets and len(targets) > 1:
+        group = UpstreamGroup(targets, policy=policy)
+    elif health is not None:
+        # a one-member group lets health checks reject clients of a dead target immediately
+        group = UpstreamGroup([target], policy=policy)
+    else:
+        return None
+    if health is not None:
+        health.watch(group)
+    return group
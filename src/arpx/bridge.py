@@ -1,14 +1,22 @@
 import logging
+import os
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 
+from .health import HealthChecker
+from .metrics import Family, health_families, listener_families, network_families
+from .nat import NatMapping, NftablesNat, kernel_routable
 from .network import NetworkVisibleManager
-from .proxy import TcpForwarderManager
-from .compose import parse_compose_services, ComposeServices
+from .proxy import ConnectionGate, ConnectionLimits, TcpForwarderManager
+from .compose import discover_container_ips, discover_replicas, parse_compose_services, ComposeServices
+from .state import StateJournal
 from .terminator import TlsTerminatorManager
 
 logger = logging.getLogger("arpx.bridge")
 
+# where forwarders connect: the published host port, or the containers themselves
+TARGET_MODES = ("published", "container")
+
 
 class ComposeBridge:
     """Bridge Docker/Podman Compose services into the LAN with dedicated IPs.
@@ -18,14 +26,101 @@ class ComposeBridge:
       - start a TCP forwarder that listens on alias_ip:host_port and forwards to 127.0.0.1:host_port,
       - (optionally) add firewall rules to allow inbound traffic for those ports.
 
+    When a service runs several replicas (`--scale` with a published port
+    range), the forwarder balances over all of their host ports using
+    balance_policy.
+
+    With health_interval > 0 every forwarded target is probed in the
+    background (TCP connect, or GET health_path); clients of a service whose
+    containers all fail the checks are turned away immediately.
+
+    With target_mode "container" forwarders connect straight to each
+    container's IP and target port instead of the published host port,
+    skipping Docker's port publishing (often the userland docker-proxy);
+    ports whose containers cannot be resolved keep the published path.
+    kernel_nat (which needs target_mode "container") maps those ports with
+    nftables DNAT instead of forwarders, so their traffic stays in the
+    kernel; TLS terminators and ports without container targets still use
+    userspace forwarding, as do all ports when nft cannot apply the rules.
+
+    reconcile() re-reads the compose file and the running containers and
+    changes only what differs (see ComposeWatcher for `arpx compose --watch`).
+
+    With a StateJournal (arpx.state) every alias, the firewall chains and
+    the NAT table are recorded durably, for `arpx compose down` and for
+    cleaning up after a killed bridge; services listed in preferred_ips get
+    those addresses back without probing.
+
+    limits (ConnectionLimits) caps connections, per-client concurrency and
+    idle time on every forwarder and terminator. With workers > 1 they run
+    in that many processes sharing each port (SO_REUSEPORT).
+
+    With engine "asyncio" the forwarders share `loops` event loop threads
+    per process; 0 picks one per CPU (split between the workers).
+
     This makes each service accessible from other devices in the network using the alias IPs.
     """
 
-    def __init__(self, interface: str):
-        self.net = NetworkVisibleManager(interface)
-        self.fwds = TcpForwarderManager()
-        self.terms = TlsTerminatorManager()
+    def __init__(
+        self,
+        interface: str,
+        engine: str = "thread",
+        net_backend: str = "shell",
+        arp_interval: float = 30.0,
+        arp_mode: str = "proxy",
+        forward_mode: str = "tcp",
+        pool_size: int = 8,
+        pool_idle_timeout: float = 30.0,
+        balance_policy: str = "round-robin",
+        health_interval: float = 0.0,
+        health_timeout: float = 1.0,
+        health_rise: int = 2,
+        health_fall: int = 2,
+        health_path: Optional[str] = None,
+        limits: Optional[ConnectionLimits] = None,
+        workers: int = 1,
+        loops: int = 0,
+        target_mode: str = "published",
+        kernel_nat: bool = False,
+        firewall_backend: str = "auto",
+        journal: Optional[StateJournal] = None,
+    ):
+        if target_mode not in TARGET_MODES:
+            raise ValueError(f"Unknown target mode: {target_mode}")
+        if kernel_nat and target_mode != "container":
+            raise ValueError("Kernel NAT forwards to container addresses; it needs target_mode 'container'")
+        self.target_mode = target_mode
+        self.balance_policy = balance_policy
+        # one table per bridge process, so concurrent bridges never touch each other's rules
+        self.nat: Optional[NftablesNat] = NftablesNat(table=f"arpx_{os.getpid()}") if kernel_nat else None
+        self.journal = journal
+        self.net = NetworkVisibleManager(
+            interface, backend=net_backend, arp_mode=arp_mode, firewall_backend=firewall_backend, journal=journal
+        )
+        self.arp_interval = arp_interval
+        self.health: Optional[HealthChecker] = None
+        if health_interval > 0:
+            self.health = HealthChecker(
+                interval=health_interval, timeout=health_timeout, rise=health_rise, fall=health_fall,
+                http_path=health_path,
+            )
+        if loops <= 0:
+            loops = max(1, (os.cpu_count() or 1) // max(1, workers))
+        self.fwds = TcpForwarderManager(
+            engine=engine, loops=loops, mode=forward_mode, pool_size=pool_size, pool_idle_timeout=pool_idle_timeout,
+            policy=balance_policy, health=self.health, limits=limits, workers=workers,
+        )
+        self.terms = TlsTerminatorManager(
+            engine=engine, policy=balance_policy, health=self.health, limits=limits, workers=workers
+        )
         self.created: List[Tuple[str, str, List[int]]] = []  # (ip, service, ports)
+        # (alias_ip, port) -> (kind, targets); kind is "forward", "nat" or "tls"
+        self.routes: Dict[Tuple[str, int], Tuple[str, List[Tuple[str, int]]]] = {}
+        self.network: Tuple[str, str] = ("", "24")  # (network base, cidr) of the interface
+        self.placement: Dict[str, object] = {}
+        self.ssl_context = None
+        self.https_port = 443
+        self.preferred_ips: Dict[str, str] = {}  # service -> alias IP to reuse, e.g. from a previous run
 
     def up(
         self,
@@ -34,6 +129,9 @@ class ComposeBridge:
         base_ip: Optional[str] = None,
         ssl_context=None,
         https_port: int = 443,
+        probe_concurrency: int = 16,
+        probe_deadline: float = 30.0,
+        probe_method: str = "ping",
     ) -> List[Tuple[str, str, List[int]]]:
         """Start bridging for services described by compose_file.
 
@@ -46,66 +144,254 @@ class ComposeBridge:
             raise RuntimeError("Unable to obtain network details from interface")
 
         comp: ComposeServices = parse_compose_services(compose_file)
-        services = list(comp.ports_by_service.items())  # [(name, [ServicePort,...])]
-        if not services:
+        if not comp.ports_by_service:
             logger.warning("No TCP published ports found in compose file: %s", compose_file)
             return []
 
-        svc_count = len(services)
+        # kept for reconcile(), which places services added later the same way
+        self.network = (network_base, cidr)
+        self.placement = {
+            "ip_start": ip_start, "base_ip": base_ip, "concurrency": probe_concurrency,
+            "deadline": probe_deadline, "method": probe_method,
+        }
+        self.ssl_context = ssl_context
+        self.https_port = https_port
+        if self.arp_interval > 0:
+            self.net.start_announcer(interval=self.arp_interval)
+        created = self.reconcile(compose_file, comp)
+        if not created:
+            self.net.stop_announcer()
+            return []
+        self.net.watch_changes()
+        return created
+
+    def reconcile(self, compose_file: Path, comp: Optional[ComposeServices] = None) -> List[Tuple[str, str, List[int]]]:
+        """Bring the bridge in line with compose_file and the running containers.
+
+        Services that appeared get alias IPs, those that disappeared lose
+        theirs, and only ports whose targets changed (e.g. a container
+        restarted with a new address) get a new forwarder; listeners of
+        unchanged ports, and their connections, are left alone. Firewall
+        rules and the kernel NAT table are each rewritten in one transaction,
+        and only when they change. Returns the updated list of
+        (alias_ip, service_name, ports).
+        """
+        if comp is None:
+            comp = parse_compose_services(compose_file)
+        services = comp.ports_by_service
+        bridged = {svc: alias_ip for alias_ip, svc, _ports in self.created}
+
+        added = [svc for svc in services if svc not in bridged]
+        pairs = self._allocate(added)
+        if len(pairs) < len(added):
+            logger.warning("Found only %d free IP(s) for %d service(s)", len(pairs), len(added))
+        # add all new alias IPs with visibility in one pass; nothing is left behind on failure
+        if pairs and not self.net.add_virtual_ips([(alias_ip, svc) for svc, alias_ip in pairs], self.network[1]):
+            logger.error("Failed to add alias IPs for %d service(s)", len(pairs))
+            pairs = []
+        bridged.update(pairs)
+
+        replicas = discover_replicas(compose_file)
+        container_ips = discover_container_ips(compose_file) if self.target_mode == "container" else {}
+
+        routes: Dict[Tuple[str, int], Tuple[str, List[Tuple[str, int]]]] = {}
+        created: List[Tuple[str, str, List[int]]] = []
+        for svc_name, ports in services.items():
+            alias_ip = bridged.get(svc_name)
+            if alias_ip is None:
+                continue
+            published_ports = sorted({p.host_port for p in ports if p.protocol.lower() == 'tcp'})
+            container_ports = {p.host_port: p.container_port for p in ports}
+            service_targets = {
+                hp: self.service_targets(svc_name, hp, container_ports.get(hp), replicas, container_ips)
+                for hp in published_ports
+            }
+            for hp in published_ports:
+                # forward alias_ip:hp -> 127.0.0.1:hp, the containers, or all replicas of it
+                targets = service_targets[hp]
+                nat = self.nat is not None and all(kernel_routable(host) for host, _port in targets)
+                routes[(alias_ip, hp)] = ("nat" if nat else "forward", targets)
+            # Optionally add a TLS terminator on https_port that forwards to the first published port
+            if self.ssl_context is not None and published_ports and self.https_port not in published_ports:
+                routes[(alias_ip, self.https_port)] = ("tls", service_targets[published_ports[0]])
+            created.append((alias_ip, svc_name, published_ports))
+            if svc_name in added:
+                logger.info("Bridged service %s at %s with ports %s", svc_name, alias_ip, ",".join(map(str, published_ports)))
+
+        self._apply_routes(routes)
+        # allow inbound to every routed port at once
+        if not self.net.firewall.replace(list(routes)):
+            logger.warning("Could not install firewall rules for %d alias port(s)", len(routes))
+        for svc_name, alias_ip in bridged.items():
+            if svc_name not in services:
+                self.net.remove_virtual_ip(alias_ip, self.network[1])
+                logger.info("Removed service %s from %s", svc_name, alias_ip)
+        self.created = created
+
+        if self.health is not None and self.routes:
+            self.health.start()
+        return self.created
+
+    def _allocate(self, services: List[str]) -> List[Tuple[str, str]]:
+        """(service, alias IP) for new services, skipping addresses already in use by this bridge.
+
+        Services in preferred_ips keep their address; only the rest are
+        placed from base_ip or by probing for free addresses. Services no
+        address could be found for are left out.
+        """
+        in_use = {alias_ip for alias_ip, _svc, _ports in self.created}
+        reused = {
+            svc: self.preferred_ips[svc] for svc in services
+            if svc in self.preferred_ips and self.preferred_ips[svc] not in in_use
+        }
+        in_use.update(reused.values())
+        fresh = iter(self._free_ips(len(services) - len(reused), in_use))
+        pairs: List[Tuple[str, str]] = []
+        for svc in services:
+            alias_ip = reused.get(svc) or next(fresh, None)
+            if alias_ip is None:
+                continue  # no address left for this one; later services may still have theirs
+            pairs.append((svc, alias_ip))
+        return pairs
+
+    def _free_ips(self, count: int, in_use: Set[str]) -> List[str]:
+        if count <= 0:
+            return []
+        network_base, cidr = self.network
+        base_ip = self.placement["base_ip"]
         if base_ip:
             base_parts = base_ip.split('.')
             alias_ips: List[str] = []
-            for i in range(svc_count):
-                base_parts[-1] = str(int(base_ip.split('.')[-1]) + i)
-                ip = '.'.join(base_parts)
-                alias_ips.append(ip)
-        else:
-            alias_ips = self.net.find_free_ips(network_base, cidr, svc_count, ip_start)
-            if len(alias_ips) < svc_count:
-                logger.warning("Found only %d free IP(s) for %d service(s)", len(alias_ips), svc_count)
-                if not alias_ips:
-                    return []
-
-        for (svc_name, ports), alias_ip in zip(services, alias_ips):
-            # add alias IP with visibility
-            ok = self.net.add_virtual_ip_with_visibility(alias_ip, svc_name, cidr)
-            if not ok:
-                logger.error("Failed to add alias IP for service %s at %s", svc_name, alias_ip)
+            offset = 0
+            while len(alias_ips) < count and int(base_parts[-1]) + offset < 255:
+                ip = '.'.join(base_parts[:-1] + [str(int(base_parts[-1]) + offset)])
+                if ip not in in_use:
+                    alias_ips.append(ip)
+                offset += 1
+            return alias_ips
+        free = self.net.find_free_ips(
+            network_base, cidr, count + len(in_use), self.placement["ip_start"],
+            concurrency=self.placement["concurrency"], deadline=self.placement["deadline"],
+            method=self.placement["method"],
+        )
+        return [ip for ip in free if ip not in in_use][:count]
+
+    def _apply_routes(self, routes: Dict[Tuple[str, int], Tuple[str, List[Tuple[str, int]]]]) -> None:
+        """Program the NAT table, stop listeners whose route changed or went away, then start the new ones."""
+        nat_routes = {key: targets for key, (kind, targets) in routes.items() if kind == "nat"}
+        nat_before = {key: targets for key, (kind, targets) in self.routes.items() if kind == "nat"}
+        if self.nat is not None and nat_routes != nat_before:
+            if self.journal is not None and nat_routes:
+                # recorded first, so a crash right after the apply still leaves the table's name behind
+                self.journal.update(nat_table=self.nat.table)
+            if not nat_routes:
+                self.nat.cleanup()
+            elif not self.nat.apply(
+                [NatMapping(ip, port, targets, self.balance_policy) for (ip, port), targets in nat_routes.items()]
+            ):
+                logger.warning("Kernel NAT unavailable; forwarding %d port(s) in userspace", len(nat_routes))
+                for key, targets in nat_routes.items():
+                    routes[key] = ("forward", targets)
+
+        for (alias_ip, port), route in self.routes.items():
+            if routes.get((alias_ip, port)) == route:
                 continue
+            if route[0] == "forward":
+                self.fwds.remove(alias_ip, port)
+            elif route[0] == "tls":
+                self.terms.remove(alias_ip, port)
 
-            published_ports = sorted({p.host_port for p in ports if p.protocol.lower() == 'tcp'})
-            for hp in published_ports:
-                # allow inbound
-                self.net.configure_firewall_for_lan(alias_ip, hp)
-                # forward alias_ip:hp -> 127.0.0.1:hp
-                self.fwds.add(alias_ip, hp, "127.0.0.1", hp)
+        for (alias_ip, port), (kind, targets) in routes.items():
+            if self.routes.get((alias_ip, port)) == (kind, targets):
+                continue
+            if kind == "forward":
+                self._forward(alias_ip, port, targets)
+            elif kind == "tls":
+                target_host, target_port = targets[0]
+                try:
+                    self.terms.add(
+                        alias_ip, port, target_host, target_port, self.ssl_context,
+                        targets=targets if len(targets) > 1 else None,
+                    )
+                    logger.info("HTTPS terminator at https://%s:%d -> http://%s:%d", alias_ip, port, target_host, target_port)
+                except Exception as e:
+                    logger.warning("Failed to start TLS terminator at %s:%d: %s", alias_ip, port, e)
+        self.routes = routes
 
-            # Optionally add a TLS terminator on https_port that forwards to the first published port
-            if ssl_context is not None and published_ports:
-                target_hp = published_ports[0]
-                if https_port not in published_ports:  # avoid conflict if service already uses 443
-                    try:
-                        self.net.configure_firewall_for_lan(alias_ip, https_port)
-                        self.terms.add(alias_ip, https_port, "127.0.0.1", target_hp, ssl_context)
-                        logger.info(
-                            "HTTPS terminator at https://%s:%d -> http://127.0.0.1:%d",
-                            alias_ip, https_port, target_hp,
-                        )
-                    except Exception as e:
-                        logger.warning("Failed to start TLS terminator for %s at %s:%d: %s", svc_name, alias_ip, https_port, e)
-
-            self.created.append((alias_ip, svc_name, published_ports))
-            logger.info("Bridged service %s at %s with ports %s", svc_name, alias_ip, ",".join(map(str, published_ports)))
+    def _forward(self, alias_ip: str, port: int, targets: List[Tuple[str, int]]) -> None:
+        target_host, target_port = targets[0]
+        self.fwds.add(alias_ip, port, target_host, target_port, targets=targets if len(targets) > 1 else None)
 
-        return self.created
+    def service_targets(
+        self,
+        service: str,
+        host_port: int,
+        container_port: Optional[int],
+        replicas: Dict[Tuple[str, int], List[int]],
+        container_ips: Dict[str, List[str]],
+    ) -> List[Tuple[str, int]]:
+        """Upstream addresses for one published port of a service; the first is the primary target.
+
+        container_ips (discover_container_ips) is used in target_mode
+        "container", replicas (discover_replicas) otherwise or when the
+        containers cannot be reached directly.
+        """
+        if self.target_mode == "container":
+            ips = container_ips.get(service, [])
+            if ips and container_port is not None:
+                logger.info(
+                    "Service %s port %d: forwarding to %d container(s) on port %d",
+                    service, host_port, len(ips), container_port,
+                )
+                return [(ip, container_port) for ip in ips]
+            logger.warning("Service %s port %d: container address unknown, using the published port", service, host_port)
+        replica_ports = replicas.get((service, container_port), []) if container_port is not None else []
+        if len(replica_ports) > 1:
+            logger.info("Service %s port %d: balancing over %d replicas", service, host_port, len(replica_ports))
+            return [("127.0.0.1", rp) for rp in replica_ports]
+        return [("127.0.0.1", host_port)]
+
+    def metric_families(self) -> List[Family]:
+        """Listener, health and ARP metrics for a MetricsRegistry."""
+        families = listener_families(self.fwds.listener_metrics() + self.terms.listener_metrics())
+        if self.health is not None:
+            families += health_families(self.health)
+        return families + network_families(self.net)
 
     def cleanup(self):
+        nat_removed = self.nat is None or self.nat.cleanup()
+        if self.health is not None:
+            self.health.stop()
+        conns = ConnectionGate.combined([self.fwds.connection_stats(), self.terms.connection_stats()])
+        if conns.get("rejected") or conns.get("rejected_per_ip") or conns.get("idle_closed"):
+            logger.info(
+                "Connections: %d accepted, %d shed at the limit, %d shed per client IP, %d closed idle",
+                conns["accepted"], conns["rejected"], conns["rejected_per_ip"], conns["idle_closed"],
+            )
         self.fwds.stop_all()
+        stats = self.terms.handshake_stats()
+        if stats["full"] or stats["resumed"]:
+            logger.info("TLS handshakes: %d full, %d resumed", stats["full"], stats["resumed"])
         self.terms.stop_all()
+        leftovers = [] if self.net.firewall.teardown() else ["firewall rules"]
+        if not nat_removed:
+            leftovers.append(f"NAT table {self.nat.table}")
         # remove IPs
         for alias_ip, _svc, _ports in self.created:
             try:
-                self.net.remove_virtual_ip(alias_ip)
+                removed = self.net.remove_virtual_ip(alias_ip, self.network[1])
             except Exception:
-                pass
+                removed = False
+            if not removed:
+                leftovers.append(alias_ip)
         self.created.clear()
+        self.routes.clear()
+        if self.journal is not None:
+            if leftovers:
+                # keep them recorded for `arpx compose down` / the next start
+                logger.warning("Leftovers kept in %s: %s", self.journal.path, ", ".join(leftovers))
+            else:
+                self.journal.clear()
+        self.net.stop_watching()
+        self.net.stop_announcer()
+        self.net.stop_responder()
@@ -1,20 +1,27 @@
 import os
 import subprocess
 import ssl
+import hashlib
+import json
 import logging
+import threading
 from pathlib import Path
-from typing import Iterable, List, Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 from datetime import datetime, timedelta, timezone
 import ipaddress
 
 from cryptography import x509
 from cryptography.hazmat.primitives import hashes, serialization
-from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
 from cryptography.x509.oid import NameOID
 
 
 logger = logging.getLogger("arpx.certs")
 
+# Key types for self-signed certificates. ECDSA P-256 makes the server side of
+# every full handshake much cheaper than RSA-2048.
+KEY_TYPES = ("rsa", "ecdsa")
+
 
 def ensure_dir(path: Path) -> None:
     path.mkdir(parents=True, exist_ok=True)
@@ -38,19 +45,29 @@ def _to_san_entries(names: Iterable[str]) -> List[x509.GeneralName]:
     return entries
 
 
+def _generate_private_key(key_type: str):
+    if key_type == "rsa":
+        return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    if key_type == "ecdsa":
+        return ec.generate_private_key(ec.SECP256R1())
+    raise ValueError(f"Unsupported key type: {key_type}")
+
+
 def generate_self_signed_cert(
     output_dir: Path,
     common_name: str,
     sans: Iterable[str],
     valid_days: int = 3650,
+    key_type: str = "rsa",
 ) -> Tuple[Path, Path]:
     """Generate a self-signed certificate and return (cert_path, key_path).
 
     The certificate will include all provided SANs (domains and/or IPs).
+    key_type is one of KEY_TYPES ("rsa" = RSA-2048, "ecdsa" = ECDSA P-256).
     """
     ensure_dir(output_dir)
-    logger.info("Generating self-signed certificate in %s (CN=%s)", output_dir, common_name)
-    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    logger.info("Generating self-signed %s certificate in %s (CN=%s)", key_type, output_dir, common_name)
+    key = _generate_private_key(key_type)
 
     subject = issuer = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, common_name)])
 
@@ -90,6 +107,51 @@ def generate_self_signed_cert(
     return cert_path, key_path
 
 
+def _cert_not_valid_after(cert: x509.Certificate) -> datetime:
+    # cryptography >= 42 exposes an aware datetime; older versions a naive UTC one
+    expires = getattr(cert, "not_valid_after_utc", None)
+    if expires is None:
+        expires = cert.not_valid_after.replace(tzinfo=timezone.utc)
+    return expires
+
+
+def cert_cache_key(common_name: str, sans: Iterable[str], key_type: str = "rsa") -> str:
+    """Content address of a self-signed certificate: hash of CN + SANs + key type."""
+    names = sorted({n.strip() for n in sans if n and n.strip()})
+    blob = json.dumps([common_name, names, key_type], separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+
+def cached_self_signed_cert(
+    cache_dir: Path,
+    common_name: str,
+    sans: Iterable[str],
+    key_type: str = "rsa",
+    valid_days: int = 3650,
+    min_valid_days: int = 1,
+) -> Tuple[Path, Path]:
+    """Return a self-signed certificate from cache_dir, generating it only if needed.
+
+    Certificates live in cache_dir/<cert_cache_key>/ and are reused while they
+    remain valid for at least min_valid_days, so repeated runs with the same
+    names skip key generation and keep the files untouched.
+    """
+    sans = list(sans)
+    out_dir = cache_dir / cert_cache_key(common_name, sans, key_type)
+    cert_path = out_dir / "cert.pem"
+    key_path = out_dir / "key.pem"
+    if cert_path.exists() and key_path.exists():
+        try:
+            cert = x509.load_pem_x509_certificate(cert_path.read_bytes())
+            if _cert_not_valid_after(cert) > datetime.now(timezone.utc) + timedelta(days=min_valid_days):
+                logger.info("Reusing cached self-signed certificate in %s (CN=%s)", out_dir, common_name)
+                return cert_path, key_path
+            logger.info("Cached certificate in %s is expiring; regenerating", out_dir)
+        except Exception as e:
+            logger.warning("Ignoring unreadable cached certificate in %s: %s", out_dir, e)
+    return generate_self_signed_cert(out_dir, common_name, sans, valid_days=valid_days, key_type=key_type)
+
+
 def generate_mkcert_cert(output_dir: Path, names: Iterable[str]) -> Tuple[Path, Path]:
     """Generate a locally-trusted certificate using mkcert if available.
 
@@ -153,10 +215,47 @@ def get_letsencrypt_cert(
     return cert_path, key_path
 
 
-def build_ssl_context(cert_file: Path, key_file: Path) -> ssl.SSLContext:
+def build_ssl_context(cert_file: Path, key_file: Path, num_tickets: int = 2) -> ssl.SSLContext:
+    """Build a server SSLContext.
+
+    Session resumption is enabled: TLS 1.3 clients receive `num_tickets`
+    session tickets and TLS 1.2 clients may resume from tickets or the
+    context's server-side session cache. Pass num_tickets=0 to disable it.
+    """
     ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
     ctx.load_cert_chain(certfile=str(cert_file), keyfile=str(key_file))
     # reasonable defaults
     ctx.options |= ssl.OP_NO_TLSv1 | ssl.OP_NO_TLSv1_1
     ctx.set_ciphers("ECDHE+AESGCM:ECDHE+CHACHA20")
+    if num_tickets > 0:
+        ctx.options &= ~ssl.OP_NO_TICKET
+        ctx.num_tickets = num_tickets
+    else:
+        ctx.options |= ssl.OP_NO_TICKET
+        ctx.num_tickets = 0
     return ctx
+
+
+_context_cache: Dict[Tuple[str, str, int, int, int], ssl.SSLContext] = {}
+_context_cache_lock = threading.Lock()
+
+
+def load_ssl_context(cert_file: Path, key_file: Path, num_tickets: int = 2) -> ssl.SSLContext:
+    """Like build_ssl_context, but return the same context while the files are unchanged.
+
+    Contexts are keyed by path and modification time, so every caller in the
+    process shares one context (and its TLS session cache).
+    """
+    key = (
+        str(Path(cert_file).resolve()),
+        str(Path(key_file).resolve()),
+        os.stat(cert_file).st_mtime_ns,
+        os.stat(key_file).st_mtime_ns,
+        num_tickets,
+    )
+    with _context_cache_lock:
+        ctx = _context_cache.get(key)
+        if ctx is None:
+            ctx = build_ssl_context(cert_file, key_file, num_tickets=num_tickets)
+            _context_cache[key] = ctx
+        return ctx
@@ -1,4 +1,5 @@
 import argparse
+import functools
 import logging
 import os
 import shutil
@@ -8,12 +9,19 @@ import time
 from pathlib import Path
 from typing import List, Optional
 
-from .network import NetworkVisibleManager
+from .network import NetworkVisibleManager, ARP_MODES, BACKENDS as NET_BACKENDS, PROBE_METHODS
+from .firewall import BACKENDS as FIREWALL_BACKENDS
 from .server import LANWebServerManager
 from . import certs as cert_utils
 from .dns import suggest_dns
-from .bridge import ComposeBridge
+from .bridge import ComposeBridge, TARGET_MODES
+from .compose import ComposeWatcher
+from .state import STATE_DIR, StateJournal, leftovers, owner_alive, release, reusable_ips, state_path
+from .proxy import ENGINES as FORWARDER_ENGINES, FORWARD_MODES, ConnectionLimits
+from .balancer import POLICIES as BALANCE_POLICIES
+from .terminator import TlsSessionCache
 from .mdns import MDNSPublisher
+from .metrics import MetricsRegistry, MetricsServer, network_families
 from . import __version__
 from .utils import check_dependencies
 
@@ -57,19 +65,41 @@ def print_summary(created_ips: List[str], base_port: int, scheme: str = "http")
     print("=" * 60 + "\n")
 
 
+def _start_metrics(args: argparse.Namespace, registry: MetricsRegistry) -> Optional[MetricsServer]:
+    if args.metrics_port <= 0:
+        return None
+    server = MetricsServer(registry, host=args.metrics_host, port=args.metrics_port)
+    try:
+        server.start()
+    except OSError as e:
+        print(f"⚠️ Metrics endpoint not started on {args.metrics_host}:{args.metrics_port}: {e}")
+        return None
+    print(f"📈 Metrics: http://{args.metrics_host}:{server.port}/metrics")
+    return server
+
+
 def cmd_up(args: argparse.Namespace) -> int:
     _setup_logging(args.log_level)
-    if not check_dependencies(["ip", "arping"]):
+    deps = [] if args.net_backend == "netlink" else ["ip"]
+    if args.arp_interval <= 0:
+        deps.append("arping")
+    if not check_dependencies(deps):
         return 1
 
     # Root required
     NetworkVisibleManager.check_root()
 
     # Interface
-    interface = args.interface or NetworkVisibleManager.auto_detect_interface()
+    interface = args.interface or NetworkVisibleManager.auto_detect_interface(backend=args.net_backend)
     print(f"🔍 Interface: {interface}")
 
-    net_manager = NetworkVisibleManager(interface)
+    journal_path = state_path("up", interface, args.state_dir)
+    if _recover(journal_path, "arpx up", f"interface {interface}") is None:
+        return 1
+    net_manager = NetworkVisibleManager(
+        interface, backend=args.net_backend, arp_mode=args.arp_mode, firewall_backend=args.firewall,
+        journal=StateJournal(journal_path),
+    )
     web_manager = LANWebServerManager()
     mdns_pub = None
 
@@ -89,7 +119,10 @@ def cmd_up(args: argparse.Namespace) -> int:
             created_ips.append(ip)
     else:
         print(f"\n🔍 Searching for {args.num_ips} free IP addresses...")
-        created_ips = net_manager.find_free_ips(network_base, cidr, args.num_ips, args.ip_start)
+        created_ips = net_manager.find_free_ips(
+            network_base, cidr, args.num_ips, args.ip_start,
+            concurrency=args.probe_concurrency, deadline=args.probe_deadline, method=args.probe_method,
+        )
         if not created_ips:
             print("❌ No free IP addresses found")
             return 1
@@ -107,8 +140,8 @@ def cmd_up(args: argparse.Namespace) -> int:
             names.extend(created_ips)
             common_name = names[0] if names else created_ips[0]
             out_dir = cert_dir / "self-signed"
-            cert_file, key_file = cert_utils.generate_self_signed_cert(out_dir, common_name, names)
-            ssl_ctx = cert_utils.build_ssl_context(cert_file, key_file)
+            cert_file, key_file = cert_utils.cached_self_signed_cert(out_dir, common_name, names, key_type=args.key_type)
+            ssl_ctx = cert_utils.load_ssl_context(cert_file, key_file)
         elif args.https == "mkcert":
             names = []
             if args.domains:
@@ -120,7 +153,7 @@ def cmd_up(args: argparse.Namespace) -> int:
             except RuntimeError as e:
                 print(f"❌ {e}")
                 return 1
-            ssl_ctx = cert_utils.build_ssl_context(cert_file, key_file)
+            ssl_ctx = cert_utils.load_ssl_context(cert_file, key_file)
         elif args.https == "letsencrypt":
             if not args.domain or not args.email:
                 print("❌ For Let's Encrypt please provide --domain and --email")
@@ -130,14 +163,14 @@ def cmd_up(args: argparse.Namespace) -> int:
             except Exception as e:
                 print(f"❌ Let's Encrypt error: {e}")
                 return 1
-            ssl_ctx = cert_utils.build_ssl_context(cert_file, key_file)
+            ssl_ctx = cert_utils.load_ssl_context(cert_file, key_file)
         elif args.https == "custom":
             if not args.cert_file or not args.key_file:
                 print("❌ For custom certs provide --cert-file and --key-file")
                 return 1
             cert_file = Path(args.cert_file)
             key_file = Path(args.key_file)
-            ssl_ctx = cert_utils.build_ssl_context(cert_file, key_file)
+            ssl_ctx = cert_utils.load_ssl_context(cert_file, key_file)
         else:
             print(f"⚠️ Unknown https mode: {args.https}")
             return 1
@@ -161,20 +194,27 @@ def cmd_up(args: argparse.Namespace) -> int:
 
     # Create IPs and servers
     print(f"\n🚀 Configuring {len(created_ips)} virtual IP(s)...\n")
+    if args.arp_interval > 0:
+        net_manager.start_announcer(interval=args.arp_interval)
+    if not net_manager.add_virtual_ips([(ip, str(i + 1)) for i, ip in enumerate(created_ips)], cidr):
+        print("❌ Failed to add virtual IPs (changes rolled back)")
+        net_manager.stop_announcer()
+        return 1
+    # keep the cached MAC/network details current for the ARP refresh loop
+    net_manager.watch_changes()
+    net_manager.configure_firewall_for_lan_many([(ip, args.base_port + i) for i, ip in enumerate(created_ips)])
     successful_ips: List[str] = []
     for i, ip in enumerate(created_ips):
         print(f"📦 Config {i + 1}/{len(created_ips)}:")
-        if net_manager.add_virtual_ip_with_visibility(ip, i + 1, cidr):
-            port = args.base_port + i
-            net_manager.configure_firewall_for_lan(ip, port)
-            content = f"Hello {i + 1}"
-            server = web_manager.start_lan_server(ip, port, content, ssl_ctx)
-            if server:
-                successful_ips.append(ip)
-                time.sleep(0.5)
-                web_manager.test_connectivity(ip, port, scheme)
-                if mdns_pub:
-                    mdns_pub.publish(args.mdns_prefix + str(i + 1), ip, port, https=(scheme == "https"))
+        port = args.base_port + i
+        content = f"Hello {i + 1}"
+        server = web_manager.start_lan_server(ip, port, content, ssl_ctx)
+        if server:
+            successful_ips.append(ip)
+            time.sleep(0.5)
+            web_manager.test_connectivity(ip, port, scheme)
+            if mdns_pub:
+                mdns_pub.publish(args.mdns_prefix + str(i + 1), ip, port, https=(scheme == "https"))
         print()
 
     if not successful_ips:
@@ -184,22 +224,29 @@ def cmd_up(args: argparse.Namespace) -> int:
 
     print_summary(successful_ips, args.base_port, scheme)
 
-    # Post-start ARP reannounce
-    time.sleep(2)
-    print("\n📢 Re-announcing IPs on the network...")
-    for ip in successful_ips:
-        net_manager.announce_arp(ip)
+    if net_manager.announcer is not None:
+        print(f"\n📢 Announcing {len(successful_ips)} IP(s) on the network every ~{args.arp_interval:g}s")
+    else:
+        # Post-start ARP reannounce
+        time.sleep(2)
+        print("\n📢 Re-announcing IPs on the network...")
+        net_manager.announce_arp_many(successful_ips)
+
+    registry = MetricsRegistry()
+    registry.register(lambda: network_families(net_manager))
+    metrics_server = _start_metrics(args, registry)
 
     print("\n✅ Ready! Servers visible across the LAN.")
     print("   Open a browser on ANY device in the network and navigate to the URLs above.\n")
 
-    # Main loop: refresh ARP periodically
+    # Main loop: the neighbour entries are permanent; they only change with the interface MAC
     try:
         while True:
             time.sleep(30)
-            for ip in successful_ips:
-                net_manager.update_arp_cache(ip)
+            net_manager.refresh_neighbors(successful_ips)
     finally:
+        if metrics_server is not None:
+            metrics_server.stop()
         net_manager.cleanup()
         web_manager.stop_all()
         if mdns_pub:
@@ -222,7 +269,7 @@ def cmd_cert(args: argparse.Namespace) -> int:
     if args.mode == "self-signed":
         names = [n.strip() for n in (args.names or "").split(",") if n.strip()]
         cn = args.common_name or (names[0] if names else "arpx.local")
-        cert, key = cert_utils.generate_self_signed_cert(out, cn, names or ["localhost"])
+        cert, key = cert_utils.generate_self_signed_cert(out, cn, names or ["localhost"], key_type=args.key_type)
         print(f"✅ Generated self-signed cert:\n  cert: {cert}\n  key:  {key}")
     elif args.mode == "mkcert":
         names = [n.strip() for n in (args.names or "").split(",") if n.strip()]
@@ -257,8 +304,66 @@ def cmd_dns(args: argparse.Namespace) -> int:
     return 0
 
 
+def _recover(journal_path: Path, command: str, what: str) -> Optional[dict]:
+    """Clean up after a previous run that died; None (and a message) if it is still running.
+
+    Returns the previous state ({} when there was none).
+    """
+    previous = StateJournal.load(journal_path)
+    if previous is None:
+        return {}
+    if owner_alive(previous):
+        print(f"❌ {what} is already managed by {command} (pid {previous.get('pid')}); stop it first")
+        return None
+    reuse = dict(previous, aliases=dict(previous.get("aliases") or {}))
+    removed = release(previous)
+    if leftovers(previous):
+        StateJournal.save(journal_path, previous)
+        print(f"❌ Could not remove everything left behind by a previous {command} (pid {previous.get('pid')}); see {journal_path}")
+        return None
+    journal_path.unlink(missing_ok=True)
+    print(f"♻️ Removed {removed} alias IP(s) and rules left behind by a previous {command} (pid {previous.get('pid')})")
+    return reuse
+
+
+def cmd_compose_down(args: argparse.Namespace, journal_path: Path, timeout: float = 10.0) -> int:
+    """Stop the bridge of a compose file, or remove what a dead one left behind."""
+    state = StateJournal.load(journal_path)
+    if state is None:
+        print(f"✅ Nothing to take down for {args.file}")
+        return 0
+    pid = state.get("pid")
+    if owner_alive(state):
+        print(f"⏹️ Stopping arpx compose (pid {pid})...")
+        os.kill(int(pid), signal.SIGTERM)
+        deadline = time.monotonic() + timeout
+        while owner_alive(state) and time.monotonic() < deadline:
+            time.sleep(0.1)
+        if owner_alive(state):
+            print(f"❌ Process {pid} did not exit within {timeout:g}s")
+            return 1
+        # a clean exit removes the journal; whatever it still lists is cleaned up here
+        state = StateJournal.load(journal_path)
+        if state is None:
+            print("✅ Compose bridge stopped, alias IPs removed")
+            return 0
+    removed = release(state)
+    if leftovers(state):
+        # still recorded, so another `down` can retry
+        StateJournal.save(journal_path, state)
+        print(f"❌ Removed {removed} alias IP(s); some resources of pid {pid} could not be removed, see {journal_path}")
+        return 1
+    journal_path.unlink(missing_ok=True)
+    print(f"✅ Removed {removed} alias IP(s) and rules left behind by pid {pid}")
+    return 0
+
+
 def cmd_compose(args: argparse.Namespace) -> int:
     _setup_logging(args.log_level)
+    journal_path = state_path("compose", str(Path(args.file).resolve()), args.state_dir)
+    if args.action == "down":
+        NetworkVisibleManager.check_root()
+        return cmd_compose_down(args, journal_path)
 
     # Check for docker or podman-compose
     if not (shutil.which("docker") or shutil.which("podman-compose")):
@@ -268,10 +373,29 @@ def cmd_compose(args: argparse.Namespace) -> int:
     # root required; ComposeBridge will also check
     NetworkVisibleManager.check_root()
 
-    interface = args.interface or NetworkVisibleManager.auto_detect_interface()
+    interface = args.interface or NetworkVisibleManager.auto_detect_interface(backend=args.net_backend)
     print(f"🔍 Interface: {interface}")
 
-    cb = ComposeBridge(interface)
+    if args.forward_mode == "http" and args.engine != "thread":
+        print("❌ --forward-mode http requires --engine thread")
+        return 1
+    previous = _recover(journal_path, "arpx compose", args.file)
+    if previous is None:
+        return 1
+    cb = ComposeBridge(
+        interface, engine=args.engine, net_backend=args.net_backend, arp_interval=args.arp_interval, arp_mode=args.arp_mode,
+        forward_mode=args.forward_mode, pool_size=args.pool_size, pool_idle_timeout=args.pool_idle_timeout,
+        balance_policy=args.balance_policy, health_interval=args.health_interval, health_timeout=args.health_timeout,
+        health_rise=args.health_rise, health_fall=args.health_fall, health_path=args.health_path,
+        limits=ConnectionLimits(
+            max_connections=args.max_connections, max_per_ip=args.max_per_ip, backlog=args.backlog,
+            idle_timeout=args.idle_timeout or None,
+        ),
+        workers=args.workers, loops=args.loops, target_mode=args.target_mode, kernel_nat=args.kernel_nat, firewall_backend=args.firewall,
+        journal=StateJournal(journal_path),
+    )
+    # services get the addresses they had before a crash, without probing
+    cb.preferred_ips = reusable_ips(previous)
     mdns_pub = None
 
     # Optional HTTPS terminator context
@@ -283,8 +407,8 @@ def cmd_compose(args: argparse.Namespace) -> int:
             if args.domains:
                 names.extend([d.strip() for d in args.domains.split(",") if d.strip()])
             common_name = names[0] if names else "arpx.local"
-            cert_file, key_file = cert_utils.generate_self_signed_cert(cert_dir, common_name, names)
-            ssl_ctx = cert_utils.build_ssl_context(cert_file, key_file)
+            cert_file, key_file = cert_utils.cached_self_signed_cert(cert_dir, common_name, names, key_type=args.key_type)
+            ssl_ctx = cert_utils.load_ssl_context(cert_file, key_file)
         elif args.https == "mkcert":
             names = []
             if args.domains:
@@ -294,7 +418,7 @@ def cmd_compose(args: argparse.Namespace) -> int:
             except RuntimeError as e:
                 print(f"❌ {e}")
                 return 1
-            ssl_ctx = cert_utils.build_ssl_context(cert_file, key_file)
+            ssl_ctx = cert_utils.load_ssl_context(cert_file, key_file)
         elif args.https == "letsencrypt":
             if not args.domain or not args.email:
                 print("❌ For Let's Encrypt please provide --domain and --email")
@@ -304,14 +428,23 @@ def cmd_compose(args: argparse.Namespace) -> int:
             except Exception as e:
                 print(f"❌ Let's Encrypt error: {e}")
                 return 1
-            ssl_ctx = cert_utils.build_ssl_context(cert_file, key_file)
+            ssl_ctx = cert_utils.load_ssl_context(cert_file, key_file)
         elif args.https == "custom":
             if not args.cert_file or not args.key_file:
                 print("❌ For custom certs provide --cert-file and --key-file")
                 return 1
             cert_file = Path(args.cert_file)
             key_file = Path(args.key_file)
-            ssl_ctx = cert_utils.build_ssl_context(cert_file, key_file)
+            ssl_ctx = cert_utils.load_ssl_context(cert_file, key_file)
+
+        # One session cache shared by all terminators, with periodically rotated ticket keys;
+        # worker processes rebuild it from the (picklable) factory
+        if ssl_ctx is not None and (args.tls_ticket_rotation > 0 or args.workers > 1):
+            ssl_ctx = TlsSessionCache(
+                functools.partial(cert_utils.build_ssl_context, cert_file, key_file),
+                rotate_interval=args.tls_ticket_rotation or None,
+                context=ssl_ctx,
+            )
 
     # mDNS
     if args.mdns:
@@ -331,7 +464,8 @@ def cmd_compose(args: argparse.Namespace) -> int:
     signal.signal(signal.SIGTERM, signal_handler)
 
     created = cb.up(
-        Path(args.file), ip_start=args.ip_start, base_ip=args.base_ip, ssl_context=ssl_ctx, https_port=args.https_port
+        Path(args.file), ip_start=args.ip_start, base_ip=args.base_ip, ssl_context=ssl_ctx, https_port=args.https_port,
+        probe_concurrency=args.probe_concurrency, probe_deadline=args.probe_deadline, probe_method=args.probe_method,
     )
     if not created:
         print("⚠️ Nothing bridged (no services with published TCP ports?)")
@@ -345,12 +479,24 @@ def cmd_compose(args: argparse.Namespace) -> int:
             print(f"  - {svc}: http://{alias_ip}:{port}  (or https if your service serves TLS)")
             if mdns_pub:
                 mdns_pub.publish(f"{svc}", alias_ip, port, https=False)
+    registry = MetricsRegistry()
+    registry.register(cb.metric_families)
+    metrics_server = _start_metrics(args, registry)
+    watcher = None
+    if args.watch:
+        watcher = ComposeWatcher(Path(args.file), lambda: cb.reconcile(Path(args.file)))
+        watcher.start()
+        print(f"\n👀 Watching {args.file} and its containers; changed services are re-bridged in place.")
     print("\nPress Ctrl+C to stop and remove alias IPs.")
 
     try:
         while True:
             time.sleep(30)
     finally:
+        if watcher is not None:
+            watcher.stop()
+        if metrics_server is not None:
+            metrics_server.stop()
         cb.cleanup()
         if mdns_pub:
             mdns_pub.stop()
@@ -366,13 +512,22 @@ def build_parser() -> argparse.ArgumentParser:
     # up
     up = sub.add_parser("up", help="Create virtual IPs and start HTTP/HTTPS servers visible in the LAN")
     up.add_argument("-i", "--interface", help="Network interface (auto-detected if omitted)")
+    up.add_argument("--state-dir", type=Path, default=STATE_DIR, help=f"Directory of the state file used to clean up after a killed run (default: {STATE_DIR})")
+    up.add_argument("--net-backend", choices=list(NET_BACKENDS), default="shell", help="Address/neighbour operations via `ip`/`arp` processes (shell) or rtnetlink messages (netlink)")
     up.add_argument("-n", "--num-ips", type=int, default=3, help="Number of virtual IPs")
     up.add_argument("-b", "--base-ip", help="Base IP to start from (otherwise auto-find free IPs)")
     up.add_argument("-p", "--base-port", type=int, default=8000, help="Base HTTP port")
     up.add_argument("--ip-start", type=int, default=100, help="Start searching from this last octet value")
+    up.add_argument("--probe-concurrency", type=int, default=16, help="Candidate IPs probed in parallel while searching for free IPs")
+    up.add_argument("--probe-deadline", type=float, default=30.0, help="Give up searching for free IPs after N seconds")
+    up.add_argument("--arp-mode", choices=list(ARP_MODES), default="proxy", help="Answer ARP for aliases via interface-wide proxy_arp (proxy) or only for the aliases from userspace (responder)")
+    up.add_argument("--arp-interval", type=float, default=30.0, help="Re-announce alias IPs with in-process gratuitous ARP every N seconds (0 = one-shot arping, default: 30)")
+    up.add_argument("--firewall", choices=list(FIREWALL_BACKENDS), default="auto", help="Open alias ports in per-process arpx iptables chains or an nftables table, removed on exit (auto: iptables, then nftables)")
+    up.add_argument("--probe-method", choices=list(PROBE_METHODS), default="ping", help="Free IP discovery: ping/arping per address, or one raw-socket ARP sweep")
 
     up.add_argument("--https", choices=["none", "self-signed", "mkcert", "letsencrypt", "custom"], default="none", help="Enable HTTPS with chosen method")
     up.add_argument("--domains", help="Comma-separated domain list for cert SANs (self-signed/mkcert)")
+    up.add_argument("--key-type", choices=list(cert_utils.KEY_TYPES), default="rsa", help="Key type for self-signed certificates (ecdsa = P-256, faster handshakes)")
     up.add_argument("--domain", help="Single domain for Let's Encrypt")
     up.add_argument("--email", help="Email for Let's Encrypt")
     up.add_argument("--staging", action="store_true", help="Use Let's Encrypt staging environment")
@@ -381,6 +536,8 @@ def build_parser() -> argparse.ArgumentParser:
     up.add_argument("--cert-dir", help="Directory to place or read certificates")
     up.add_argument("--mdns", action="store_true", help="Publish services via mDNS (zeroconf)")
     up.add_argument("--mdns-prefix", default="arpx-", help="mDNS service name prefix (default: arpx-)")
+    up.add_argument("--metrics-host", default="127.0.0.1", help="Address of the Prometheus /metrics endpoint (default: 127.0.0.1)")
+    up.add_argument("--metrics-port", type=int, default=9464, help="Port of the Prometheus /metrics endpoint (0 disables, default: 9464)")
     # Accept --log-level after the subcommand as well
     up.add_argument("--log-level", default="INFO", help="Logging level (DEBUG, INFO, WARNING, ERROR)")
     up.set_defaults(func=cmd_up)
@@ -391,6 +548,7 @@ def build_parser() -> argparse.ArgumentParser:
     cert.add_argument("-o", "--output", default=str(Path.cwd() / ".arpx" / "certs"), help="Output directory")
     cert.add_argument("--common-name", help="Common Name for self-signed")
     cert.add_argument("--names", help="Comma-separated SANs: domain(s) and/or IP(s)")
+    cert.add_argument("--key-type", choices=list(cert_utils.KEY_TYPES), default="rsa", help="Key type for self-signed certificates (ecdsa = P-256, faster handshakes)")
     cert.add_argument("--domain", help="Domain for Let's Encrypt")
     cert.add_argument("--email", help="Email for Let's Encrypt")
     cert.add_argument("--staging", action="store_true", help="Use Let's Encrypt staging")
@@ -409,13 +567,25 @@ def build_parser() -> argparse.ArgumentParser:
 
     # compose bridge
     comp = sub.add_parser("compose", help="Bridge Docker/Podman Compose services into the LAN with alias IPs")
+    comp.add_argument("action", nargs="?", choices=["up", "down"], default="up", help="Bridge the services (up, default), or stop a running bridge / remove what a killed one left behind (down)")
     comp.add_argument("-f", "--file", default="docker-compose.yml", help="Path to compose file")
+    comp.add_argument("--state-dir", type=Path, default=STATE_DIR, help=f"Directory of the state files used by `down` and crash recovery (default: {STATE_DIR})")
     comp.add_argument("-i", "--interface", help="Network interface (auto-detected if omitted)")
+    comp.add_argument("--watch", action="store_true", help="Follow changes of the compose file and container start/stop events, adding, removing or re-targeting only the affected services")
+    comp.add_argument("--net-backend", choices=list(NET_BACKENDS), default="shell", help="Address/neighbour operations via `ip`/`arp` processes (shell) or rtnetlink messages (netlink)")
     comp.add_argument("--ip-start", type=int, default=100, help="Start searching from this last octet value")
+    comp.add_argument("--probe-concurrency", type=int, default=16, help="Candidate IPs probed in parallel while searching for free IPs")
+    comp.add_argument("--probe-deadline", type=float, default=30.0, help="Give up searching for free IPs after N seconds")
+    comp.add_argument("--arp-mode", choices=list(ARP_MODES), default="proxy", help="Answer ARP for aliases via interface-wide proxy_arp (proxy) or only for the aliases from userspace (responder)")
+    comp.add_argument("--arp-interval", type=float, default=30.0, help="Re-announce alias IPs with in-process gratuitous ARP every N seconds (0 = one-shot arping, default: 30)")
+    comp.add_argument("--firewall", choices=list(FIREWALL_BACKENDS), default="auto", help="Open alias ports in per-process arpx iptables chains or an nftables table, removed on exit (auto: iptables, then nftables)")
+    comp.add_argument("--probe-method", choices=list(PROBE_METHODS), default="ping", help="Free IP discovery: ping/arping per address, or one raw-socket ARP sweep")
     comp.add_argument("-b", "--base-ip", help="Base IP to start from (otherwise auto-find free IPs)")
     comp.add_argument("--https", choices=["none", "self-signed", "mkcert", "letsencrypt", "custom"], default="none", help="Enable HTTPS terminator for bridged services")
     comp.add_argument("--https-port", type=int, default=443, help="Port for HTTPS terminator on alias IPs (default: 443)")
+    comp.add_argument("--tls-ticket-rotation", type=float, default=3600.0, help="Rotate TLS session ticket keys every N seconds (0 disables rotation, default: 3600)")
     comp.add_argument("--domains", help="Comma-separated domain list for cert SANs (self-signed/mkcert)")
+    comp.add_argument("--key-type", choices=list(cert_utils.KEY_TYPES), default="rsa", help="Key type for self-signed certificates (ecdsa = P-256, faster handshakes)")
     comp.add_argument("--domain", help="Single domain for Let's Encrypt")
     comp.add_argument("--email", help="Email for Let's Encrypt")
     comp.add_argument("--staging", action="store_true", help="Use Let's Encrypt staging environment")
@@ -423,6 +593,26 @@ def build_parser() -> argparse.ArgumentParser:
     comp.add_argument("--key-file", help="Path to custom private key (PEM)")
     comp.add_argument("--cert-dir", help="Directory to place or read certificates for compose HTTPS")
     comp.add_argument("--mdns", action="store_true", help="Publish services via mDNS (zeroconf)")
+    comp.add_argument("--engine", choices=list(FORWARDER_ENGINES), default="thread", help="Forwarder/TLS terminator engine: thread per connection or a shared asyncio event loop (default: thread)")
+    comp.add_argument("--forward-mode", choices=list(FORWARD_MODES), default="tcp", help="Forward raw TCP streams, or relay HTTP/1.1 requests over pooled keep-alive upstream connections (http)")
+    comp.add_argument("--target-mode", choices=list(TARGET_MODES), default="published", help="Forward to the published host port, or straight to each container's IP and port, skipping docker-proxy (container)")
+    comp.add_argument("--kernel-nat", action="store_true", help="Map forwarded ports with nftables DNAT to the containers instead of userspace forwarders (needs --target-mode container; TLS termination stays in userspace)")
+    comp.add_argument("--balance-policy", choices=list(BALANCE_POLICIES), default="round-robin", help="How connections are spread over scaled replicas of a service (hash = by client IP)")
+    comp.add_argument("--pool-size", type=int, default=8, help="Idle upstream connections kept per target in http forward mode (default: 8)")
+    comp.add_argument("--pool-idle-timeout", type=float, default=30.0, help="Close pooled upstream connections idle for N seconds (default: 30)")
+    comp.add_argument("--workers", type=int, default=1, help="Run forwarders and TLS terminators in N processes sharing each port via SO_REUSEPORT (default: 1)")
+    comp.add_argument("--loops", type=int, default=0, help="Event loop threads shared by the forwarders with --engine asyncio (default: 0 = one per CPU, split between workers)")
+    comp.add_argument("--max-connections", type=int, default=0, help="Concurrent connections per forwarded port; extra connections are reset (default: 0 = unlimited)")
+    comp.add_argument("--max-per-ip", type=int, default=0, help="Concurrent connections per client IP and forwarded port (default: 0 = unlimited)")
+    comp.add_argument("--backlog", type=int, default=128, help="Listen backlog of forwarders and terminators (default: 128)")
+    comp.add_argument("--idle-timeout", type=float, default=0.0, help="Close forwarded connections idle in both directions for N seconds (default: 0 = never)")
+    comp.add_argument("--health-interval", type=float, default=0.0, help="Probe forwarded targets every N seconds; clients of unhealthy services are rejected at once (default: 0 = no probes)")
+    comp.add_argument("--health-timeout", type=float, default=1.0, help="Timeout of one health probe in seconds (default: 1)")
+    comp.add_argument("--health-rise", type=int, default=2, help="Consecutive successful probes before a target is healthy again (default: 2)")
+    comp.add_argument("--health-fall", type=int, default=2, help="Consecutive failed probes before a target is unhealthy (default: 2)")
+    comp.add_argument("--health-path", help="Probe with an HTTP GET of this path (status < 400) instead of a TCP connect")
+    comp.add_argument("--metrics-host", default="127.0.0.1", help="Address of the Prometheus /metrics endpoint (default: 127.0.0.1)")
+    comp.add_argument("--metrics-port", type=int, default=9464, help="Port of the Prometheus /metrics endpoint (0 disables, default: 9464)")
     # Accept --log-level after the subcommand as well
     comp.add_argument("--log-level", default="INFO", help="Logging level (DEBUG, INFO, WARNING, ERROR)")
     comp.set_defaults(func=cmd_compose)
@@ -1,14 +1,27 @@
 from __future__ import annotations
 
+import ctypes
+import ctypes.util
+import json
+import logging
+import os
+import select
+import shutil
+import struct
+import subprocess
+import threading
+import time
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 
 try:
     import yaml  # type: ignore
 except Exception as e:  # pragma: no cover - optional dependency
     yaml = None  # type: ignore
 
+logger = logging.getLogger("arpx.compose")
+
 
 @dataclass
 class ServicePort:
@@ -23,8 +36,13 @@ class ComposeServices:
     ports_by_service: Dict[str, List[ServicePort]]
 
 
+def _first_port(value: str) -> int:
+    # "8080-8082" (a range for scaled replicas) -> 8080
+    return int(value.split("-", 1)[0])
+
+
 def _parse_port_entry(svc: str, entry) -> Optional[ServicePort]:
-    # string forms: "8080:80", "127.0.0.1:8080:80/tcp", "8080:80/udp"
+    # string forms: "8080:80", "127.0.0.1:8080:80/tcp", "8080:80/udp", "8080-8082:80"
     if isinstance(entry, str):
         proto = "tcp"
         if "/" in entry:
@@ -33,14 +51,14 @@ def _parse_port_entry(svc: str, entry) -> Optional[ServicePort]:
         if len(parts) == 2:
             host, cont = parts
             try:
-                return ServicePort(svc, int(host), int(cont), proto)
+                return ServicePort(svc, _first_port(host), int(cont), proto)
             except ValueError:
                 return None
         elif len(parts) == 3:
             # ip:host:container -> we care about host and container
             _, host, cont = parts
             try:
-                return ServicePort(svc, int(host), int(cont), proto)
+                return ServicePort(svc, _first_port(host), int(cont), proto)
             except ValueError:
                 return None
         else:
@@ -76,3 +94,280 @@ def parse_compose_services(path: Path) -> ComposeServices:
         if svc_ports:
             result[svc_name] = svc_ports
     return ComposeServices(ports_by_service=result)
+
+
+def _compose_ps_entries(output: str) -> List[dict]:
+    # Compose v2 prints one JSON object per line; older releases print a JSON array
+    output = output.strip()
+    if not output:
+        return []
+    if output.startswith("["):
+        return json.loads(output)
+    return [json.loads(line) for line in output.splitlines() if line.strip()]
+
+
+def discover_replicas(path: Path) -> Dict[Tuple[str, int], List[int]]:
+    """Published TCP host ports of running containers, by (service, container_port).
+
+    A service scaled with `docker compose up --scale web=3` and a port range
+    such as "8080-8082:80" yields {("web", 80): [8080, 8081, 8082]}. Returns
+    an empty dict when docker is not available or the project is not running.
+    """
+    if shutil.which("docker") is None:
+        return {}
+    cmd = ["docker", "compose", "-f", str(path), "ps", "--format", "json"]
+    try:
+        out = subprocess.run(cmd, capture_output=True, text=True, timeout=15)
+        entries = _compose_ps_entries(out.stdout) if out.returncode == 0 else []
+    except (OSError, subprocess.TimeoutExpired, ValueError) as e:
+        logger.debug("Replica discovery failed: %s", e)
+        return {}
+    replicas: Dict[Tuple[str, int], List[int]] = {}
+    for entry in entries:
+        service = entry.get("Service")
+        for pub in entry.get("Publishers") or []:
+            published = pub.get("PublishedPort") or 0
+            target = pub.get("TargetPort") or 0
+            if not service or not published or not target or (pub.get("Protocol") or "tcp").lower() != "tcp":
+                continue
+            ports = replicas.setdefault((service, int(target)), [])
+            # IPv4 and IPv6 bindings of the same port are listed separately
+            if int(published) not in ports:
+                ports.append(int(published))
+    for ports in replicas.values():
+        ports.sort()
+    return replicas
+
+
+COMPOSE_SERVICE_LABEL = "com.docker.compose.service"
+
+
+def _container_ips(containers: List[dict]) -> Dict[str, List[str]]:
+    """Container IPs by compose service, from `docker inspect` output.
+
+    A container on several networks contributes the address on the first
+    network by name; stopped containers and containers without an address
+    (host networking) are skipped.
+    """
+    ips: Dict[str, List[str]] = {}
+    for container in sorted(containers, key=lambda c: c.get("Name") or ""):
+        service = ((container.get("Config") or {}).get("Labels") or {}).get(COMPOSE_SERVICE_LABEL)
+        if not service or not (container.get("State") or {}).get("Running", True):
+            continue
+        networks = (container.get("NetworkSettings") or {}).get("Networks") or {}
+        addresses = [networks[name].get("IPAddress") for name in sorted(networks)]
+        address = next((a for a in addresses if a), None)
+        if address:
+            ips.setdefault(service, []).append(address)
+    return ips
+
+
+def discover_container_ips(path: Path) -> Dict[str, List[str]]:
+    """IPs of the running containers of each service, e.g. {"web": ["172.18.0.3", "172.18.0.4"]}.
+
+    Connecting to these directly skips the published port, which Docker
+    often serves with the userland docker-proxy. Returns an empty dict when
+    docker is not available or the project is not running.
+    """
+    if shutil.which("docker") is None:
+        return {}
+    try:
+        out = subprocess.run(
+            ["docker", "compose", "-f", str(path), "ps", "-q"], capture_output=True, text=True, timeout=15
+        )
+        ids = out.stdout.split() if out.returncode == 0 else []
+        if not ids:
+            return {}
+        out = subprocess.run(["docker", "inspect", *ids], capture_output=True, text=True, timeout=15)
+        containers = json.loads(out.stdout) if out.returncode == 0 else []
+    except (OSError, subprocess.TimeoutExpired, ValueError) as e:
+        logger.debug("Container IP discovery failed: %s", e)
+        return {}
+    return _container_ips(containers)
+
+
+# inotify(7) events that mean a file in the watched directory was written or replaced
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_INOTIFY_EVENT = struct.Struct("iIII")
+# docker events that change which containers (and addresses) a service has
+CONTAINER_EVENTS = ("start", "die")
+
+
+def _inotify_watch(directory: Path) -> Optional[int]:
+    """Non-blocking inotify descriptor watching directory, or None where inotify is unavailable."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, os.fsencode(str(directory)), _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _inotify_names(data: bytes) -> List[str]:
+    names = []
+    offset = 0
+    while offset + _INOTIFY_EVENT.size <= len(data):
+        _wd, _mask, _cookie, length = _INOTIFY_EVENT.unpack_from(data, offset)
+        offset += _INOTIFY_EVENT.size
+        names.append(data[offset:offset + length].rstrip(b"\0").decode(errors="replace"))
+        offset += length
+    return names
+
+
+def _event_matches(event: dict, path: Path) -> bool:
+    """Whether a `docker events` container event belongs to the compose project of path."""
+    attributes = (event.get("Actor") or {}).get("Attributes") or {}
+    if COMPOSE_SERVICE_LABEL not in attributes:
+        return False
+    config_files = attributes.get("com.docker.compose.project.config_files")
+    if config_files:
+        return str(path) in config_files.split(",")
+    return attributes.get("com.docker.compose.project.working_dir") == str(path.parent)
+
+
+class ComposeWatcher:
+    """Call on_change when the compose file or the containers of its project change.
+
+    The file's directory is watched with inotify, as editors often replace
+    the file instead of writing it (without inotify its mtime is polled
+    every poll_interval seconds); container start and die events come from
+    `docker events`. Bursts of changes, such as `docker compose up` starting
+    several containers, are coalesced: on_change runs once, debounce seconds
+    after the last of them, always from the same thread. An exception from
+    on_change (e.g. a half-saved file that does not parse) is logged and the
+    next change is waited for.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        on_change: Callable[[], object],
+        debounce: float = 1.0,
+        poll_interval: float = 2.0,
+        container_events: bool = True,
+    ):
+        self.path = Path(path).resolve()
+        self.on_change = on_change
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.container_events = container_events
+        self.changes = 0  # on_change calls made
+        self._changed_at: Optional[float] = None
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._events: Optional[subprocess.Popen] = None
+
+    def notify(self) -> None:
+        """Record a change; on_change follows once changes stop for debounce seconds."""
+        with self._cond:
+            self._changed_at = time.monotonic()
+            self._cond.notify()
+
+    def _dispatch(self) -> None:
+        while not self._stop.is_set():
+            with self._cond:
+                while self._changed_at is None and not self._stop.is_set():
+                    self._cond.wait()
+                if self._stop.is_set():
+                    return
+                quiet = time.monotonic() - self._changed_at
+                if quiet < self.debounce:
+                    self._cond.wait(self.debounce - quiet)
+                    continue
+                self._changed_at = None
+            try:
+                self.on_change()
+            except Exception as e:
+                logger.warning("Reconciling after a change of %s failed: %s", self.path, e)
+            self.changes += 1
+
+    def _watch_file(self) -> None:
+        fd = _inotify_watch(self.path.parent)
+        if fd is None:
+            logger.debug("inotify unavailable, polling %s every %.1fs", self.path, self.poll_interval)
+            self._poll_file()
+            return
+        try:
+            while not self._stop.is_set():
+                readable, _w, _x = select.select([fd], [], [], 0.5)
+                if not readable:
+                    continue
+                try:
+                    data = os.read(fd, 65536)
+                except BlockingIOError:
+                    continue
+                if self.path.name in _inotify_names(data):
+                    logger.debug("%s changed", self.path)
+                    self.notify()
+        finally:
+            os.close(fd)
+
+    def _poll_file(self) -> None:
+        def stamp():
+            try:
+                st = self.path.stat()
+            except OSError:
+                return None
+            return st.st_mtime_ns, st.st_size
+
+        seen = stamp()
+        while not self._stop.wait(self.poll_interval):
+            current = stamp()
+            if current != seen:
+                seen = current
+                logger.debug("%s changed", self.path)
+                self.notify()
+
+    def _watch_containers(self) -> None:
+        cmd = ["docker", "events", "--format", "{{json .}}", "--filter", "type=container"]
+        for event in CONTAINER_EVENTS:
+            cmd += ["--filter", f"event={event}"]
+        try:
+            self._events = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        except OSError as e:
+            logger.warning("Cannot follow container events: %s", e)
+            return
+        for line in self._events.stdout:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if _event_matches(event, self.path):
+                logger.debug("Container event %s: %s", event.get("Action"), event.get("id", "")[:12])
+                self.notify()
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stop.clear()
+        targets = [("dispatch", self._dispatch), ("file", self._watch_file)]
+        if self.container_events and shutil.which("docker") is not None:
+            targets.append(("containers", self._watch_containers))
+        for name, target in targets:
+            thread = threading.Thread(target=target, name=f"arpx-watch-{name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info("Watching %s for changes", self.path)
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._events is not None:
+            self._events.terminate()
+            try:
+                self._events.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self._events.kill()
+            self._events = None
+        for thread in self._threads:
+            thread.join(timeout=2)
+        self._threads.clear()
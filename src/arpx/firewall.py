@@ -0,0 +1,287 @@
+"""Firewall rules that let LAN clients reach alias IP ports.
+
+A Firewall keeps the full desired set of (alias_ip, port) rules in
+chains (iptables) or a table (nftables) of its own, named after the process
+by default (ARPX_<pid>-INPUT, inet arpx_<pid>), so concurrent arpx
+processes never replace or remove each other's rules. Every change
+reads the installed state once and, only when it differs, replaces all of
+it in one `iptables-restore --noflush` or `nft -f` transaction. Adding many
+aliases, restarting over rules left by a previous run and tearing
+everything down therefore cost at most two process spawns each, and rules
+are never duplicated.
+"""
+
+import json
+import logging
+import os
+import shutil
+import subprocess
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Set, Tuple, Union
+
+logger = logging.getLogger("arpx.firewall")
+
+BACKENDS = ("auto", "iptables", "nftables", "none")
+
+Rule = Tuple[str, int]  # (alias_ip, tcp port)
+
+
+@dataclass
+class FirewallState:
+    """What a backend found installed.
+
+    entries are the installed rules in the backend's canonical form, hooks
+    the built-in chains that jump to (or hook) the arpx rules.
+    """
+
+    present: bool = False
+    entries: List[str] = field(default_factory=list)
+    hooks: List[str] = field(default_factory=list)
+
+
+def _run(args: List[str], script: Optional[str] = None) -> Optional[subprocess.CompletedProcess]:
+    try:
+        result = subprocess.run(args, input=script, capture_output=True, text=True, timeout=15)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.warning("%s failed: %s", args[0], e)
+        return None
+    return result
+
+
+class IptablesBackend:
+    """<chain>-INPUT and <chain>-OUTPUT, jumped to from the top of INPUT and OUTPUT."""
+
+    name = "iptables"
+
+    def __init__(self, chain: str = "ARPX"):
+        self.chains = {"INPUT": f"{chain}-INPUT", "OUTPUT": f"{chain}-OUTPUT"}
+
+    @staticmethod
+    def available() -> bool:
+        return shutil.which("iptables-restore") is not None and shutil.which("iptables-save") is not None
+
+    def entries(self, rules: Iterable[Rule]) -> List[str]:
+        """Rules in iptables-save's canonical form, so they compare equal to what is installed."""
+        lines = []
+        for ip, port in rules:
+            lines.append(f"-A {self.chains['INPUT']} -d {ip}/32 -p tcp -m tcp --dport {port} -j ACCEPT")
+            lines.append(f"-A {self.chains['OUTPUT']} -s {ip}/32 -p tcp -m tcp --sport {port} -j ACCEPT")
+        return sorted(lines)
+
+    def parse(self, saved: str) -> FirewallState:
+        state = FirewallState()
+        ours = set(self.chains.values())
+        for line in saved.splitlines():
+            parts = line.split()
+            if not parts:
+                continue
+            if parts[0][1:] in ours:  # ":ARPX-INPUT - [0:0]"
+                state.present = True
+            elif len(parts) == 4 and parts[0] == "-A" and parts[2] == "-j" and parts[3] == self.chains.get(parts[1]):
+                state.hooks.append(parts[1])
+            elif parts[0] == "-A" and len(parts) > 1 and parts[1] in ours:
+                state.entries.append(" ".join(parts))
+        state.entries.sort()
+        return state
+
+    def current(self) -> Optional[FirewallState]:
+        result = _run(["iptables-save", "-t", "filter"])
+        if result is None or result.returncode != 0:
+            return None
+        return self.parse(result.stdout)
+
+    def in_sync(self, rules: Set[Rule], state: FirewallState) -> bool:
+        return state.entries == self.entries(rules) and sorted(state.hooks) == sorted(self.chains)
+
+    def replace_script(self, rules: Set[Rule], state: FirewallState) -> str:
+        # with --noflush, declaring a user chain creates or empties it within the transaction
+        lines = ["*filter"] + [f":{chain} - [0:0]" for chain in self.chains.values()]
+        lines += self.entries(rules)
+        for builtin, chain in self.chains.items():
+            # extra jumps left by an interrupted run are dropped, a missing one goes first in the chain
+            lines += [f"-D {builtin} -j {chain}"] * max(0, state.hooks.count(builtin) - 1)
+            if builtin not in state.hooks:
+                lines.append(f"-I {builtin} 1 -j {chain}")
+        lines.append("COMMIT")
+        return "\n".join(lines) + "\n"
+
+    def remove_script(self, state: FirewallState) -> str:
+        lines = ["*filter"] + [f":{chain} - [0:0]" for chain in self.chains.values()]
+        lines += [f"-D {builtin} -j {self.chains[builtin]}" for builtin in state.hooks]
+        lines += [f"-X {chain}" for chain in self.chains.values()]
+        lines.append("COMMIT")
+        return "\n".join(lines) + "\n"
+
+    def _restore(self, script: str) -> bool:
+        result = _run(["iptables-restore", "--noflush"], script)
+        if result is None:
+            return False
+        if result.returncode != 0:
+            logger.warning("iptables-restore failed: %s", result.stderr.strip())
+            return False
+        return True
+
+    def replace(self, rules: Set[Rule], state: FirewallState) -> bool:
+        return self._restore(self.replace_script(rules, state))
+
+    def remove(self, state: FirewallState) -> bool:
+        return self._restore(self.remove_script(state))
+
+
+class NftablesBackend:
+    """An inet table with a set of allowed alias_ip . port pairs, checked from input and output hooks.
+
+    An accept here does not override a drop in another table (each base
+    chain must accept a packet), so on hosts with a restrictive nftables
+    ruleset the ports still have to be opened there.
+    """
+
+    name = "nftables"
+
+    def __init__(self, chain: str = "ARPX"):
+        self.table = chain.lower()
+
+    @staticmethod
+    def available() -> bool:
+        return shutil.which("nft") is not None
+
+    @staticmethod
+    def entries(rules: Iterable[Rule]) -> List[str]:
+        return sorted(f"{ip} . {port}" for ip, port in rules)
+
+    def parse(self, listed: str) -> FirewallState:
+        state = FirewallState(present=True)
+        for item in json.loads(listed).get("nftables", []):
+            if "chain" in item and item["chain"].get("hook"):
+                state.hooks.append(item["chain"]["hook"])
+            elif "set" in item and item["set"].get("name") == "allowed":
+                for elem in item["set"].get("elem", []):
+                    ip, port = elem["concat"]
+                    state.entries.append(f"{ip} . {port}")
+        state.entries.sort()
+        return state
+
+    def current(self) -> Optional[FirewallState]:
+        result = _run(["nft", "-j", "list", "table", "inet", self.table])
+        if result is None:
+            return None
+        if result.returncode != 0:
+            # no such table yet
+            return FirewallState()
+        try:
+            return self.parse(result.stdout)
+        except (ValueError, KeyError, TypeError):
+            return FirewallState(present=True)
+
+    def in_sync(self, rules: Set[Rule], state: FirewallState) -> bool:
+        return state.entries == self.entries(rules) and sorted(state.hooks) == ["input", "output"]
+
+    def replace_script(self, rules: Set[Rule], state: FirewallState) -> str:
+        elements = ", ".join(self.entries(rules))
+        lines = [
+            f"add table inet {self.table}",
+            f"delete table inet {self.table}",
+            f"table inet {self.table} {{",
+            "\tset allowed {",
+            "\t\ttype ipv4_addr . inet_service;",
+        ]
+        if elements:
+            lines.append(f"\t\telements = {{ {elements} }}")
+        lines += [
+            "\t}",
+            "\tchain input {",
+            "\t\ttype filter hook input priority -10; policy accept;",
+            "\t\tip daddr . tcp dport @allowed accept",
+            "\t}",
+            "\tchain output {",
+            "\t\ttype filter hook output priority -10; policy accept;",
+            "\t\tip saddr . tcp sport @allowed accept",
+            "\t}",
+            "}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def _apply(self, script: str) -> bool:
+        result = _run(["nft", "-f", "-"], script)
+        if result is None:
+            return False
+        if result.returncode != 0:
+            logger.warning("nft failed: %s", result.stderr.strip())
+            return False
+        return True
+
+    def replace(self, rules: Set[Rule], state: FirewallState) -> bool:
+        return self._apply(self.replace_script(rules, state))
+
+    def remove(self, state: FirewallState) -> bool:
+        return self._apply(f"delete table inet {self.table}\n")
+
+
+class Firewall:
+    """Desired allow rules for alias IP ports, kept in sync with the kernel.
+
+    backend "auto" uses iptables when iptables-restore is installed, then
+    nftables; "none" (or neither tool present) only tracks the rules.
+    chain names this instance's chains/table (default ARPX_<pid>); pass a
+    recorded name to tear down what another, dead process installed.
+    """
+
+    def __init__(self, backend: str = "auto", chain: Optional[str] = None):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown firewall backend: {backend}")
+        if backend == "auto":
+            backend = next((b.name for b in (IptablesBackend, NftablesBackend) if b.available()), "none")
+        self.chain = chain or f"ARPX_{os.getpid()}"
+        self.backend: Optional[Union[IptablesBackend, NftablesBackend]] = None
+        if backend == "iptables":
+            self.backend = IptablesBackend(self.chain)
+        elif backend == "nftables":
+            self.backend = NftablesBackend(self.chain)
+        self.rules: Set[Rule] = set()
+
+    def allow(self, rules: Iterable[Rule]) -> bool:
+        """Add rules and sync; all of them are applied in one transaction."""
+        self.rules.update((ip, int(port)) for ip, port in rules)
+        return self.sync()
+
+    def replace(self, rules: Iterable[Rule]) -> bool:
+        """Make rules the whole desired set and sync, dropping any not in it."""
+        self.rules = {(ip, int(port)) for ip, port in rules}
+        return self.sync()
+
+    def revoke(self, ip_address: str) -> bool:
+        """Drop every rule of ip_address; nothing is spawned when it had none."""
+        remaining = {rule for rule in self.rules if rule[0] != ip_address}
+        if remaining == self.rules:
+            return True
+        self.rules = remaining
+        return self.sync()
+
+    def sync(self) -> bool:
+        """Make the installed rules equal the desired ones (one read, at most one write)."""
+        if self.backend is None:
+            return True
+        state = self.backend.current()
+        if state is None:
+            return False
+        if self.backend.in_sync(self.rules, state):
+            return True
+        if not self.backend.replace(self.rules, state):
+            return False
+        logger.debug("Firewall (%s): %d alias port rule(s) installed", self.backend.name, len(self.rules))
+        return True
+
+    def teardown(self) -> bool:
+        """Remove this instance's chains/table and everything in them."""
+        self.rules.clear()
+        if self.backend is None:
+            return True
+        state = self.backend.current()
+        if state is None:
+            return False
+        if not state.present and not state.hooks:
+            return True
+        if not self.backend.remove(state):
+            return False
+        logger.debug("Firewall (%s): arpx rules removed", self.backend.name)
+        return True
@@ -0,0 +1,187 @@
+"""Active health checks for forwarder and terminator upstreams.
+
+A HealthChecker probes every target of the UpstreamGroups it watches every
+`interval` seconds from one background thread (probes of a round run
+concurrently). A target becomes unhealthy after `fall` consecutive failed
+probes and healthy again after `rise` successful ones; groups skip unhealthy
+targets, and a group with no healthy target rejects clients immediately
+instead of letting each connection wait for a connect timeout.
+"""
+
+import logging
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from .balancer import Upstream, UpstreamGroup
+
+logger = logging.getLogger("arpx.health")
+
+
+class _TargetState:
+    """Probe results for one address, shared by every Upstream pointing at it."""
+
+    def __init__(self, address: Tuple[str, int]):
+        self.address = address
+        self.members: List[Upstream] = []
+        self.healthy = True
+        self.successes = 0
+        self.failures = 0
+        self.probes = 0
+        self.last_error: Optional[str] = None
+
+
+class HealthChecker:
+    """Periodic TCP (and optional HTTP) probes of watched upstream groups.
+
+    With http_path set, a probe sends `GET http_path` and requires a status
+    below 400; otherwise a completed TCP connect is enough.
+    """
+
+    def __init__(
+        self,
+        interval: float = 5.0,
+        timeout: float = 1.0,
+        rise: int = 2,
+        fall: int = 2,
+        http_path: Optional[str] = None,
+        max_workers: int = 16,
+    ):
+        if interval <= 0:
+            raise ValueError("Health check interval must be positive")
+        self.interval = interval
+        self.timeout = timeout
+        self.rise = max(1, rise)
+        self.fall = max(1, fall)
+        self.http_path = http_path
+        self.max_workers = max(1, max_workers)
+        self._targets: Dict[Tuple[str, int], _TargetState] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def settings(self) -> Dict[str, object]:
+        """Constructor arguments, to build an equivalent checker elsewhere (arpx.workers)."""
+        return {
+            "interval": self.interval,
+            "timeout": self.timeout,
+            "rise": self.rise,
+            "fall": self.fall,
+            "http_path": self.http_path,
+            "max_workers": self.max_workers,
+        }
+
+    def watch(self, group: UpstreamGroup) -> None:
+        """Probe all targets of group; each address is probed once however many groups share it."""
+        with self._lock:
+            for up in group.upstreams:
+                state = self._targets.get(up.address)
+                if state is None:
+                    state = self._targets[up.address] = _TargetState(up.address)
+                state.members.append(up)
+                up.healthy = state.healthy
+
+    def unwatch(self, group: UpstreamGroup) -> None:
+        with self._lock:
+            for up in group.upstreams:
+                state = self._targets.get(up.address)
+                if state is None:
+                    continue
+                state.members = [m for m in state.members if m is not up]
+                if not state.members:
+                    del self._targets[up.address]
+
+    def probe(self, address: Tuple[str, int]) -> Optional[str]:
+        """Probe one address; returns None when healthy, else the reason."""
+        try:
+            with socket.create_connection(address, timeout=self.timeout) as sock:
+                if not self.http_path:
+                    return None
+                host = address[0] if ":" not in address[0] else f"[{address[0]}]"
+                sock.sendall(
+                    f"GET {self.http_path} HTTP/1.1\r\nHost: {host}:{address[1]}\r\n"
+                    "User-Agent: arpx-health\r\nConnection: close\r\n\r\n".encode()
+                )
+                with sock.makefile("rb") as f:
+                    status_line = f.readline(1024)
+        except OSError as e:
+            return str(e) or e.__class__.__name__
+        parts = status_line.split(None, 2)
+        if len(parts) < 2 or not parts[0].startswith(b"HTTP/") or not parts[1].isdigit():
+            return "invalid HTTP response"
+        if int(parts[1]) >= 400:
+            return f"HTTP status {int(parts[1])}"
+        return None
+
+    def _record(self, state: _TargetState, error: Optional[str]) -> None:
+        state.probes += 1
+        state.last_error = error
+        if error is None:
+            state.successes += 1
+            state.failures = 0
+            flip = not state.healthy and state.successes >= self.rise
+        else:
+            state.failures += 1
+            state.successes = 0
+            flip = state.healthy and state.failures >= self.fall
+        if not flip:
+            return
+        state.healthy = not state.healthy
+        for up in state.members:
+            up.healthy = state.healthy
+            if state.healthy:
+                up.down_until = 0.0
+        host, port = state.address
+        if state.healthy:
+            logger.info("Upstream %s:%d is healthy again", host, port)
+        else:
+            logger.warning("Upstream %s:%d failed %d health checks: %s", host, port, state.failures, error)
+
+    def check_once(self) -> None:
+        """Run one probe round over all watched targets and apply the thresholds."""
+        with self._lock:
+            states = list(self._targets.values())
+        if not states:
+            return
+        workers = min(self.max_workers, len(states))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="arpx-health") as pool:
+            results = list(pool.map(lambda s: self.probe(s.address), states))
+        with self._lock:
+            for state, error in zip(states, results):
+                self._record(state, error)
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.check_once()
+            except Exception as e:
+                logger.debug("Health check round failed: %s", e)
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="arpx-health", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.timeout + 2)
+            self._thread = None
+
+    def stats(self) -> List[Dict[str, object]]:
+        with self._lock:
+            return [
+                {
+                    "target": f"{s.address[0]}:{s.address[1]}",
+                    "healthy": s.healthy,
+                    "probes": s.probes,
+                    "last_error": s.last_error,
+                }
+                for s in self._targets.values()
+            ]
@@ -0,0 +1,494 @@
+"""HTTP/1.1-aware forwarding with a keep-alive pool of upstream connections.
+
+TcpForwarder pairs every client connection with a fresh upstream connection.
+HttpForwarder instead reads one request at a time, sends it over an idle
+pooled upstream connection (or a new one), relays the response and hands the
+upstream connection back to the pool, so short-lived clients no longer pay
+for an upstream connect each. Anything that is not plain request/response
+HTTP (protocol upgrades, unparseable traffic) falls back to a raw tunnel.
+"""
+
+import logging
+import socket
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .balancer import NoHealthyUpstream, Upstream, UpstreamGroup
+from .proxy import ConnectionLimits, TcpForwarder
+
+logger = logging.getLogger("arpx.httpproxy")
+
+MAX_HEADER_BYTES = 65536
+# Linux-only; re-armed before every upstream read, see _Reader
+_TCP_QUICKACK = getattr(socket, "TCP_QUICKACK", None)
+# hop-by-hop headers that are not relayed upstream (RFC 7230 6.1)
+_HOP_BY_HOP = {"connection", "keep-alive", "proxy-connection", "te", "trailer", "upgrade"}
+# idempotent methods (RFC 9110 9.2.2): resending one on a fresh connection is harmless
+_RETRY_METHODS = frozenset({b"GET", b"HEAD", b"OPTIONS", b"PUT", b"DELETE"})
+# sent instead of waiting on a connect when every upstream fails its health checks
+_SERVICE_UNAVAILABLE = (
+    b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\nRetry-After: 5\r\nConnection: close\r\n\r\n"
+)
+
+
+class HttpParseError(Exception):
+    pass
+
+
+class UpstreamPool:
+    """Idle keep-alive connections to one upstream (host, port).
+
+    At most max_idle connections are kept; one idle for longer than
+    idle_timeout, or closed/written to by the server while idle, is discarded
+    instead of reused.
+    """
+
+    def __init__(
+        self,
+        target: Tuple[str, int],
+        max_idle: int = 8,
+        idle_timeout: float = 30.0,
+        connect_timeout: float = 5.0,
+    ):
+        self.target = target
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self.connect_timeout = connect_timeout
+        self.created = 0
+        self.reused = 0
+        self._idle: List[Tuple[socket.socket, float]] = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _alive(sock: socket.socket) -> bool:
+        try:
+            # an idle HTTP connection has nothing to read; EOF or stray bytes mean it is unusable
+            sock.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT)
+            return False
+        except BlockingIOError:
+            return True
+        except OSError:
+            return False
+
+    def acquire(self) -> Tuple[socket.socket, bool]:
+        """Return (connection, reused)."""
+        now = time.monotonic()
+        with self._lock:
+            while self._idle:
+                sock, since = self._idle.pop()
+                if now - since <= self.idle_timeout and self._alive(sock):
+                    self.reused += 1
+                    return sock, True
+                sock.close()
+        sock = socket.create_connection(self.target, timeout=self.connect_timeout)
+        sock.settimeout(None)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self._lock:
+            self.created += 1
+        return sock, False
+
+    def release(self, sock: socket.socket) -> None:
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append((sock, time.monotonic()))
+                return
+        sock.close()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for sock, _since in idle:
+            sock.close()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"created": self.created, "reused": self.reused, "idle": len(self._idle)}
+
+
+class _Reader:
+    """Buffered reads from a socket: header blocks, lines and counted bodies.
+
+    With quickack, ACKs are sent immediately instead of delayed. On a reused
+    keep-alive connection, a server that writes its response head and body
+    separately would otherwise stall on Nagle vs delayed ACK for ~40 ms per
+    response.
+    """
+
+    def __init__(self, sock: socket.socket, bufsize: int, quickack: bool = False):
+        self.sock = sock
+        self.bufsize = bufsize
+        self.buf = bytearray()
+        self.quickack = quickack and _TCP_QUICKACK is not None
+        self.received = 0
+
+    def _recv(self) -> bytes:
+        if self.quickack:
+            self.sock.setsockopt(socket.IPPROTO_TCP, _TCP_QUICKACK, 1)
+        data = self.sock.recv(self.bufsize)
+        self.received += len(data)
+        return data
+
+    def _fill(self) -> bool:
+        data = self._recv()
+        if not data:
+            return False
+        self.buf += data
+        return True
+
+    def read_head(self) -> Optional[bytes]:
+        """Header block including the blank line; None on EOF before any byte."""
+        start = 0
+        while True:
+            idx = self.buf.find(b"\r\n\r\n", start)
+            if idx >= 0:
+                head = bytes(self.buf[:idx + 4])
+                del self.buf[:idx + 4]
+                return head
+            if len(self.buf) > MAX_HEADER_BYTES:
+                raise HttpParseError("header block too large")
+            start = max(0, len(self.buf) - 3)
+            if not self._fill():
+                if self.buf:
+                    raise HttpParseError("connection closed inside header block")
+                return None
+
+    def read_line(self) -> bytes:
+        while True:
+            idx = self.buf.find(b"\r\n")
+            if idx >= 0:
+                line = bytes(self.buf[:idx + 2])
+                del self.buf[:idx + 2]
+                return line
+            if len(self.buf) > MAX_HEADER_BYTES or not self._fill():
+                raise HttpParseError("bad chunked framing")
+
+    def relay(self, n: int, dst: socket.socket) -> None:
+        """Send exactly n body bytes to dst."""
+        while n > 0:
+            if not self.buf and not self._fill():
+                raise HttpParseError("connection closed inside body")
+            chunk = self.buf[:n]
+            dst.sendall(chunk)
+            del self.buf[:len(chunk)]
+            n -= len(chunk)
+
+    def relay_until_close(self, dst: socket.socket) -> None:
+        if self.buf:
+            dst.sendall(self.buf)
+            self.buf.clear()
+        while True:
+            data = self._recv()
+            if not data:
+                return
+            dst.sendall(data)
+
+
+def parse_head(head: bytes) -> Tuple[List[bytes], Dict[str, str]]:
+    """Split a header block into start-line parts and a lower-cased header dict.
+
+    Repeated headers are joined with ", " (fine for the framing headers used here).
+    """
+    lines = head.split(b"\r\n")
+    start = lines[0].split(b" ", 2)
+    if len(start) < 3:
+        raise HttpParseError("bad start line")
+    headers: Dict[str, str] = {}
+    for line in lines[1:]:
+        if not line:
+            continue
+        name, sep, value = line.partition(b":")
+        if not sep:
+            raise HttpParseError("bad header line")
+        key = name.strip().decode("latin-1").lower()
+        value_s = value.strip().decode("latin-1")
+        headers[key] = f"{headers[key]}, {value_s}" if key in headers else value_s
+    return start, headers
+
+
+def _tokens(value: Optional[str]) -> List[str]:
+    return [t.strip().lower() for t in value.split(",")] if value else []
+
+
+def _rewrite_request_head(head: bytes, headers: Dict[str, str]) -> bytes:
+    """Drop hop-by-hop headers so the upstream connection stays reusable."""
+    drop = _HOP_BY_HOP | set(_tokens(headers.get("connection")))
+    lines = head.split(b"\r\n")
+    kept = [lines[0]]
+    for line in lines[1:]:
+        if not line:
+            continue
+        name = line.split(b":", 1)[0].strip().decode("latin-1").lower()
+        if name not in drop:
+            kept.append(line)
+    return b"\r\n".join(kept) + b"\r\n\r\n"
+
+
+def _relay_body(reader: _Reader, dst: socket.socket, headers: Dict[str, str]) -> None:
+    """Relay a Content-Length or chunked body (a request without either has none)."""
+    if "chunked" in _tokens(headers.get("transfer-encoding")):
+        while True:
+            line = reader.read_line()
+            dst.sendall(line)
+            size = int(line.split(b";", 1)[0].strip(), 16)
+            if size == 0:
+                # trailer section ends with an empty line
+                while True:
+                    trailer = reader.read_line()
+                    dst.sendall(trailer)
+                    if trailer == b"\r\n":
+                        return
+            reader.relay(size + 2, dst)
+    length = headers.get("content-length")
+    if length:
+        reader.relay(int(length.split(",")[0]), dst)
+
+
+class _Upgraded(Exception):
+    """Upstream answered 101 Switching Protocols; the connection becomes a tunnel."""
+
+
+class HttpForwarder(TcpForwarder):
+    """TcpForwarder that relays HTTP/1.1 requests over pooled upstream connections.
+
+    Each client connection is served request by request; upstream connections
+    come from `pool` (shared by every forwarder to the same target) and are
+    returned to it after a complete, keep-alive response.
+
+    With upstreams, every request picks a target from the group and uses that
+    target's pool, obtained from pool_for(address).
+
+    With limits.idle_timeout a keep-alive client that sends no new request,
+    or an upstream that stops answering, for that long is disconnected.
+    """
+
+    def __init__(
+        self,
+        listen: Tuple[str, int],
+        target: Tuple[str, int],
+        pool: Optional[UpstreamPool] = None,
+        buffer_size: int = 65536,
+        upstreams: Optional[UpstreamGroup] = None,
+        pool_for: Optional[Callable[[Tuple[str, int]], UpstreamPool]] = None,
+        limits: Optional[ConnectionLimits] = None,
+        reuse_port: bool = False,
+    ):
+        super().__init__(
+            listen, target, buffer_size=buffer_size, upstreams=upstreams, limits=limits, reuse_port=reuse_port
+        )
+        self.pool = pool if pool is not None else UpstreamPool(target)
+        self._pools: Dict[Tuple[str, int], UpstreamPool] = {target: self.pool}
+        self._pool_for = pool_for or self._own_pool
+
+    def _own_pool(self, address: Tuple[str, int]) -> UpstreamPool:
+        pool = self._pools.get(address)
+        if pool is None:
+            pool = self._pools[address] = UpstreamPool(address, self.pool.max_idle, self.pool.idle_timeout)
+        return pool
+
+    def _acquire(self, client_ip: Optional[str]) -> Tuple[socket.socket, bool, UpstreamPool, Optional[Upstream]]:
+        """(connection, reused, its pool, group member or None); fails over between group members."""
+        if self.upstreams is None:
+            sock, reused = self.pool.acquire()
+            return sock, reused, self.pool, None
+        tried: List[Upstream] = []
+        while True:
+            member = self.upstreams.pick(client_ip, exclude=tried)
+            if member is None:
+                if not tried and not self.upstreams.has_healthy():
+                    raise NoHealthyUpstream("no healthy upstream")
+                raise ConnectionError("no upstream available")
+            pool = self._pool_for(member.address)
+            try:
+                sock, reused = pool.acquire()
+            except OSError as e:
+                self.upstreams.release(member)
+                self.upstreams.mark_failed(member, e)
+                tried.append(member)
+                continue
+            self.upstreams.mark_ok(member)
+            return sock, reused, pool, member
+
+    def _tunnel(self, client: socket.socket, client_reader: _Reader, upstream: socket.socket, moved: List[int],
+                to_upstream: bytes = b"", to_client: bytes = b"") -> None:
+        """Raw bidirectional forwarding for upgraded or non-HTTP connections.
+
+        to_upstream / to_client are bytes already read from the other side;
+        the bytes piped each way are added to moved ([to upstream, to client]).
+        """
+        try:
+            if to_client:
+                client.sendall(to_client)
+            if to_upstream:
+                upstream.sendall(to_upstream)
+            if client_reader.buf:
+                upstream.sendall(client_reader.buf)
+                client_reader.buf.clear()
+        except OSError:
+            return
+        activity = self._idle_tracker(upstream)
+        received: List[int] = []
+        t = threading.Thread(target=lambda: received.append(self._pipe(client, upstream, activity)), daemon=True)
+        t.start()
+        moved[1] += self._pipe(upstream, client, activity)
+        t.join()
+        moved[0] += received[0] if received else 0
+        if activity is not None and activity.expired:
+            self.gate.count_idle_close()
+
+    def _exchange(self, upstream: socket.socket, up_reader: _Reader, client: socket.socket, client_reader: _Reader,
+                  method: bytes, head: bytes, headers: Dict[str, str]) -> Tuple[bool, bool]:
+        """Send one request and relay its response.
+
+        Returns (upstream_reusable, client_keepalive). Raises HttpParseError or
+        OSError if the exchange broke; ConnectionAbortedError if the upstream
+        closed before answering (a stale pooled connection).
+        """
+        upstream.sendall(_rewrite_request_head(head, headers))
+        _relay_body(client_reader, upstream, headers)
+        while True:
+            resp_head = up_reader.read_head()
+            if resp_head is None:
+                raise ConnectionAbortedError("upstream closed before responding")
+            (version, status, _reason), resp_headers = parse_head(resp_head)
+            code = int(status)
+            if code == 101:
+                client.sendall(resp_head)
+                raise _Upgraded()
+            client.sendall(resp_head)
+            if 100 <= code < 200:
+                continue
+            break
+        conn_tokens = _tokens(resp_headers.get("connection"))
+        reusable = version == b"HTTP/1.1" and "close" not in conn_tokens
+        te = _tokens(resp_headers.get("transfer-encoding"))
+        if method == b"HEAD" or code in (204, 304):
+            pass
+        elif (te and te[-1] == "chunked") or (not te and "content-length" in resp_headers):
+            _relay_body(up_reader, client, resp_headers)
+        else:
+            # delimited by connection close
+            up_reader.relay_until_close(client)
+            return False, False
+        return reusable, "close" not in conn_tokens
+
+    def _handle_client(self, client_sock: socket.socket):
+        # response head and body go out as separate small writes
+        client_sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        client_reader = _Reader(client_sock, self.buffer_size)
+        try:
+            client_ip: Optional[str] = client_sock.getpeername()[0]
+        except OSError:
+            client_ip = None
+        started = time.monotonic()
+        # bytes relayed outside client_reader: [piped to upstream, sent to client]
+        moved = [0, 0]
+        try:
+            while not self._stop.is_set():
+                try:
+                    head = client_reader.read_head()
+                except socket.timeout:
+                    self.gate.count_idle_close()
+                    return
+                except OSError:
+                    return
+                except HttpParseError:
+                    head = bytes(client_reader.buf)
+                    client_reader.buf.clear()
+                    self._fallback(client_sock, client_reader, head, moved)
+                    return
+                if head is None:
+                    return
+                try:
+                    (method, _path, version), headers = parse_head(head)
+                except HttpParseError:
+                    self._fallback(client_sock, client_reader, head, moved)
+                    return
+                if "upgrade" in headers or method == b"CONNECT":
+                    self._fallback(client_sock, client_reader, head, moved)
+                    return
+                conn_tokens = _tokens(headers.get("connection"))
+                if version == b"HTTP/1.1":
+                    client_keepalive = "close" not in conn_tokens
+                else:
+                    client_keepalive = "keep-alive" in conn_tokens
+                has_body = "transfer-encoding" in headers or "content-length" in headers
+                upstream_keepalive = self._forward_request(
+                    client_sock, client_reader, client_ip, method, head, headers, has_body, moved
+                )
+                if not (client_keepalive and upstream_keepalive):
+                    return
+        finally:
+            self.metrics.closed(client_reader.received + moved[0], moved[1], time.monotonic() - started)
+            try:
+                client_sock.close()
+            except Exception:
+                pass
+
+    def _forward_request(self, client_sock: socket.socket, client_reader: _Reader, client_ip: Optional[str],
+                         method: bytes, head: bytes, headers: Dict[str, str], has_body: bool,
+                         moved: List[int]) -> bool:
+        """Relay one request/response; True if the client connection may carry another request."""
+        # a stale pooled connection is retried once on a fresh one, but only for an
+        # idempotent request without a body when no response byte was read (and so
+        # none relayed to the client); anything else may already have taken effect
+        for attempt in (0, 1):
+            acquire_started = time.monotonic()
+            try:
+                upstream, reused, pool, member = self._acquire(client_ip)
+            except NoHealthyUpstream:
+                try:
+                    client_sock.sendall(_SERVICE_UNAVAILABLE)
+                except OSError:
+                    pass
+                return False
+            except OSError as e:
+                self.metrics.connect_failed()
+                logger.warning("Forward connect failed to %s:%d: %s", self.target_host, self.target_port, e)
+                return False
+            self.metrics.connected(time.monotonic() - acquire_started)
+            upstream.settimeout(self.limits.idle_timeout)
+            up_reader = _Reader(upstream, self.buffer_size, quickack=True)
+            try:
+                reusable, upstream_keepalive = self._exchange(
+                    upstream, up_reader, client_sock, client_reader, method, head, headers
+                )
+            except _Upgraded:
+                self._tunnel(client_sock, client_reader, upstream, moved, to_client=bytes(up_reader.buf))
+                upstream.close()
+                return False
+            except (ConnectionAbortedError, BrokenPipeError, ConnectionResetError):
+                upstream.close()
+                if (reused and attempt == 0 and not has_body and not up_reader.received
+                        and method in _RETRY_METHODS):
+                    continue
+                return False
+            except (HttpParseError, OSError, ValueError):
+                upstream.close()
+                return False
+            finally:
+                moved[1] += up_reader.received
+                if member is not None:
+                    self.upstreams.release(member)
+            if reusable and not up_reader.buf:
+                pool.release(upstream)
+            else:
+                upstream.close()
+            return upstream_keepalive
+        return False
+
+    def _fallback(self, client_sock: socket.socket, client_reader: _Reader, pending: bytes, moved: List[int]) -> None:
+        try:
+            upstream, member = self._connect_upstream(client_sock)
+        except NoHealthyUpstream:
+            return
+        except OSError as e:
+            self.metrics.connect_failed()
+            logger.warning("Forward connect failed to %s:%d: %s", self.target_host, self.target_port, e)
+            return
+        try:
+            self._tunnel(client_sock, client_reader, upstream, moved, to_upstream=pending)
+        finally:
+            upstream.close()
+            if member is not None:
+                self.upstreams.release(member)
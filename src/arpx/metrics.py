@@ -0,0 +1,283 @@
+"""Prometheus metrics for forwarders, TLS terminators and `arpx up`.
+
+Each forwarder or terminator owns a ListenerMetrics that is updated a few
+times per connection (connect, handshake, close); the pipes only sum bytes in
+local variables, so the per-chunk path carries no metric calls. Connection
+counts come from the listener's ConnectionGate when scraped.
+
+A MetricsRegistry holds collector callables returning metric families, and
+MetricsServer renders them in the Prometheus text format on /metrics.
+"""
+
+import bisect
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger("arpx.metrics")
+
+# seconds; upstream connects and TLS handshakes on a LAN
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# seconds; whole client connections
+DURATION_BUCKETS = (0.01, 0.05, 0.25, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = Dict[str, str]
+# (name, type, help, [(labels, value)]); a histogram value is a Histogram.snapshot() dict
+Family = Tuple[str, str, str, List[Tuple[Labels, object]]]
+
+
+class Histogram:
+    """Fixed-bucket histogram; not locked, the owner serialises observe()."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self) -> Dict[str, object]:
+        return {"bounds": self.bounds, "counts": list(self.counts), "sum": self.sum, "count": self.count}
+
+
+def _merge_histograms(a: Dict[str, object], b: Dict[str, object]) -> Dict[str, object]:
+    return {
+        "bounds": a["bounds"],
+        "counts": [x + y for x, y in zip(a["counts"], b["counts"])],
+        "sum": a["sum"] + b["sum"],
+        "count": a["count"] + b["count"],
+    }
+
+
+class ListenerMetrics:
+    """Byte counters and latency histograms of one forwarder or terminator."""
+
+    def __init__(self):
+        self.bytes_in = 0  # client -> upstream
+        self.bytes_out = 0  # upstream -> client
+        self.connect_errors = 0
+        self.connect_time = Histogram(LATENCY_BUCKETS)
+        self.handshake_time = Histogram(LATENCY_BUCKETS)
+        self.session_time = Histogram(DURATION_BUCKETS)
+        self._lock = threading.Lock()
+
+    def connected(self, seconds: float) -> None:
+        with self._lock:
+            self.connect_time.observe(seconds)
+
+    def connect_failed(self) -> None:
+        with self._lock:
+            self.connect_errors += 1
+
+    def handshake(self, seconds: float) -> None:
+        with self._lock:
+            self.handshake_time.observe(seconds)
+
+    def closed(self, bytes_in: int, bytes_out: int, seconds: float) -> None:
+        with self._lock:
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            self.session_time.observe(seconds)
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "connect_errors": self.connect_errors,
+                "connect_time": self.connect_time.snapshot(),
+                "handshake_time": self.handshake_time.snapshot(),
+                "session_time": self.session_time.snapshot(),
+            }
+
+
+# (snapshot key, metric name, type, help); gate counters are merged into listener snapshots
+_LISTENER_FAMILIES = (
+    ("active", "arpx_connections_active", "gauge", "Open client connections"),
+    ("accepted", "arpx_connections_accepted_total", "counter", "Client connections accepted"),
+    ("rejected", "arpx_connections_rejected_total", "counter", "Connections shed at max_connections"),
+    ("rejected_per_ip", "arpx_connections_rejected_per_ip_total", "counter", "Connections shed at max_per_ip"),
+    ("idle_closed", "arpx_connections_idle_closed_total", "counter", "Connections closed by idle_timeout"),
+    ("bytes_in", "arpx_bytes_received_total", "counter", "Bytes relayed from clients to upstreams"),
+    ("bytes_out", "arpx_bytes_sent_total", "counter", "Bytes relayed from upstreams to clients"),
+    ("connect_errors", "arpx_upstream_connect_errors_total", "counter", "Failed upstream connects"),
+    ("connect_time", "arpx_upstream_connect_seconds", "histogram", "Time to obtain an upstream connection"),
+    ("handshake_time", "arpx_tls_handshake_seconds", "histogram", "TLS handshake duration"),
+    ("session_time", "arpx_session_seconds", "histogram", "Client connection lifetime"),
+)
+
+
+def listener_families(snapshots: Iterable[Dict[str, object]]) -> List[Family]:
+    """Families for listener snapshots (managers' listener_metrics()).
+
+    Snapshots of the same kind and listener, e.g. from worker processes, are
+    added up.
+    """
+    merged: Dict[Tuple[str, str], Dict[str, object]] = {}
+    for snap in snapshots:
+        key = (str(snap["kind"]), str(snap["listener"]))
+        seen = merged.get(key)
+        if seen is None:
+            merged[key] = dict(snap)
+            continue
+        for field, _name, kind, _help in _LISTENER_FAMILIES:
+            if field not in snap:
+                continue
+            if kind == "histogram":
+                seen[field] = _merge_histograms(seen[field], snap[field])
+            else:
+                seen[field] = seen.get(field, 0) + snap[field]
+    families: List[Family] = []
+    for field, name, kind, help_text in _LISTENER_FAMILIES:
+        samples = [
+            ({"kind": k, "listener": listener, "target": str(snap.get("target", ""))}, snap[field])
+            for (k, listener), snap in sorted(merged.items())
+            if field in snap and not (field == "handshake_time" and k != "terminator")
+        ]
+        if samples:
+            families.append((name, kind, help_text, samples))
+    return families
+
+
+def network_families(net) -> List[Family]:
+    """Alias and ARP counters of a NetworkVisibleManager (arpx up and compose)."""
+    labels = {"interface": str(net.interface)}
+    families: List[Family] = [
+        ("arpx_alias_addresses", "gauge", "Virtual IP aliases configured", [(labels, len(net.virtual_ips))]),
+    ]
+    if net.announcer is not None:
+        stats = net.announcer.stats()
+        families.append(("arpx_arp_frames_sent_total", "counter", "Gratuitous ARP frames sent", [(labels, stats["frames_sent"])]))
+        families.append(("arpx_arp_send_errors_total", "counter", "Gratuitous ARP frames that failed to send", [(labels, stats["send_errors"])]))
+    if net.responder is not None:
+        families.append(("arpx_arp_requests_seen_total", "counter", "ARP requests for alias IPs seen", [(labels, net.responder.requests_seen)]))
+        families.append(("arpx_arp_replies_sent_total", "counter", "ARP replies sent for alias IPs", [(labels, net.responder.replies_sent)]))
+    return families
+
+
+def health_families(health) -> List[Family]:
+    """Per-target health of a HealthChecker as a 0/1 gauge."""
+    samples = [({"target": str(s["target"])}, 1 if s["healthy"] else 0) for s in health.stats()]
+    if not samples:
+        return []
+    return [("arpx_upstream_healthy", "gauge", "Whether an upstream target passes its health checks", samples)]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels.items())
+    if extra is not None:
+        items.append(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in items) + "}"
+
+
+def _number(value) -> str:
+    if isinstance(value, float):
+        if value == float("inf"):
+            return "+Inf"
+        return repr(value)
+    return str(int(value))
+
+
+def render(families: Iterable[Family]) -> str:
+    """Prometheus text exposition format (version 0.0.4)."""
+    lines: List[str] = []
+    for name, kind, help_text, samples in families:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            if kind != "histogram":
+                lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(list(value["bounds"]) + [float("inf")], value["counts"]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels, ('le', _number(float(bound))))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(float(value['sum']))}")
+            lines.append(f"{name}_count{_labels(labels)} {value['count']}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsRegistry:
+    """Collectors (callables returning families) rendered together on each scrape."""
+
+    def __init__(self):
+        self._collectors: List[Callable[[], Iterable[Family]]] = []
+
+    def register(self, collector: Callable[[], Iterable[Family]]) -> None:
+        self._collectors.append(collector)
+
+    def collect(self) -> List[Family]:
+        families: List[Family] = []
+        for collector in self._collectors:
+            try:
+                families.extend(collector())
+            except Exception as e:
+                logger.debug("Metrics collector failed: %s", e)
+        return families
+
+    def render(self) -> str:
+        return render(self.collect())
+
+
+class MetricsServer:
+    """Serve a registry on http://host:port/metrics from a background thread."""
+
+    def __init__(self, registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9464):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._server is not None:
+            return
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((self.host, self.port), Handler)
+        server.daemon_threads = True
+        self._server = server
+        self.port = server.server_address[1]
+        self._thread = threading.Thread(target=server.serve_forever, name="arpx-metrics", daemon=True)
+        self._thread.start()
+        logger.info("Metrics at http://%s:%d/metrics", self.host, self.port)
+
+    def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
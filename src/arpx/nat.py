@@ -0,0 +1,207 @@
+"""Kernel fast path: nftables DNAT from alias IPs to backends.
+
+Instead of a userspace forwarder per port, NftablesNat programs one nftables
+table per bridge in which alias_ip:port is DNATed to the backend(s) and,
+optionally, masqueraded on the way out, so forwarded bytes never reach
+Python. The whole table is (re)written in one `nft -f` transaction.
+
+Backends must be reachable addresses other than loopback (e.g. container
+IPs); the kernel does not route LAN traffic DNATed to 127.0.0.1. Several
+backends of one port are spread with numgen (round-robin) or jhash of the
+client address (hash).
+
+Every rule carries the table's comment tag; cleanup() deletes exactly the
+rules with that tag, and the table itself only when nothing else was added
+to it.
+"""
+
+import ipaddress
+import json
+import logging
+import shutil
+import subprocess
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+logger = logging.getLogger("arpx.nat")
+
+IP_FORWARD = Path("/proc/sys/net/ipv4/ip_forward")
+
+
+@dataclass
+class NatMapping:
+    """alias_ip:port DNATed to backends; policy is a balancer policy name."""
+
+    alias_ip: str
+    port: int
+    backends: List[Tuple[str, int]] = field(default_factory=list)
+    policy: str = "round-robin"
+
+
+def kernel_routable(host: str) -> bool:
+    """True for addresses a DNATed LAN connection can be sent to (not loopback or unspecified)."""
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return address.version == 4 and not (address.is_loopback or address.is_unspecified)
+
+
+class NftablesNat:
+    """DNAT/masquerade rules of one bridge in a dedicated nftables table."""
+
+    def __init__(self, table: str = "arpx", masquerade: bool = True, nft: str = "nft"):
+        self.table = table
+        self.masquerade = masquerade
+        self.nft = nft
+        self.tag = f"arpx:{table}"
+        self.mappings: List[NatMapping] = []
+
+    @staticmethod
+    def available(nft: str = "nft") -> bool:
+        return shutil.which(nft) is not None
+
+    def _dispatch(self, index: int, mapping: NatMapping) -> Tuple[List[str], List[str]]:
+        """Rules of one mapping in the services chain, plus per-backend chains when there are several."""
+        match = f"ip daddr {mapping.alias_ip} tcp dport {mapping.port}"
+        comment = f'comment "{self.tag}"'
+        if len(mapping.backends) == 1:
+            host, port = mapping.backends[0]
+            return [f"\t\t{match} dnat to {host}:{port} {comment}"], []
+        if mapping.policy == "hash":
+            selector = f"jhash ip saddr mod {len(mapping.backends)}"
+        else:
+            if mapping.policy != "round-robin":
+                logger.info("Kernel NAT for %s:%d: %s is not available, using round-robin", mapping.alias_ip, mapping.port, mapping.policy)
+            selector = f"numgen inc mod {len(mapping.backends)}"
+        chains = []
+        verdicts = []
+        for j, (host, port) in enumerate(mapping.backends):
+            name = f"svc{index}_{j}"
+            chains.append(f"\tchain {name} {{\n\t\tdnat to {host}:{port} {comment}\n\t}}")
+            verdicts.append(f"{j} : jump {name}")
+        return [f"\t\t{match} {selector} vmap {{ {', '.join(verdicts)} }} {comment}"], chains
+
+    def ruleset(self, mappings: Sequence[NatMapping]) -> str:
+        """nft script replacing the table with rules for mappings, applied as one transaction."""
+        rules: List[str] = []
+        chains: List[str] = []
+        for i, mapping in enumerate(mappings):
+            mapping_rules, mapping_chains = self._dispatch(i, mapping)
+            rules += mapping_rules
+            chains += mapping_chains
+        comment = f'comment "{self.tag}"'
+        lines = [
+            # "add" makes the following "delete" valid when the table does not exist yet
+            f"add table ip {self.table}",
+            f"delete table ip {self.table}",
+            f"table ip {self.table} {{",
+            "\tchain services {",
+            *rules,
+            "\t}",
+            *chains,
+            "\tchain prerouting {",
+            "\t\ttype nat hook prerouting priority -100; policy accept;",
+            f"\t\tjump services {comment}",
+            "\t}",
+            # connections opened on this host to an alias IP
+            "\tchain output {",
+            "\t\ttype nat hook output priority -100; policy accept;",
+            f"\t\tjump services {comment}",
+            "\t}",
+        ]
+        if self.masquerade:
+            aliases = ", ".join(sorted({m.alias_ip for m in mappings}))
+            lines += [
+                "\tchain postrouting {",
+                "\t\ttype nat hook postrouting priority 100; policy accept;",
+                f"\t\tct status dnat ct original ip daddr {{ {aliases} }} masquerade {comment}",
+                "\t}",
+            ]
+        lines.append("}")
+        return "\n".join(lines) + "\n"
+
+    def _run(self, *args: str, script: Optional[str] = None) -> subprocess.CompletedProcess:
+        return subprocess.run([self.nft, *args], input=script, capture_output=True, text=True, timeout=15)
+
+    def apply(self, mappings: Sequence[NatMapping]) -> bool:
+        """Atomically replace the table with mappings; False (nothing changed) on failure."""
+        mappings = list(mappings)
+        for m in mappings:
+            bad = [host for host, _port in m.backends if not kernel_routable(host)]
+            if not m.backends or bad:
+                raise ValueError(f"Kernel NAT for {m.alias_ip}:{m.port} needs non-loopback IPv4 backends, got {m.backends}")
+        if not mappings:
+            return True
+        try:
+            result = self._run("-f", "-", script=self.ruleset(mappings))
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logger.warning("nft failed: %s", e)
+            return False
+        if result.returncode != 0:
+            logger.warning("nft rejected the NAT ruleset of table %s: %s", self.table, result.stderr.strip())
+            return False
+        self.mappings = mappings
+        try:
+            if IP_FORWARD.read_text().strip() != "1":
+                logger.warning("net.ipv4.ip_forward is 0; DNATed connections to other hosts or containers will not be routed")
+        except OSError:
+            pass
+        logger.info("Kernel NAT: %d port mapping(s) in nftables table ip %s", len(mappings), self.table)
+        return True
+
+    def _listed_rules(self) -> Optional[List[dict]]:
+        """Rules currently in the table (nft JSON objects), or None when the table does not exist.
+
+        Raises OSError when nft cannot be run or cannot list the table.
+        """
+        try:
+            result = self._run("-j", "-a", "list", "table", "ip", self.table)
+        except FileNotFoundError:
+            # without nft no table can have been programmed
+            return None
+        except subprocess.TimeoutExpired as e:
+            raise OSError(f"nft timed out: {e}") from e
+        if result.returncode != 0:
+            if "No such file or directory" in result.stderr:
+                return None
+            raise OSError(result.stderr.strip() or f"nft exited with {result.returncode}")
+        try:
+            listed = json.loads(result.stdout).get("nftables", [])
+        except ValueError as e:
+            raise OSError(f"unreadable nft output: {e}") from e
+        return [item["rule"] for item in listed if "rule" in item]
+
+    def cleanup(self) -> bool:
+        """Delete the rules tagged by this table, and the table when no foreign rules remain.
+
+        Returns False when the rules may still be there (nft failed).
+        """
+        try:
+            rules = self._listed_rules()
+        except OSError as e:
+            logger.warning("Could not list kernel NAT table %s: %s", self.table, e)
+            return False
+        if rules is None:
+            self.mappings = []
+            return True
+        ours = [r for r in rules if r.get("comment") == self.tag]
+        foreign = len(rules) - len(ours)
+        if foreign:
+            commands = [f"delete rule ip {self.table} {r['chain']} handle {r['handle']}" for r in ours]
+            logger.warning("Table ip %s has %d rule(s) not created by arpx; keeping the table", self.table, foreign)
+        else:
+            commands = [f"delete table ip {self.table}"]
+        if commands:
+            try:
+                result = self._run("-f", "-", script="\n".join(commands) + "\n")
+            except (OSError, subprocess.TimeoutExpired) as e:
+                logger.warning("nft failed: %s", e)
+                return False
+            if result.returncode != 0:
+                logger.warning("Failed to remove kernel NAT rules of table %s: %s", self.table, result.stderr.strip())
+                return False
+        logger.info("Kernel NAT: removed %d rule(s) from table ip %s", len(ours), self.table)
+        self.mappings = []
+        return True
@@ -0,0 +1,323 @@
+"""Minimal pure-Python rtnetlink client (Linux).
+
+Covers what NetworkVisibleManager needs without spawning `ip`/`arp`:
+address add/delete, neighbour add/delete, link and address dumps and the
+default route lookup. Requests can be batched: several messages go out in a
+single send() and their ACKs are collected together.
+"""
+
+import ipaddress
+import logging
+import os
+import select
+import socket
+import struct
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger("arpx.netlink")
+
+NETLINK_ROUTE = 0
+
+# message types <linux/rtnetlink.h>
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+RTM_NEWLINK = 16
+RTM_DELLINK = 17
+RTM_GETLINK = 18
+RTM_NEWADDR = 20
+RTM_DELADDR = 21
+RTM_GETADDR = 22
+RTM_NEWROUTE = 24
+RTM_GETROUTE = 26
+RTM_NEWNEIGH = 28
+RTM_DELNEIGH = 29
+
+# flags <linux/netlink.h>
+NLM_F_REQUEST = 0x1
+NLM_F_MULTI = 0x2
+NLM_F_ACK = 0x4
+NLM_F_DUMP = 0x300
+NLM_F_REPLACE = 0x100
+NLM_F_EXCL = 0x200
+NLM_F_CREATE = 0x400
+
+# multicast groups (legacy bitmask form, for bind())
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+
+# attributes
+IFLA_ADDRESS = 1
+IFLA_IFNAME = 3
+IFA_ADDRESS = 1
+IFA_LOCAL = 2
+IFA_LABEL = 3
+IFA_BROADCAST = 4
+NDA_DST = 1
+NDA_LLADDR = 2
+RTA_DST = 1
+RTA_OIF = 4
+
+IFA_F_SECONDARY = 0x01
+NUD_PERMANENT = 0x80
+RT_TABLE_MAIN = 254
+RT_SCOPE_UNIVERSE = 0
+
+_NLMSGHDR = struct.Struct("=IHHII")      # len, type, flags, seq, pid
+_IFINFOMSG = struct.Struct("=BxHiII")    # family, type, index, flags, change
+_IFADDRMSG = struct.Struct("=BBBBI")     # family, prefixlen, flags, scope, index
+_NDMSG = struct.Struct("=BxxxiHBB")      # family, ifindex, state, flags, type
+_RTMSG = struct.Struct("=BBBBBBBBI")     # family, dst_len, src_len, tos, table, protocol, scope, type, flags
+_RTATTR = struct.Struct("=HH")           # len, type
+_NLMSGERR = struct.Struct("=i")
+
+
+def _align(n: int) -> int:
+    return (n + 3) & ~3
+
+
+def pack_attr(attr_type: int, data: bytes) -> bytes:
+    length = _RTATTR.size + len(data)
+    return _RTATTR.pack(length, attr_type) + data + b"\0" * (_align(length) - length)
+
+
+def parse_attrs(data: bytes, offset: int = 0) -> Dict[int, bytes]:
+    attrs: Dict[int, bytes] = {}
+    while offset + _RTATTR.size <= len(data):
+        length, attr_type = _RTATTR.unpack_from(data, offset)
+        if length < _RTATTR.size:
+            break
+        attrs[attr_type & 0x3FFF] = data[offset + _RTATTR.size:offset + length]
+        offset += _align(length)
+    return attrs
+
+
+def iter_messages(data: bytes) -> Iterator[Tuple[int, int, int, bytes]]:
+    """Yield (type, flags, seq, payload) for every netlink message in data."""
+    offset = 0
+    while offset + _NLMSGHDR.size <= len(data):
+        length, msg_type, flags, seq, _pid = _NLMSGHDR.unpack_from(data, offset)
+        if length < _NLMSGHDR.size:
+            break
+        yield msg_type, flags, seq, data[offset + _NLMSGHDR.size:offset + length]
+        offset += _align(length)
+
+
+@dataclass
+class NetlinkMessage:
+    """An rtnetlink request that has not been sent yet."""
+
+    msg_type: int
+    flags: int
+    body: bytes
+
+    def encode(self, seq: int) -> bytes:
+        return _NLMSGHDR.pack(_NLMSGHDR.size + len(self.body), self.msg_type, self.flags, seq, 0) + self.body
+
+
+@dataclass
+class LinkInfo:
+    index: int
+    name: str
+    mac: Optional[str]
+
+
+@dataclass
+class AddressInfo:
+    index: int
+    address: str
+    prefixlen: int
+    label: Optional[str] = None
+    broadcast: Optional[str] = None
+
+
+def _mac_bytes(mac: str) -> bytes:
+    return bytes(int(part, 16) for part in mac.split(":"))
+
+
+def _mac_str(raw: bytes) -> str:
+    return ":".join(f"{b:02x}" for b in raw)
+
+
+def address_message(
+    add: bool,
+    index: int,
+    ip: str,
+    prefixlen: int,
+    label: Optional[str] = None,
+) -> NetlinkMessage:
+    """RTM_NEWADDR / RTM_DELADDR for an IPv4 address (broadcast derived from prefix)."""
+    packed = socket.inet_aton(ip)
+    body = _IFADDRMSG.pack(socket.AF_INET, prefixlen, 0, RT_SCOPE_UNIVERSE, index)
+    body += pack_attr(IFA_LOCAL, packed) + pack_attr(IFA_ADDRESS, packed)
+    if add:
+        if prefixlen < 31:
+            net = ipaddress.IPv4Network(f"{ip}/{prefixlen}", strict=False)
+            body += pack_attr(IFA_BROADCAST, net.broadcast_address.packed)
+        if label:
+            body += pack_attr(IFA_LABEL, label.encode()[:15] + b"\0")
+        return NetlinkMessage(RTM_NEWADDR, NLM_F_REQUEST | NLM_F_ACK | NLM_F_CREATE | NLM_F_EXCL, body)
+    return NetlinkMessage(RTM_DELADDR, NLM_F_REQUEST | NLM_F_ACK, body)
+
+
+def neighbor_message(add: bool, index: int, ip: str, mac: Optional[str] = None) -> NetlinkMessage:
+    """RTM_NEWNEIGH (permanent, replacing any entry) / RTM_DELNEIGH for an IPv4 neighbour."""
+    body = _NDMSG.pack(socket.AF_INET, index, NUD_PERMANENT if add else 0, 0, 0)
+    body += pack_attr(NDA_DST, socket.inet_aton(ip))
+    if add:
+        if mac:
+            body += pack_attr(NDA_LLADDR, _mac_bytes(mac))
+        return NetlinkMessage(RTM_NEWNEIGH, NLM_F_REQUEST | NLM_F_ACK | NLM_F_CREATE | NLM_F_REPLACE, body)
+    return NetlinkMessage(RTM_DELNEIGH, NLM_F_REQUEST | NLM_F_ACK, body)
+
+
+def change_event_index(msg_type: int, payload: bytes) -> Optional[int]:
+    """Interface index affected by a link or primary-address notification.
+
+    Returns None for anything else, including secondary addresses (aliases
+    added next to the primary address), which do not change an interface's
+    MAC or network details.
+    """
+    if msg_type in (RTM_NEWLINK, RTM_DELLINK) and len(payload) >= _IFINFOMSG.size:
+        return _IFINFOMSG.unpack_from(payload)[2]
+    if msg_type in (RTM_NEWADDR, RTM_DELADDR) and len(payload) >= _IFADDRMSG.size:
+        family, _prefixlen, flags, _scope, index = _IFADDRMSG.unpack_from(payload)
+        if family == socket.AF_INET and not flags & IFA_F_SECONDARY:
+            return index
+    return None
+
+
+class NetlinkRoute:
+    """rtnetlink socket with batched requests and dumps."""
+
+    def __init__(self, groups: int = 0):
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+        self.sock.bind((0, groups))
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        self.sock.close()
+
+    def __enter__(self) -> "NetlinkRoute":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _next_seq(self) -> int:
+        self._seq = (self._seq + 1) & 0xFFFFFFFF
+        return self._seq
+
+    def execute(self, messages: Sequence[NetlinkMessage]) -> List[Optional[OSError]]:
+        """Send messages in one batch and return one result per message (None = success)."""
+        if not messages:
+            return []
+        with self._lock:
+            seqs = [self._next_seq() for _ in messages]
+            self.sock.send(b"".join(m.encode(seq) for m, seq in zip(messages, seqs)))
+            results: Dict[int, Optional[OSError]] = {}
+            pending = set(seqs)
+            while pending:
+                data = self.sock.recv(65536)
+                for msg_type, _flags, seq, payload in iter_messages(data):
+                    if msg_type != NLMSG_ERROR or seq not in pending:
+                        continue
+                    (code,) = _NLMSGERR.unpack_from(payload)
+                    results[seq] = OSError(-code, os.strerror(-code)) if code else None
+                    pending.discard(seq)
+        return [results[seq] for seq in seqs]
+
+    def events(self, timeout: Optional[float] = None) -> List[Tuple[int, bytes]]:
+        """Wait up to timeout for multicast notifications (needs groups) and return (type, payload)."""
+        ready, _w, _x = select.select([self.sock], [], [], timeout)
+        if not ready:
+            return []
+        data = self.sock.recv(65536)
+        return [(msg_type, payload) for msg_type, _flags, _seq, payload in iter_messages(data)]
+
+    def request(self, message: NetlinkMessage) -> None:
+        """Send one message and raise OSError if the kernel rejects it."""
+        err = self.execute([message])[0]
+        if err is not None:
+            raise err
+
+    def dump(self, msg_type: int, body: bytes) -> List[Tuple[int, bytes]]:
+        """Run an NLM_F_DUMP request and return (type, payload) of every reply."""
+        out: List[Tuple[int, bytes]] = []
+        with self._lock:
+            seq = self._next_seq()
+            self.sock.send(NetlinkMessage(msg_type, NLM_F_REQUEST | NLM_F_DUMP, body).encode(seq))
+            while True:
+                data = self.sock.recv(65536)
+                for reply_type, _flags, reply_seq, payload in iter_messages(data):
+                    if reply_seq != seq:
+                        continue
+                    if reply_type == NLMSG_DONE:
+                        return out
+                    if reply_type == NLMSG_ERROR:
+                        (code,) = _NLMSGERR.unpack_from(payload)
+                        if code:
+                            raise OSError(-code, os.strerror(-code))
+                        return out
+                    out.append((reply_type, payload))
+
+    # -----------------
+    # Queries
+    # -----------------
+    def links(self) -> List[LinkInfo]:
+        result = []
+        for msg_type, payload in self.dump(RTM_GETLINK, _IFINFOMSG.pack(socket.AF_UNSPEC, 0, 0, 0, 0)):
+            if msg_type != RTM_NEWLINK:
+                continue
+            _family, _type, index, _flags, _change = _IFINFOMSG.unpack_from(payload)
+            attrs = parse_attrs(payload, _IFINFOMSG.size)
+            name = attrs.get(IFLA_IFNAME, b"").rstrip(b"\0").decode()
+            mac = attrs.get(IFLA_ADDRESS)
+            result.append(LinkInfo(index, name, _mac_str(mac) if mac and len(mac) == 6 else None))
+        return result
+
+    def link_mac(self, interface: str) -> Optional[str]:
+        for link in self.links():
+            if link.name == interface:
+                return link.mac
+        return None
+
+    def addresses(self, index: Optional[int] = None) -> List[AddressInfo]:
+        result = []
+        for msg_type, payload in self.dump(RTM_GETADDR, _IFADDRMSG.pack(socket.AF_INET, 0, 0, 0, 0)):
+            if msg_type != RTM_NEWADDR:
+                continue
+            family, prefixlen, _flags, _scope, ifindex = _IFADDRMSG.unpack_from(payload)
+            if family != socket.AF_INET or (index is not None and ifindex != index):
+                continue
+            attrs = parse_attrs(payload, _IFADDRMSG.size)
+            local = attrs.get(IFA_LOCAL) or attrs.get(IFA_ADDRESS)
+            if not local:
+                continue
+            label = attrs.get(IFA_LABEL)
+            brd = attrs.get(IFA_BROADCAST)
+            result.append(AddressInfo(
+                ifindex,
+                socket.inet_ntoa(local),
+                prefixlen,
+                label.rstrip(b"\0").decode() if label else None,
+                socket.inet_ntoa(brd) if brd else None,
+            ))
+        return result
+
+    def default_route_interface(self) -> Optional[str]:
+        """Name of the interface carrying the IPv4 default route in the main table."""
+        body = _RTMSG.pack(socket.AF_INET, 0, 0, 0, 0, 0, 0, 0, 0)
+        for msg_type, payload in self.dump(RTM_GETROUTE, body):
+            if msg_type != RTM_NEWROUTE:
+                continue
+            _family, dst_len, _src_len, _tos, table, _proto, _scope, _type, _flags = _RTMSG.unpack_from(payload)
+            if dst_len != 0 or table != RT_TABLE_MAIN:
+                continue
+            oif = parse_attrs(payload, _RTMSG.size).get(RTA_OIF)
+            if oif:
+                return socket.if_indextoname(struct.unpack("=I", oif)[0])
+        return None
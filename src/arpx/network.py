@@ -1,26 +1,234 @@
 import os
 import sys
+import socket
+import struct
 import subprocess
 import ipaddress
+import math
+import select
+import re
+import threading
 import time
 import logging
-from typing import List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Tuple
 
+from .arp import ETH_P_ARP, ArpAnnouncer, ArpScanner, interface_mac, is_local_address, mac_to_bytes, open_arp_socket
+from .firewall import Firewall
+from .netlink import (
+    RTMGRP_IPV4_IFADDR,
+    RTMGRP_LINK,
+    NetlinkRoute,
+    address_message,
+    change_event_index,
+    neighbor_message,
+)
+
+if TYPE_CHECKING:
+    from .state import StateJournal
 
 logger = logging.getLogger("arpx.network")
 
+# Free-IP discovery: per-address ping/arping subprocesses, or one raw-socket ARP sweep
+PROBE_METHODS = ("ping", "arp")
+ARP_SWEEP_CHUNK = 256
+
+# Address/neighbour/link operations: `ip`/`arp` shell pipelines or rtnetlink messages
+BACKENDS = ("shell", "netlink")
+
+# Who answers ARP for the aliases: the kernel via interface-wide proxy_arp, or ArpResponder
+ARP_MODES = ("proxy", "responder")
+
+# Interface MAC/addresses are re-read at most this often unless a change event invalidates them
+SNAPSHOT_TTL = 300.0
+
+
+@dataclass
+class InterfaceSnapshot:
+    """MAC and primary IPv4 details of an interface at one point in time."""
+
+    mac: Optional[str]
+    ip: Optional[str]
+    network: Optional[str]
+    cidr: Optional[str]
+    broadcast: Optional[str]
+    taken_at: float
+
+    @property
+    def details(self) -> Tuple[Optional[str], Optional[str], Optional[str], Optional[str]]:
+        return self.ip, self.network, self.cidr, self.broadcast
+
+
+# offsets into an Ethernet + ARP frame
+_ARP_REQUEST_HEAD = struct.pack("!HHHBBH", ETH_P_ARP, 1, 0x0800, 6, 4, 1)  # ethertype .. op, bytes 12:22
+_ARP_REPLY_HEAD = struct.pack("!HHHBBH", ETH_P_ARP, 1, 0x0800, 6, 4, 2)
+_SHA, _SPA, _TPA = slice(22, 28), slice(28, 32), slice(38, 42)
+
+
+class ArpResponder:
+    """Answer ARP who-has for a managed set of alias IPs from userspace.
+
+    Replaces interface-wide proxy_arp: only requests whose target is in the
+    table are answered. The table maps the packed target IPv4 address to the
+    pre-built sender part of the reply (our MAC + alias IP), so a request costs
+    one dict lookup and one bytes join regardless of how many aliases exist.
+    """
+
+    def __init__(self, interface: str, mac: Optional[bytes] = None):
+        self.interface = interface
+        self.mac = mac
+        self.requests_seen = 0
+        self.replies_sent = 0
+        self._table: Dict[bytes, bytes] = {}
+        self._sock = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def add(self, ips: Iterable[str]) -> None:
+        mac = self.mac or interface_mac(self.interface)
+        self.mac = mac
+        # single-key dict stores are atomic, so the serving thread needs no lock
+        for ip in ips:
+            packed = socket.inet_aton(ip)
+            self._table[packed] = mac + packed
+
+    def remove(self, ips: Iterable[str]) -> None:
+        for ip in ips:
+            self._table.pop(socket.inet_aton(ip), None)
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def reply_for(self, frame: bytes) -> Optional[bytes]:
+        """ARP reply to frame if it is a who-has for one of our aliases, else None."""
+        if frame[12:22] != _ARP_REQUEST_HEAD:
+            return None
+        tpa = frame[_TPA]
+        sender = self._table.get(tpa)
+        if sender is None or frame[_SPA] == tpa:
+            # not ours, or a gratuitous announcement
+            return None
+        sha = frame[_SHA]
+        return b"".join((sha, self.mac, _ARP_REPLY_HEAD, sender, sha, frame[_SPA]))
+
+    def _open_socket(self):
+        return open_arp_socket(self.interface)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        if self.mac is None:
+            self.mac = interface_mac(self.interface)
+        self._sock = self._open_socket()
+        self._sock.setblocking(False)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._serve, name="arpx-arp-responder", daemon=True)
+        self._thread.start()
+
+    def _serve(self) -> None:
+        sock = self._sock
+        while not self._stop.is_set():
+            ready, _w, _x = select.select([sock], [], [], 0.5)
+            if not ready:
+                continue
+            # drain everything queued: storms arrive in bursts
+            while True:
+                try:
+                    frame = sock.recv(2048)
+                except (BlockingIOError, InterruptedError):
+                    break
+                except OSError:
+                    return
+                self.requests_seen += 1
+                reply = self.reply_for(frame)
+                if reply is not None:
+                    try:
+                        sock.send(reply)
+                        self.replies_sent += 1
+                    except OSError as e:
+                        logger.debug("ARP reply failed on %s: %s", self.interface, e)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
 
 class NetworkVisibleManager:
     """Manage virtual IPs that are visible across the LAN.
 
     Mirrors functionality from `network-visible-script.py` but packaged for reuse.
     Requires root privileges for all operations that change network state.
+
+    backend="netlink" performs address, neighbour and link operations with
+    rtnetlink messages (see arpx.netlink) instead of spawning `ip`/`arp`.
+
+    arp_mode="responder" answers ARP for the aliases with an ArpResponder
+    instead of enabling proxy_arp (and ip_forward) on the whole interface.
+
+    The interface MAC and network details are cached in an InterfaceSnapshot
+    for snapshot_ttl seconds; watch_changes() additionally drops the cache as
+    soon as the kernel reports a link or primary-address change.
+
+    Firewall rules opening alias ports are kept in a Firewall (arpx.firewall)
+    with firewall_backend, in dedicated chains removed again by cleanup().
+
+    With a StateJournal (arpx.state) aliases are recorded before they are
+    added and forgotten once removed, so a killed process can be cleaned up
+    after.
     """
 
-    def __init__(self, interface: str = "eth0"):
+    def __init__(
+        self,
+        interface: str = "eth0",
+        backend: str = "shell",
+        snapshot_ttl: float = SNAPSHOT_TTL,
+        arp_mode: str = "proxy",
+        firewall_backend: str = "auto",
+        journal: Optional["StateJournal"] = None,
+    ):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown network backend: {backend}")
+        if arp_mode not in ARP_MODES:
+            raise ValueError(f"Unknown ARP mode: {arp_mode}")
+        self.arp_mode = arp_mode
+        self.responder: Optional[ArpResponder] = None
         self.interface = interface
+        self.backend = backend
         self.virtual_ips: List[Tuple[str, str, str]] = []  # (ip, label, cidr)
         self.arp_announced: List[str] = []
+        self._nl: Optional[NetlinkRoute] = None
+        self.snapshot_ttl = snapshot_ttl
+        self._snapshot: Optional[InterfaceSnapshot] = None
+        self._snapshot_lock = threading.Lock()
+        self._watch_thread: Optional[threading.Thread] = None
+        self._watch_stop = threading.Event()
+        # set by the watcher; refresh_neighbors() then checks the MAC the entries were set with
+        self._link_changed = threading.Event()
+        self._neighbor_mac: Optional[str] = None
+        self.announcer: Optional[ArpAnnouncer] = None
+        self.firewall = Firewall(firewall_backend)
+        self.journal = journal
+        if journal is not None:
+            backend_name = self.firewall.backend.name if self.firewall.backend is not None else "none"
+            journal.describe(
+                interface=interface, net_backend=backend,
+                firewall={"backend": backend_name, "chain": self.firewall.chain},
+            )
+
+    @property
+    def netlink(self) -> NetlinkRoute:
+        if self._nl is None:
+            self._nl = NetlinkRoute()
+        return self._nl
+
+    def _ifindex(self) -> int:
+        return socket.if_nametoindex(self.interface)
 
     # -----------------
     # Privileges
@@ -35,10 +243,14 @@ class NetworkVisibleManager:
     # Introspection
     # -----------------
     @staticmethod
-    def auto_detect_interface() -> str:
+    def auto_detect_interface(backend: str = "shell") -> str:
         try:
-            cmd = "ip route | grep default | awk '{print $5}' | head -1"
-            iface = subprocess.check_output(cmd, shell=True).decode().strip()
+            if backend == "netlink":
+                with NetlinkRoute() as nl:
+                    iface = nl.default_route_interface() or ""
+            else:
+                cmd = "ip route | grep default | awk '{print $5}' | head -1"
+                iface = subprocess.check_output(cmd, shell=True).decode().strip()
             detected = iface or "eth0"
             logger.debug("Auto-detected interface: %s", detected)
             return detected
@@ -48,83 +260,322 @@ class NetworkVisibleManager:
 
     def get_network_details(self) -> Tuple[Optional[str], Optional[str], Optional[str], Optional[str]]:
         """Return (ip, network_base, cidr, broadcast) for the interface."""
-        try:
-            cmd = f"ip addr show {self.interface}"
-            result = subprocess.check_output(cmd, shell=True).decode()
+        return self.snapshot().details
 
-            import re
+    def snapshot(self, refresh: bool = False) -> InterfaceSnapshot:
+        """Cached interface snapshot; re-read when older than snapshot_ttl or invalidated."""
+        with self._snapshot_lock:
+            snap = self._snapshot
+            if refresh or snap is None or time.monotonic() - snap.taken_at >= self.snapshot_ttl:
+                snap = self._read_snapshot()
+                # a failed read is not cached so the next call retries
+                self._snapshot = snap if (snap.mac or snap.ip) else None
+            return snap
 
-            ip_pattern = r"inet (\d+\.\d+\.\d+\.\d+)/(\d+)"
-            match = re.search(ip_pattern, result)
+    def invalidate_snapshot(self) -> None:
+        with self._snapshot_lock:
+            self._snapshot = None
 
+    def _read_snapshot(self) -> InterfaceSnapshot:
+        if self.backend == "netlink":
+            return self._read_snapshot_netlink()
+        mac = ip = cidr = None
+        try:
+            # one `ip addr show` carries both the link/ether line and the inet lines
+            result = subprocess.check_output(f"ip addr show {self.interface}", shell=True).decode()
+            mac_match = re.search(r"link/ether ([0-9a-fA-F:]{17})", result)
+            mac = mac_match.group(1) if mac_match else None
+            match = re.search(r"inet (\d+\.\d+\.\d+\.\d+)/(\d+)", result)
             if match:
-                ip = match.group(1)
-                cidr = match.group(2)
-                network = ipaddress.IPv4Network(f"{ip}/{cidr}", strict=False)
-                logger.debug(
-                    "Interface %s -> ip=%s/%s net=%s broadcast=%s",
-                    self.interface,
-                    ip,
-                    cidr,
-                    network.network_address,
-                    network.broadcast_address,
-                )
-                return str(ip), str(network.network_address), str(cidr), str(network.broadcast_address)
+                ip, cidr = match.group(1), match.group(2)
+        except Exception:
+            logger.exception("Failed to get network details for %s", self.interface)
+        return self._make_snapshot(mac, ip, cidr)
+
+    def _read_snapshot_netlink(self) -> InterfaceSnapshot:
+        mac = ip = cidr = None
+        try:
+            mac = self.netlink.link_mac(self.interface)
+            addrs = self.netlink.addresses(self._ifindex())
+            if addrs:
+                # the kernel dumps the primary address first
+                ip, cidr = addrs[0].address, str(addrs[0].prefixlen)
         except Exception:
             logger.exception("Failed to get network details for %s", self.interface)
-        return None, None, None, None
+        return self._make_snapshot(mac, ip, cidr)
+
+    def _make_snapshot(self, mac: Optional[str], ip: Optional[str], cidr: Optional[str]) -> InterfaceSnapshot:
+        now = time.monotonic()
+        if not ip or not cidr:
+            return InterfaceSnapshot(mac, None, None, None, None, now)
+        network = ipaddress.IPv4Network(f"{ip}/{cidr}", strict=False)
+        logger.debug(
+            "Interface %s -> mac=%s ip=%s/%s net=%s broadcast=%s",
+            self.interface,
+            mac,
+            ip,
+            cidr,
+            network.network_address,
+            network.broadcast_address,
+        )
+        return InterfaceSnapshot(mac, ip, str(network.network_address), cidr, str(network.broadcast_address), now)
+
+    def watch_changes(self) -> None:
+        """Invalidate the snapshot on rtnetlink link/address events for this interface.
+
+        Runs a daemon thread with its own multicast netlink socket (available
+        with either backend); stopped by stop_watching() or cleanup().
+        """
+        if self._watch_thread is not None:
+            return
+        try:
+            listener = NetlinkRoute(groups=RTMGRP_LINK | RTMGRP_IPV4_IFADDR)
+        except OSError as e:
+            logger.warning("Cannot watch %s for changes, relying on TTL: %s", self.interface, e)
+            return
+        self._watch_stop.clear()
+        self._watch_thread = threading.Thread(
+            target=self._watch, args=(listener,), name="arpx-link-watch", daemon=True
+        )
+        self._watch_thread.start()
+
+    def _watch(self, listener: NetlinkRoute) -> None:
+        with listener:
+            while not self._watch_stop.is_set():
+                try:
+                    events = listener.events(timeout=0.5)
+                    index = self._ifindex()
+                except OSError:
+                    # interface gone or socket error: drop the cache and keep going
+                    self.invalidate_snapshot()
+                    continue
+                if any(change_event_index(t, payload) == index for t, payload in events):
+                    logger.debug("Interface %s changed; snapshot invalidated", self.interface)
+                    self.invalidate_snapshot()
+                    self._link_changed.set()
+
+    def stop_watching(self) -> None:
+        self._watch_stop.set()
+        if self._watch_thread is not None:
+            self._watch_thread.join(timeout=2)
+            self._watch_thread = None
 
     # -----------------
     # IP selection
     # -----------------
-    def find_free_ips(self, base_network: str, cidr: str, num_ips: int = 3, start_ip: int = 100) -> List[str]:
+    def probe_ip(self, ip_str: str) -> bool:
+        """Return True if ip_str answers ICMP echo or ARP (i.e. is in use)."""
+        # ICMP echo
+        cmd = f"ping -c 1 -W 1 {ip_str}"
+        result = subprocess.run(cmd, shell=True, capture_output=True)
+        if result.returncode == 0:
+            return True
+        # ARP check
+        arp_cmd = f"arping -c 1 -w 1 {ip_str} 2>/dev/null"
+        arp_result = subprocess.run(arp_cmd, shell=True, capture_output=True)
+        return arp_result.returncode == 0
+
+    def find_free_ips(
+        self,
+        base_network: str,
+        cidr: str,
+        num_ips: int = 3,
+        start_ip: int = 100,
+        concurrency: int = 16,
+        deadline: float = 30.0,
+        max_checks: Optional[int] = None,
+        prober: Optional[Callable[[str], bool]] = None,
+        method: str = "ping",
+    ) -> List[str]:
+        """Find up to num_ips unused addresses, probing candidates concurrently.
+
+        Candidates (last octet >= start_ip, at most max_checks of them) are probed
+        in waves sized to the number of addresses still missing (scaled by the
+        free ratio observed so far), capped at `concurrency`, until enough are
+        found or `deadline` seconds have passed.
+        `prober(ip) -> bool` reports whether an address is in use and defaults to
+        probe_ip. Results are returned in address order.
+
+        method="arp" replaces the per-address probes with raw-socket ARP sweeps
+        (see find_free_ips_arp).
+        """
+        if method not in PROBE_METHODS:
+            raise ValueError(f"Unknown probe method: {method}")
         network = ipaddress.IPv4Network(f"{base_network}/{cidr}", strict=False)
+        probe = prober or self.probe_ip
+        candidates = [str(ip) for ip in network.hosts() if int(str(ip).split(".")[-1]) >= start_ip]
+        if max_checks is not None:
+            candidates = candidates[:max_checks]
+        if method == "arp":
+            return self.find_free_ips_arp(candidates, num_ips, deadline)
         free_ips: List[str] = []
-        checked = 0
+        next_idx = 0
+        stop_at = time.monotonic() + deadline
 
         logger.info("Searching for free IP addresses in the network (starting from .%d)...", start_ip)
-        for ip in network.hosts():
-            if int(str(ip).split(".")[-1]) < start_ip:
-                continue
-            if checked >= 50:
-                break
+        pool = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="arpx-probe")
+        try:
+            while len(free_ips) < num_ips and next_idx < len(candidates):
+                remaining = stop_at - time.monotonic()
+                if remaining <= 0:
+                    logger.warning("Free IP search deadline (%.1fs) reached", deadline)
+                    break
+                # Size the wave from the free ratio seen so far so busy networks need few rounds
+                missing = num_ips - len(free_ips)
+                if next_idx:
+                    free_ratio = len(free_ips) / next_idx
+                    missing = int(math.ceil(missing / free_ratio)) if free_ratio else concurrency
+                wave = candidates[next_idx:next_idx + max(1, min(concurrency, missing))]
+                next_idx += len(wave)
+                futures = [pool.submit(probe, ip_str) for ip_str in wave]
+                done, not_done = wait(futures, timeout=remaining)
+                for ip_str, fut in zip(wave, futures):
+                    # unfinished or failed probes count as "in use"
+                    if fut in done and fut.exception() is None and not fut.result():
+                        free_ips.append(ip_str)
+                        logger.info("Found free IP: %s", ip_str)
+                if not_done:
+                    logger.warning("Free IP search deadline (%.1fs) reached", deadline)
+                    break
+        finally:
+            pool.shutdown(wait=False)
 
-            ip_str = str(ip)
-            # ICMP echo
-            cmd = f"ping -c 1 -W 1 {ip_str}"
-            result = subprocess.run(cmd, shell=True, capture_output=True)
-
-            if result.returncode != 0:
-                # ARP check
-                arp_cmd = f"arping -c 1 -w 1 {ip_str} 2>/dev/null"
-                arp_result = subprocess.run(arp_cmd, shell=True, capture_output=True)
-                if arp_result.returncode != 0:
-                    free_ips.append(ip_str)
-                    logger.info("Found free IP: %s", ip_str)
-                    if len(free_ips) >= num_ips:
-                        break
-            checked += 1
+        free_ips = free_ips[:num_ips]
+        if len(free_ips) < num_ips:
+            logger.warning("Found only %d free IP(s)", len(free_ips))
+        return free_ips
+
+    def find_free_ips_arp(
+        self, candidates: List[str], num_ips: int, deadline: float = 30.0, window: float = 1.0
+    ) -> List[str]:
+        """Pick free addresses from candidates using ARP sweeps of ARP_SWEEP_CHUNK addresses.
 
+        Each sweep sends who-has for the whole chunk from one raw socket and
+        listens for `window` seconds. Addresses already assigned to this host
+        never answer our own requests, so they are excluded explicitly.
+        """
+        scanner = ArpScanner(self.interface)
+        free_ips: List[str] = []
+        stop_at = time.monotonic() + deadline
+        logger.info("Searching for free IP addresses with ARP sweeps on %s...", self.interface)
+        for i in range(0, len(candidates), ARP_SWEEP_CHUNK):
+            remaining = stop_at - time.monotonic()
+            if remaining <= 0:
+                logger.warning("Free IP search deadline (%.1fs) reached", deadline)
+                break
+            chunk = candidates[i:i + ARP_SWEEP_CHUNK]
+            try:
+                used = scanner.scan(chunk, window=min(window, remaining))
+            except OSError as e:
+                logger.error("ARP sweep on %s failed: %s", self.interface, e)
+                break
+            for ip_str in chunk:
+                if ip_str in used or is_local_address(ip_str):
+                    continue
+                free_ips.append(ip_str)
+                logger.info("Found free IP: %s", ip_str)
+                if len(free_ips) >= num_ips:
+                    return free_ips
         if len(free_ips) < num_ips:
             logger.warning("Found only %d free IP(s)", len(free_ips))
         return free_ips
 
+    # -----------------
+    # Backend primitives
+    # -----------------
+    def _add_address(self, ip_address: str, cidr: str, label: str) -> None:
+        if self.backend == "netlink":
+            self.netlink.request(address_message(True, self._ifindex(), ip_address, int(cidr), label))
+            return
+        cmd = f"ip addr add {ip_address}/{cidr} dev {self.interface} label {label}"
+        subprocess.run(cmd, shell=True, check=True)
+
+    def _del_address(self, ip_address: str, cidr: str) -> None:
+        if self.backend == "netlink":
+            self.netlink.request(address_message(False, self._ifindex(), ip_address, int(cidr)))
+            return
+        cmd = f"ip addr del {ip_address}/{cidr} dev {self.interface}"
+        subprocess.run(cmd, shell=True, check=True)
+
+    def _enable_forwarding(self) -> None:
+        if self.arp_mode == "responder" and self._start_responder():
+            return
+        if self.backend == "netlink":
+            for key in ("net/ipv4/ip_forward", f"net/ipv4/conf/{self.interface}/proxy_arp"):
+                try:
+                    with open(f"/proc/sys/{key}", "w") as f:
+                        f.write("1")
+                except OSError as e:
+                    logger.warning("Failed to set %s: %s", key, e)
+            return
+        # enable forwarding
+        subprocess.run("echo 1 > /proc/sys/net/ipv4/ip_forward", shell=True)
+        # enable proxy ARP
+        subprocess.run(
+            f"echo 1 > /proc/sys/net/ipv4/conf/{self.interface}/proxy_arp", shell=True
+        )
+
+    def _start_responder(self) -> bool:
+        if self.responder is not None:
+            return True
+        mac = self.get_interface_mac()
+        responder = ArpResponder(self.interface, mac=mac_to_bytes(mac) if mac else None)
+        try:
+            responder.start()
+        except OSError as e:
+            logger.warning("ARP responder unavailable on %s, falling back to proxy_arp: %s", self.interface, e)
+            return False
+        self.responder = responder
+        return True
+
+    def stop_responder(self) -> None:
+        if self.responder is not None:
+            logger.debug("ARP responder answered %d of %d request(s)", self.responder.replies_sent, self.responder.requests_seen)
+            self.responder.stop()
+            self.responder = None
+
+    def start_announcer(self, interval: float = 30.0, jitter: float = 0.2) -> bool:
+        """Send gratuitous ARP from an in-process ArpAnnouncer instead of spawning arping.
+
+        Announced addresses are re-announced every interval seconds (+/- jitter)
+        until removed. Returns False, keeping arping, if the raw socket cannot
+        be opened.
+        """
+        if self.announcer is not None:
+            return True
+        mac = self.get_interface_mac()
+        announcer = ArpAnnouncer(
+            self.interface, sender_mac=mac_to_bytes(mac) if mac else None, interval=interval, jitter=jitter
+        )
+        try:
+            announcer.start()
+        except OSError as e:
+            logger.warning("In-process ARP announcer unavailable on %s, using arping: %s", self.interface, e)
+            return False
+        self.announcer = announcer
+        return True
+
+    def stop_announcer(self) -> None:
+        if self.announcer is not None:
+            stats = self.announcer.stats()
+            logger.debug("ARP announcer sent %d frame(s), %d error(s)", stats["frames_sent"], stats["send_errors"])
+            self.announcer.stop()
+            self.announcer = None
+
     # -----------------
     # IP configure
     # -----------------
     def add_virtual_ip_with_visibility(self, ip_address: str, label_suffix, cidr: str = "24") -> bool:
+        if self.journal is not None:
+            self.journal.record_aliases([(ip_address, str(label_suffix), cidr)])
         try:
             label = f"{self.interface}:{label_suffix}"
             # add alias
-            cmd = f"ip addr add {ip_address}/{cidr} dev {self.interface} label {label}"
-            subprocess.run(cmd, shell=True, check=True)
-
-            # enable forwarding
-            subprocess.run("echo 1 > /proc/sys/net/ipv4/ip_forward", shell=True)
-            # enable proxy ARP
-            subprocess.run(
-                f"echo 1 > /proc/sys/net/ipv4/conf/{self.interface}/proxy_arp", shell=True
-            )
+            self._add_address(ip_address, cidr, label)
+
+            self._enable_forwarding()
+            if self.responder is not None:
+                self.responder.add([ip_address])
 
             # Gratuitous ARP
             self.announce_arp(ip_address)
@@ -134,20 +585,123 @@ class NetworkVisibleManager:
             logger.info("Added and announced IP %s as %s", ip_address, label)
             self.virtual_ips.append((ip_address, label, cidr))
             return True
-        except subprocess.CalledProcessError as e:
+        except (subprocess.CalledProcessError, OSError) as e:
             logger.error("Failed to add IP %s: %s", ip_address, e)
+            if self.journal is not None:
+                self.journal.forget_aliases([ip_address])
+            return False
+
+    def add_virtual_ips(self, entries: List[Tuple[str, str]], cidr: str = "24") -> bool:
+        """Provision several aliases in one pass; all of them or none.
+
+        entries are (ip_address, label_suffix). Sysctls are written once, the
+        addresses go out as one netlink batch (or consecutive `ip addr add` with
+        the shell backend) and announcements/neighbour entries are batched. If
+        any address cannot be added, those already added are removed again and
+        False is returned.
+        """
+        if not entries:
+            return True
+        labeled = [(ip, f"{self.interface}:{suffix}") for ip, suffix in entries]
+        if self.journal is not None:
+            self.journal.record_aliases([(ip, str(suffix), cidr) for ip, suffix in entries])
+        added: List[str] = []
+        try:
+            if self.backend == "netlink":
+                index = self._ifindex()
+                results = self.netlink.execute(
+                    [address_message(True, index, ip, int(cidr), label) for ip, label in labeled]
+                )
+                added = [ip for (ip, _label), err in zip(labeled, results) if err is None]
+                failed = [(ip, err) for (ip, _label), err in zip(labeled, results) if err is not None]
+                if failed:
+                    raise failed[0][1]
+            else:
+                for ip, label in labeled:
+                    self._add_address(ip, cidr, label)
+                    added.append(ip)
+        except (subprocess.CalledProcessError, OSError) as e:
+            logger.error("Failed to add alias batch (%d/%d added): %s; rolling back", len(added), len(labeled), e)
+            self._rollback_addresses(added, cidr)
+            if self.journal is not None:
+                self.journal.forget_aliases([ip for ip, _label in labeled])
             return False
 
+        self._enable_forwarding()
+        ips = [ip for ip, _label in labeled]
+        if self.responder is not None:
+            self.responder.add(ips)
+        self.announce_arp_many(ips)
+        for ip, label in labeled:
+            self.virtual_ips.append((ip, label, cidr))
+        logger.info("Added and announced %d IP(s) on %s", len(labeled), self.interface)
+        return True
+
+    def _rollback_addresses(self, ips: List[str], cidr: str) -> None:
+        # newest first: deleting a primary address would drop its secondaries too
+        if self.backend == "netlink" and ips:
+            index = self._ifindex()
+            self.netlink.execute([address_message(False, index, ip, int(cidr)) for ip in reversed(ips)])
+            return
+        for ip in reversed(ips):
+            try:
+                self._del_address(ip, cidr)
+            except (subprocess.CalledProcessError, OSError) as e:
+                logger.warning("Rollback of %s failed: %s", ip, e)
+
+    def announce_arp_many(self, ip_addresses: List[str]) -> None:
+        """announce_arp + update_arp_cache for several addresses at once.
+
+        arping processes run in parallel (or the addresses are handed to the
+        announcer) and the interface MAC is looked up once; with the netlink
+        backend all neighbour entries go in one batch.
+        """
+        if not ip_addresses:
+            return
+        procs = []
+        if self.announcer is not None:
+            self.announcer.add(ip_addresses)
+        else:
+            for ip_address in ip_addresses:
+                cmd = f"arping -U -I {self.interface} -c 3 {ip_address} 2>/dev/null"
+                try:
+                    procs.append(subprocess.Popen(cmd, shell=True, stdout=subprocess.DEVNULL))
+                except OSError as e:
+                    logger.warning("Failed to announce ARP for %s: %s", ip_address, e)
+        try:
+            mac = self.get_interface_mac()
+            if mac:
+                if self.backend == "netlink":
+                    index = self._ifindex()
+                    self.netlink.execute([neighbor_message(True, index, ip, mac) for ip in ip_addresses])
+                else:
+                    for ip in ip_addresses:
+                        subprocess.run(f"ip neigh add {ip} lladdr {mac} dev {self.interface} nud permanent 2>/dev/null", shell=True)
+                        subprocess.run(f"arp -s {ip} {mac} 2>/dev/null", shell=True)
+                self._neighbor_mac = mac
+        except Exception as e:
+            logger.warning("Failed to update neighbour entries: %s", e)
+        for proc in procs:
+            proc.wait()
+        self.arp_announced.extend(ip_addresses)
+        logger.debug("Gratuitous ARP announced for %d address(es)", len(ip_addresses))
+
     def announce_arp(self, ip_address: str) -> None:
         try:
-            # via arping
-            cmd = f"arping -U -I {self.interface} -c 3 {ip_address} 2>/dev/null"
-            subprocess.run(cmd, shell=True)
+            if self.announcer is not None:
+                self.announcer.add([ip_address])
+            else:
+                # via arping
+                cmd = f"arping -U -I {self.interface} -c 3 {ip_address} 2>/dev/null"
+                subprocess.run(cmd, shell=True)
             # via ip neigh
             mac = self.get_interface_mac()
             if mac:
-                cmd2 = f"ip neigh add {ip_address} lladdr {mac} dev {self.interface} nud permanent 2>/dev/null"
-                subprocess.run(cmd2, shell=True)
+                if self.backend == "netlink":
+                    self.netlink.execute([neighbor_message(True, self._ifindex(), ip_address, mac)])
+                else:
+                    cmd2 = f"ip neigh add {ip_address} lladdr {mac} dev {self.interface} nud permanent 2>/dev/null"
+                    subprocess.run(cmd2, shell=True)
             self.arp_announced.append(ip_address)
             logger.debug("Gratuitous ARP announced for %s", ip_address)
         except Exception as e:
@@ -155,46 +709,98 @@ class NetworkVisibleManager:
 
     def get_interface_mac(self) -> Optional[str]:
         try:
-            cmd = f"ip link show {self.interface} | grep ether | awk '{{print $2}}'"
-            mac = subprocess.check_output(cmd, shell=True).decode().strip()
-            return mac
+            return self.snapshot().mac
         except Exception:
             return None
 
+    def refresh_neighbors(self, ip_addresses: List[str]) -> bool:
+        """Re-point the permanent neighbour entries of ip_addresses after a MAC change.
+
+        The entries are set once when the aliases are added and never expire,
+        so this does nothing (and spawns nothing) until watch_changes() has
+        seen the interface change; only then is the MAC read again and, if it
+        differs, the entries replaced. Returns True if they were.
+        """
+        if not ip_addresses or not self._link_changed.is_set():
+            return False
+        self._link_changed.clear()
+        mac = self.get_interface_mac()
+        if not mac or mac == self._neighbor_mac:
+            return False
+        try:
+            if self.backend == "netlink":
+                index = self._ifindex()
+                self.netlink.execute([neighbor_message(True, index, ip, mac) for ip in ip_addresses])
+            else:
+                for ip in ip_addresses:
+                    subprocess.run(f"ip neigh replace {ip} lladdr {mac} dev {self.interface} nud permanent 2>/dev/null", shell=True)
+        except Exception as e:
+            logger.warning("Failed to update neighbour entries: %s", e)
+            return False
+        logger.info("Interface %s MAC is now %s; neighbour entries of %d alias(es) updated", self.interface, mac, len(ip_addresses))
+        self._neighbor_mac = mac
+        return True
+
     def update_arp_cache(self, ip_address: str) -> None:
         try:
             mac = self.get_interface_mac()
             if mac:
+                if self.backend == "netlink":
+                    self.netlink.execute([neighbor_message(True, self._ifindex(), ip_address, mac)])
+                    return
                 cmd = f"arp -s {ip_address} {mac} 2>/dev/null"
                 subprocess.run(cmd, shell=True)
         except Exception:
             pass
 
     def configure_firewall_for_lan(self, ip_address: str, port: int) -> None:
-        try:
-            result = subprocess.run("which iptables", shell=True, capture_output=True)
-            if result.returncode == 0:
-                cmd = f"iptables -A INPUT -d {ip_address} -p tcp --dport {port} -j ACCEPT"
-                subprocess.run(cmd, shell=True)
-                cmd2 = f"iptables -A OUTPUT -s {ip_address} -p tcp --sport {port} -j ACCEPT"
-                subprocess.run(cmd2, shell=True)
-                logger.debug("Firewall INPUT/OUTPUT rules added for %s:%d", ip_address, port)
-        except Exception:
-            pass
+        self.configure_firewall_for_lan_many([(ip_address, port)])
 
-    def remove_virtual_ip(self, ip_address: str, cidr: str = "24") -> None:
+    def configure_firewall_for_lan_many(self, rules: Iterable[Tuple[str, int]]) -> None:
+        """Allow inbound TCP to several alias_ip:port pairs in one firewall transaction."""
+        rules = list(rules)
+        if rules and not self.firewall.allow(rules):
+            logger.warning("Could not install firewall rules for %d alias port(s)", len(rules))
+        elif rules:
+            logger.debug("Firewall rules in place for %s", ", ".join(f"{ip}:{port}" for ip, port in rules))
+
+    def remove_virtual_ip(self, ip_address: str, cidr: str = "24") -> bool:
+        """Remove an alias; False (and it stays recorded) when the address could not be deleted."""
+        if self.announcer is not None:
+            self.announcer.remove([ip_address])
+        if self.responder is not None:
+            self.responder.remove([ip_address])
+        self.firewall.revoke(ip_address)
         try:
-            cmd = f"ip addr del {ip_address}/{cidr} dev {self.interface}"
-            subprocess.run(cmd, shell=True, check=True)
-            cmd2 = f"arp -d {ip_address} 2>/dev/null"
-            subprocess.run(cmd2, shell=True)
+            self._del_address(ip_address, cidr)
+            if self.backend == "netlink":
+                # a missing neighbour entry is fine, so the result is ignored
+                self.netlink.execute([neighbor_message(False, self._ifindex(), ip_address)])
+            else:
+                cmd2 = f"arp -d {ip_address} 2>/dev/null"
+                subprocess.run(cmd2, shell=True)
             logger.info("Removed IP: %s", ip_address)
-        except subprocess.CalledProcessError as e:
+        except (subprocess.CalledProcessError, OSError) as e:
             logger.warning("Failed to remove IP %s: %s", ip_address, e)
+            return False
+        self.virtual_ips = [entry for entry in self.virtual_ips if entry[0] != ip_address]
+        if self.journal is not None:
+            self.journal.forget_aliases([ip_address])
+        return True
 
     def cleanup(self) -> None:
+        self.stop_watching()
+        # all rules at once, so removing each IP below has none left to revoke
+        firewall_removed = self.firewall.teardown()
         logger.info("Cleaning up: removing %d virtual IP(s)", len(self.virtual_ips))
-        for ip, _label, cidr in self.virtual_ips:
-            self.remove_virtual_ip(ip, cidr)
+        left = [ip for ip, _label, cidr in list(self.virtual_ips) if not self.remove_virtual_ip(ip, cidr)]
         # Prevent double-removal attempts on subsequent cleanup calls
         self.virtual_ips.clear()
+        self.stop_announcer()
+        self.stop_responder()
+        if self.journal is not None:
+            if left or not firewall_removed:
+                # keep them recorded for `arpx compose down` / the next start
+                logger.warning("Leftovers kept in %s: %s", self.journal.path, ", ".join(left) or "firewall rules")
+            else:
+                self.journal.clear()
@@ -1,52 +1,343 @@
+import asyncio
+import errno
+import os
+import select
 import socket
+import struct
 import threading
+import time
 import logging
-from typing import Tuple, Optional, List
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Iterable, Tuple, Optional, List, Sequence, Set, Union
+
+from .balancer import POLICIES, NoHealthyUpstream, Upstream, UpstreamGroup, group_for
+from .metrics import ListenerMetrics
+from .workers import ListenerWorkers
+
+if TYPE_CHECKING:
+    from .health import HealthChecker
+    from .httpproxy import UpstreamPool
 
 logger = logging.getLogger("arpx.proxy")
 
+# Forwarder engines selectable through TcpForwarderManager / `arpx compose --engine`
+ENGINES = ("thread", "asyncio")
+# Byte-stream forwarding, or HTTP/1.1 request relaying over pooled upstream connections (arpx.httpproxy)
+FORWARD_MODES = ("tcp", "http")
+
+# splice(2) is Linux-only and exposed as os.splice since Python 3.10
+HAS_SPLICE = hasattr(os, "splice")
+# errno values meaning "splice is not supported for this pair of descriptors"
+_SPLICE_UNSUPPORTED = (errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP)
+
+
+@dataclass
+class ConnectionLimits:
+    """Admission and timeout limits of one listener (0 / None = unlimited).
+
+    Connections over max_connections, or over max_per_ip from one client
+    address, are reset right after accept. A connection on which neither
+    direction has moved data for idle_timeout seconds is closed.
+    """
+
+    max_connections: int = 0
+    max_per_ip: int = 0
+    backlog: int = 128
+    idle_timeout: Optional[float] = None
+
+
+class ConnectionGate:
+    """Counts a listener's open connections and enforces its ConnectionLimits."""
+
+    def __init__(self, limits: Optional[ConnectionLimits] = None):
+        self.limits = limits or ConnectionLimits()
+        self.active = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.rejected_per_ip = 0
+        self.idle_closed = 0
+        self._per_ip: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def admit(self, client_ip: Optional[str]) -> bool:
+        limits = self.limits
+        with self._lock:
+            if limits.max_connections and self.active >= limits.max_connections:
+                self.rejected += 1
+                return False
+            if client_ip is not None and limits.max_per_ip:
+                if self._per_ip.get(client_ip, 0) >= limits.max_per_ip:
+                    self.rejected_per_ip += 1
+                    return False
+                self._per_ip[client_ip] = self._per_ip.get(client_ip, 0) + 1
+            self.active += 1
+            self.accepted += 1
+            return True
+
+    def release(self, client_ip: Optional[str]) -> None:
+        with self._lock:
+            self.active -= 1
+            if client_ip is not None and self.limits.max_per_ip:
+                left = self._per_ip.get(client_ip, 1) - 1
+                if left > 0:
+                    self._per_ip[client_ip] = left
+                else:
+                    self._per_ip.pop(client_ip, None)
+
+    def count_idle_close(self) -> None:
+        with self._lock:
+            self.idle_closed += 1
+
+    @staticmethod
+    def combined(stats: Iterable[Dict[str, int]]) -> Dict[str, int]:
+        """Several stats() results added up."""
+        total: Dict[str, int] = {}
+        for counters in stats:
+            for key, value in counters.items():
+                total[key] = total.get(key, 0) + value
+        return total
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "active": self.active,
+                "accepted": self.accepted,
+                "rejected": self.rejected,
+                "rejected_per_ip": self.rejected_per_ip,
+                "idle_closed": self.idle_closed,
+            }
+
+
+class IdleTracker:
+    """Last time either direction of a connection moved data, for idle_timeout."""
+
+    __slots__ = ("idle_timeout", "last", "expired")
+
+    def __init__(self, idle_timeout: float):
+        self.idle_timeout = idle_timeout
+        self.last = time.monotonic()
+        self.expired = False
+
+    def touch(self) -> None:
+        self.last = time.monotonic()
+
+    def keep_waiting(self) -> bool:
+        """Called when a read timed out: True while the other direction was active recently."""
+        if not self.expired and time.monotonic() - self.last < self.idle_timeout:
+            return True
+        self.expired = True
+        return False
+
+
+def shed(sock: socket.socket) -> None:
+    """Drop an accepted connection over a limit: reset it instead of a graceful close."""
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+    except OSError:
+        pass
+    sock.close()
+
+
+def _wait_fd(sock: socket.socket, fd: int, write: bool) -> None:
+    """Block until fd is ready, honouring the socket timeout (non-blocking fds)."""
+    timeout = sock.gettimeout()
+    if write:
+        _r, ready, _x = select.select([], [fd], [], timeout)
+    else:
+        ready, _w, _x = select.select([fd], [], [], timeout)
+    if not ready:
+        raise socket.timeout("timed out")
+
 
 class TcpForwarder:
     """Simple multi-threaded TCP forwarder.
 
     Listens on (listen_host, listen_port) and forwards to (target_host, target_port).
+
+    With zero_copy (default, Linux only) payload is moved socket -> pipe -> socket
+    with splice(2) so it never enters userspace; otherwise, or when splice is
+    rejected for a socket pair, a recv_into() loop over one preallocated buffer
+    per direction is used.
+
+    With upstreams (an UpstreamGroup) each connection goes to a target chosen
+    by the group's policy; target is then only used in log messages.
+
+    limits (ConnectionLimits) caps concurrent connections overall and per
+    client IP, sets the accept backlog and closes idle connections; the
+    counters are in self.gate. reuse_port lets several processes listen on
+    the same address (see arpx.workers).
     """
 
-    def __init__(self, listen: Tuple[str, int], target: Tuple[str, int], buffer_size: int = 65536):
+    def __init__(
+        self,
+        listen: Tuple[str, int],
+        target: Tuple[str, int],
+        buffer_size: int = 65536,
+        zero_copy: bool = True,
+        upstreams: Optional[UpstreamGroup] = None,
+        limits: Optional[ConnectionLimits] = None,
+        reuse_port: bool = False,
+    ):
         self.listen_host, self.listen_port = listen
         self.target_host, self.target_port = target
         self.buffer_size = buffer_size
+        self.zero_copy = zero_copy and HAS_SPLICE
+        self.reuse_port = reuse_port
+        self.metrics = ListenerMetrics()
+        self.upstreams = upstreams
+        self.gate = ConnectionGate(limits)
+        self.limits = self.gate.limits
         self._server_sock: Optional[socket.socket] = None
         self._thread: Optional[threading.Thread] = None
         self._stop = threading.Event()
 
-    def _pipe(self, src: socket.socket, dst: socket.socket):
+    def _wait_readable(self, src: socket.socket, fd: int, activity: Optional[IdleTracker]) -> None:
+        while True:
+            try:
+                _wait_fd(src, fd, write=False)
+                return
+            except socket.timeout:
+                if activity is None or not activity.keep_waiting():
+                    raise
+
+    def _splice(self, src: socket.socket, dst: socket.socket, activity: Optional[IdleTracker] = None) -> Optional[int]:
+        """Forward src -> dst through a kernel pipe; returns the bytes moved.
+
+        Returns None (having moved nothing) if the kernel refuses to splice
+        these descriptors, so the caller can fall back to copying. Other
+        errors end the transfer like EOF.
+        """
+        rpipe, wpipe = os.pipe()
+        total = 0
         try:
+            sfd, dfd = src.fileno(), dst.fileno()
             while not self._stop.is_set():
-                data = src.recv(self.buffer_size)
-                if not data:
+                try:
+                    n = os.splice(sfd, wpipe, self.buffer_size, flags=os.SPLICE_F_MOVE)
+                except BlockingIOError:
+                    self._wait_readable(src, sfd, activity)
+                    continue
+                except OSError as e:
+                    if not total and e.errno in _SPLICE_UNSUPPORTED:
+                        return None
+                    raise
+                if n == 0:
+                    break
+                total += n
+                if activity is not None:
+                    activity.touch()
+                while n:
+                    try:
+                        n -= os.splice(rpipe, dfd, n, flags=os.SPLICE_F_MOVE)
+                    except BlockingIOError:
+                        _wait_fd(dst, dfd, write=True)
+        except Exception:
+            pass
+        finally:
+            os.close(rpipe)
+            os.close(wpipe)
+        return total
+
+    def _copy(self, src: socket.socket, dst: socket.socket, activity: Optional[IdleTracker] = None) -> int:
+        buf = bytearray(self.buffer_size)
+        view = memoryview(buf)
+        total = 0
+        try:
+            while not self._stop.is_set():
+                try:
+                    n = src.recv_into(buf)
+                except socket.timeout:
+                    if activity is not None and activity.keep_waiting():
+                        continue
+                    raise
+                if not n:
                     break
-                dst.sendall(data)
+                total += n
+                if activity is not None:
+                    activity.touch()
+                dst.sendall(view[:n])
+        except Exception:
+            pass
+        return total
+
+    def _pipe(self, src: socket.socket, dst: socket.socket, activity: Optional[IdleTracker] = None) -> int:
+        """Relay src -> dst until EOF or error, then half-close dst; returns the bytes relayed."""
+        moved: Optional[int] = None
+        try:
+            if self.zero_copy:
+                moved = self._splice(src, dst, activity)
+            if moved is None:
+                moved = self._copy(src, dst, activity)
         except Exception:
             pass
         finally:
             try:
-                dst.shutdown(socket.SHUT_WR)
+                # an idle connection is torn down in both directions, waking the other pipe
+                dst.shutdown(socket.SHUT_RDWR if activity is not None and activity.expired else socket.SHUT_WR)
             except Exception:
                 pass
+        return moved or 0
+
+    def _connect_upstream(self, client_sock: socket.socket) -> Tuple[socket.socket, Optional[Upstream]]:
+        if self.upstreams is None:
+            return socket.create_connection((self.target_host, self.target_port)), None
+        try:
+            client_ip = client_sock.getpeername()[0]
+        except OSError:
+            client_ip = None
+        return self.upstreams.connect(client_ip)
+
+    def _idle_tracker(self, upstream: socket.socket) -> Optional[IdleTracker]:
+        """Shared activity of both pipe directions when idle_timeout is set."""
+        if not self.limits.idle_timeout:
+            return None
+        upstream.settimeout(self.limits.idle_timeout)
+        return IdleTracker(self.limits.idle_timeout)
+
+    def _run_client(self, client_sock: socket.socket, client_ip: Optional[str]):
+        try:
+            if self.limits.idle_timeout:
+                client_sock.settimeout(self.limits.idle_timeout)
+            self._handle_client(client_sock)
+        finally:
+            self.gate.release(client_ip)
+
+    def _accept_client(self, client_sock: socket.socket, addr) -> None:
+        client_ip = addr[0] if addr else None
+        if not self.gate.admit(client_ip):
+            logger.debug("Shed connection from %s to %s:%d (limit reached)", client_ip, self.listen_host, self.listen_port)
+            shed(client_sock)
+            return
+        threading.Thread(target=self._run_client, args=(client_sock, client_ip), daemon=True).start()
 
     def _handle_client(self, client_sock: socket.socket):
+        started = time.monotonic()
         try:
-            upstream = socket.create_connection((self.target_host, self.target_port))
+            upstream, member = self._connect_upstream(client_sock)
+        except NoHealthyUpstream:
+            logger.debug("Rejected client of %s:%d: no healthy upstream", self.listen_host, self.listen_port)
+            client_sock.close()
+            return
         except Exception as e:
+            self.metrics.connect_failed()
             logger.warning("Forward connect failed to %s:%d: %s", self.target_host, self.target_port, e)
             client_sock.close()
             return
+        self.metrics.connected(time.monotonic() - started)
 
-        t1 = threading.Thread(target=self._pipe, args=(client_sock, upstream), daemon=True)
-        t2 = threading.Thread(target=self._pipe, args=(upstream, client_sock), daemon=True)
-        t1.start(); t2.start()
-        t1.join(); t2.join()
+        activity = self._idle_tracker(upstream)
+        received: List[int] = []
+        t = threading.Thread(
+            target=lambda: received.append(self._pipe(client_sock, upstream, activity)), daemon=True
+        )
+        t.start()
+        sent = self._pipe(upstream, client_sock, activity)
+        t.join()
+        self.metrics.closed(received[0] if received else 0, sent, time.monotonic() - started)
+        if activity is not None and activity.expired:
+            self.gate.count_idle_close()
+        if member is not None:
+            self.upstreams.release(member)
         try:
             upstream.close()
         except Exception:
@@ -61,21 +352,23 @@ class TcpForwarder:
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
             self._server_sock = s
             s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if self.reuse_port:
+                s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
             try:
                 s.bind((self.listen_host, self.listen_port))
             except OSError as e:
                 logger.warning("Forwarder bind failed %s:%d -> %s:%d: %s", self.listen_host, self.listen_port, self.target_host, self.target_port, e)
                 return
-            s.listen(128)
+            s.listen(self.limits.backlog)
             s.settimeout(0.5)
             while not self._stop.is_set():
                 try:
-                    client, _addr = s.accept()
+                    client, addr = s.accept()
                 except socket.timeout:
                     continue
                 except OSError:
                     break
-                threading.Thread(target=self._handle_client, args=(client,), daemon=True).start()
+                self._accept_client(client, addr)
         logger.info("Forwarder stopped %s:%d", self.listen_host, self.listen_port)
 
     def start(self):
@@ -95,19 +388,401 @@ class TcpForwarder:
             self._thread.join(timeout=2)
 
 
+class EventLoopThread:
+    """Run a single asyncio event loop in a daemon thread.
+
+    Shared by all asyncio-engine forwarders of a manager, so their connections
+    are multiplexed on one loop instead of costing OS threads each.
+    """
+
+    def __init__(self, name: str = "arpx-loop"):
+        self.name = name
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self.loop = loop
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            # Cancel whatever is still pending so the loop closes cleanly
+            pending = asyncio.all_tasks(loop)
+            for task in pending:
+                task.cancel()
+            if pending:
+                loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            loop.close()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def run(self, coro, timeout: Optional[float] = None):
+        """Run a coroutine on the loop from another thread and return its result."""
+        if self.loop is None:
+            raise RuntimeError("event loop is not running")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def stop(self):
+        if self.loop is None or self._thread is None:
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=2)
+        self._thread = None
+        self.loop = None
+        self._ready.clear()
+
+
+class AsyncTcpForwarder:
+    """TCP forwarder driven by a shared asyncio event loop.
+
+    Same listen/target semantics and start()/stop() interface as TcpForwarder,
+    but every connection is a pair of coroutines on `loop` rather than three
+    OS threads. limits are applied as in TcpForwarder.
+    """
+
+    kind = "TCP forwarder"
+
+    def __init__(
+        self,
+        listen: Tuple[str, int],
+        target: Tuple[str, int],
+        loop: EventLoopThread,
+        buffer_size: int = 65536,
+        upstreams: Optional[UpstreamGroup] = None,
+        limits: Optional[ConnectionLimits] = None,
+        reuse_port: bool = False,
+    ):
+        self.listen_host, self.listen_port = listen
+        self.target_host, self.target_port = target
+        self.buffer_size = buffer_size
+        self.upstreams = upstreams
+        self.gate = ConnectionGate(limits)
+        self.limits = self.gate.limits
+        self.reuse_port = reuse_port
+        self.metrics = ListenerMetrics()
+        self._loop = loop
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._conns: Set["asyncio.Task"] = set()
+
+    async def _read(self, reader: asyncio.StreamReader, activity: Optional[IdleTracker]) -> bytes:
+        if activity is None:
+            return await reader.read(self.buffer_size)
+        while True:
+            try:
+                data = await asyncio.wait_for(reader.read(self.buffer_size), activity.idle_timeout)
+            except asyncio.TimeoutError:
+                if activity.keep_waiting():
+                    continue
+                raise
+            activity.touch()
+            return data
+
+    async def _pipe(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                    activity: Optional[IdleTracker] = None) -> int:
+        total = 0
+        try:
+            while True:
+                data = await self._read(reader, activity)
+                if not data:
+                    break
+                total += len(data)
+                writer.write(data)
+                await writer.drain()
+        except Exception:
+            pass
+        finally:
+            try:
+                if activity is not None and activity.expired:
+                    writer.close()
+                elif writer.can_write_eof():
+                    writer.write_eof()
+                else:
+                    # e.g. TLS transports cannot half-close
+                    writer.close()
+            except Exception:
+                pass
+        return total
+
+    async def _handle_client(self, client_reader: asyncio.StreamReader, client_writer: asyncio.StreamWriter):
+        peer = client_writer.get_extra_info("peername")
+        client_ip = peer[0] if peer else None
+        if not self.gate.admit(client_ip):
+            logger.debug("Shed connection from %s to %s:%d (limit reached)", client_ip, self.listen_host, self.listen_port)
+            client_writer.transport.abort()
+            return
+        task = asyncio.current_task()
+        if task is not None:
+            self._conns.add(task)
+        started = time.monotonic()
+        try:
+            moved = await self._serve_connection(client_reader, client_writer)
+            if moved is not None:
+                self.metrics.closed(moved[0], moved[1], time.monotonic() - started)
+        finally:
+            self.gate.release(client_ip)
+            if task is not None:
+                self._conns.discard(task)
+
+    async def _serve_connection(
+        self, client_reader: asyncio.StreamReader, client_writer: asyncio.StreamWriter
+    ) -> Optional[Tuple[int, int]]:
+        """Connect upstream and relay; (bytes in, bytes out), or None if no upstream was reached."""
+        member: Optional[Upstream] = None
+        try:
+            connect_started = time.monotonic()
+            try:
+                if self.upstreams is None:
+                    up_reader, up_writer = await asyncio.open_connection(self.target_host, self.target_port)
+                else:
+                    peer = client_writer.get_extra_info("peername")
+                    up_reader, up_writer, member = await self.upstreams.open_connection(peer[0] if peer else None)
+            except NoHealthyUpstream:
+                logger.debug("Rejected client of %s:%d: no healthy upstream", self.listen_host, self.listen_port)
+                return None
+            except Exception as e:
+                self.metrics.connect_failed()
+                logger.warning("Forward connect failed to %s:%d: %s", self.target_host, self.target_port, e)
+                return None
+            self.metrics.connected(time.monotonic() - connect_started)
+            activity = IdleTracker(self.limits.idle_timeout) if self.limits.idle_timeout else None
+            try:
+                received, sent = await asyncio.gather(
+                    self._pipe(client_reader, up_writer, activity),
+                    self._pipe(up_reader, client_writer, activity),
+                )
+                return received, sent
+            finally:
+                up_writer.close()
+                if activity is not None and activity.expired:
+                    self.gate.count_idle_close()
+        finally:
+            if member is not None:
+                self.upstreams.release(member)
+            client_writer.close()
+
+    async def _start(self):
+        self._server = await asyncio.start_server(
+            self._handle_client,
+            self.listen_host,
+            self.listen_port,
+            reuse_address=True,
+            reuse_port=self.reuse_port or None,
+            backlog=self.limits.backlog,
+        )
+
+    async def _stop(self):
+        if self._server is not None:
+            self._server.close()
+        for task in list(self._conns):
+            task.cancel()
+        if self._server is not None:
+            await self._server.wait_closed()
+            self._server = None
+
+    def start(self):
+        if self._server is not None:
+            return
+        logger.info(
+            "Starting %s (asyncio) %s:%d -> %s:%d",
+            self.kind,
+            self.listen_host, self.listen_port, self.target_host, self.target_port,
+        )
+        try:
+            self._loop.run(self._start())
+        except OSError as e:
+            logger.warning("%s bind failed %s:%d -> %s:%d: %s", self.kind, self.listen_host, self.listen_port, self.target_host, self.target_port, e)
+
+    def stop(self):
+        if self._server is None or self._loop.loop is None:
+            return
+        try:
+            self._loop.run(self._stop(), timeout=2)
+        except Exception:
+            pass
+        logger.info("%s stopped %s:%d", self.kind, self.listen_host, self.listen_port)
+
+
 class TcpForwarderManager:
-    def __init__(self):
-        self.forwarders: List[TcpForwarder] = []
+    """Create and stop forwarders using one of the ENGINES.
+
+    With engine="asyncio" all forwarders share `loops` event loop threads
+    (assigned round-robin) instead of spawning threads per connection.
 
-    def add(self, listen_host: str, listen_port: int, target_host: str, target_port: int) -> TcpForwarder:
-        fwd = TcpForwarder((listen_host, listen_port), (target_host, target_port))
+    mode="http" (thread engine only) uses HttpForwarder with one UpstreamPool
+    per target, keeping up to pool_size idle upstream connections for
+    pool_idle_timeout seconds.
+
+    add(..., targets=[...]) with more than one target balances connections
+    over them with an UpstreamGroup using `policy` (see arpx.balancer).
+    With a HealthChecker every forwarder's targets are probed actively.
+    limits (ConnectionLimits) applies to each forwarder separately.
+
+    With workers > 1 the forwarders run in that many processes sharing each
+    listening port through SO_REUSEPORT (arpx.workers); add() then returns
+    None, as the forwarder objects live in the workers.
+    """
+
+    def __init__(
+        self,
+        engine: str = "thread",
+        loops: int = 1,
+        mode: str = "tcp",
+        pool_size: int = 8,
+        pool_idle_timeout: float = 30.0,
+        policy: str = "round-robin",
+        health: Optional["HealthChecker"] = None,
+        limits: Optional[ConnectionLimits] = None,
+        workers: int = 1,
+        reuse_port: bool = False,
+    ):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown forwarder engine: {engine}")
+        if mode not in FORWARD_MODES:
+            raise ValueError(f"Unknown forwarding mode: {mode}")
+        if mode == "http" and engine != "thread":
+            raise ValueError("HTTP forwarding mode requires the thread engine")
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown balancing policy: {policy}")
+        self.engine = engine
+        self.loop_count = max(1, loops)
+        self.mode = mode
+        self.policy = policy
+        self.health = health
+        self.limits = limits
+        self.reuse_port = reuse_port
+        self.pool_size = pool_size
+        self.pool_idle_timeout = pool_idle_timeout
+        self.worker_pool: Optional[ListenerWorkers] = None
+        if workers > 1:
+            self.worker_pool = ListenerWorkers("forwarder", workers, {
+                "engine": engine, "loops": loops, "mode": mode, "pool_size": pool_size,
+                "pool_idle_timeout": pool_idle_timeout, "policy": policy, "limits": limits,
+                "health": health.settings() if health is not None else None,
+            })
+        self.forwarders: List[Union[TcpForwarder, AsyncTcpForwarder]] = []
+        self.pools: Dict[Tuple[str, int], "UpstreamPool"] = {}
+        self._loops: List[EventLoopThread] = []
+
+    def _next_loop(self) -> EventLoopThread:
+        if len(self._loops) < self.loop_count:
+            lt = EventLoopThread(name=f"arpx-loop-{len(self._loops)}")
+            lt.start()
+            self._loops.append(lt)
+            return lt
+        return self._loops[len(self.forwarders) % len(self._loops)]
+
+    def _pool(self, target: Tuple[str, int]) -> "UpstreamPool":
+        # imported here: arpx.httpproxy builds on TcpForwarder from this module
+        from .httpproxy import UpstreamPool
+
+        pool = self.pools.get(target)
+        if pool is None:
+            pool = self.pools[target] = UpstreamPool(target, self.pool_size, self.pool_idle_timeout)
+        return pool
+
+    def add(
+        self,
+        listen_host: str,
+        listen_port: int,
+        target_host: str,
+        target_port: int,
+        targets: Optional[Sequence[Tuple[str, int]]] = None,
+    ) -> Optional[Union[TcpForwarder, AsyncTcpForwarder]]:
+        """Forward listen -> target, or balance over targets when more than one is given."""
+        if self.worker_pool is not None:
+            self.worker_pool.add(
+                listen_host=listen_host, listen_port=listen_port,
+                target_host=target_host, target_port=target_port, targets=targets,
+            )
+            return None
+        target = (target_host, target_port)
+        group = group_for(target, targets, self.policy, self.health)
+        fwd: Union[TcpForwarder, AsyncTcpForwarder]
+        if self.engine == "asyncio":
+            fwd = AsyncTcpForwarder(
+                (listen_host, listen_port), target, self._next_loop(), upstreams=group, limits=self.limits,
+                reuse_port=self.reuse_port,
+            )
+        elif self.mode == "http":
+            from .httpproxy import HttpForwarder
+
+            fwd = HttpForwarder(
+                (listen_host, listen_port), target, self._pool(target), upstreams=group, pool_for=self._pool,
+                limits=self.limits, reuse_port=self.reuse_port,
+            )
+        else:
+            fwd = TcpForwarder(
+                (listen_host, listen_port), target, upstreams=group, limits=self.limits, reuse_port=self.reuse_port
+            )
         fwd.start()
         self.forwarders.append(fwd)
         return fwd
 
+    def remove(self, listen_host: str, listen_port: int) -> bool:
+        """Stop the forwarder listening on listen_host:listen_port; the others are not touched.
+
+        With the thread engine connections already accepted run to completion,
+        the asyncio engine closes them with the listener. Returns False when
+        nothing listened there.
+        """
+        if self.worker_pool is not None:
+            return any(self.worker_pool.remove(listen_host=listen_host, listen_port=listen_port))
+        matching = [f for f in self.forwarders if (f.listen_host, f.listen_port) == (listen_host, listen_port)]
+        for f in matching:
+            try:
+                f.stop()
+            except Exception:
+                pass
+            if self.health is not None and f.upstreams is not None:
+                self.health.unwatch(f.upstreams)
+        self.forwarders = [f for f in self.forwarders if f not in matching]
+        return bool(matching)
+
+    def connection_stats(self) -> Dict[str, int]:
+        """ConnectionGate counters summed over all forwarders (and worker processes)."""
+        stats = [f.gate.stats() for f in self.forwarders]
+        if self.worker_pool is not None and self.worker_pool.started:
+            stats += self.worker_pool.stats()
+        return ConnectionGate.combined(stats)
+
+    def listener_metrics(self) -> List[Dict[str, object]]:
+        """Gate counters and ListenerMetrics of each forwarder, for arpx.metrics.listener_families."""
+        snapshots: List[Dict[str, object]] = [
+            {
+                "kind": "forwarder",
+                "listener": f"{f.listen_host}:{f.listen_port}",
+                "target": f"{f.target_host}:{f.target_port}",
+                **f.gate.stats(),
+                **f.metrics.snapshot(),
+            }
+            for f in self.forwarders
+        ]
+        if self.worker_pool is not None and self.worker_pool.started:
+            for worker_snapshots in self.worker_pool.stats("listener_metrics"):
+                snapshots.extend(worker_snapshots)
+        return snapshots
+
     def stop_all(self):
         for f in self.forwarders:
             try:
                 f.stop()
             except Exception:
                 pass
+            if self.health is not None and f.upstreams is not None:
+                self.health.unwatch(f.upstreams)
+        for lt in self._loops:
+            lt.stop()
+        self._loops.clear()
+        for pool in self.pools.values():
+            pool.close()
+        self.pools.clear()
+        if self.worker_pool is not None:
+            self.worker_pool.stop()
@@ -1,107 +1,386 @@
 """Lightweight HTTP/HTTPS servers visible in the LAN.
 
-This module provides a simple HTML handler and a manager that binds HTTP/HTTPS
-servers to specific IP addresses. It is used by the CLI to expose a trivial
-landing page for each virtual IP to quickly verify reachability.
+This module provides a simple landing page and a manager that binds HTTP/HTTPS
+servers to specific IP addresses, all running on one shared asyncio event
+loop. It is used by the CLI to expose a trivial landing page for each virtual
+IP to quickly verify reachability.
 """
 
-import threading
+import asyncio
+import html
+import json
+import socket
 import time
 import ssl
 import logging
-from http.server import HTTPServer, BaseHTTPRequestHandler
-from typing import List, Optional, Tuple
+import zlib
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler
+from typing import Dict, List, Optional, Set, Tuple
+
+from .proxy import EventLoopThread
 
 logger = logging.getLogger("arpx.server")
 
+# seconds an idle keep-alive connection is kept open
+KEEPALIVE_TIMEOUT = 5.0
+# seconds a TLS client gets to finish its handshake
+HANDSHAKE_TIMEOUT = 10.0
+# largest request head and body (the body is read and discarded)
+MAX_HEAD = 64 * 1024
+MAX_BODY = 64 * 1024
+
+_date_cache: Tuple[int, bytes] = (0, b"")
+
+
+def _http_date() -> bytes:
+    """RFC 7231 Date header value, formatted once per second."""
+    global _date_cache
+    now = int(time.time())
+    if _date_cache[0] != now:
+        _date_cache = (now, formatdate(now, usegmt=True).encode())
+    return _date_cache[1]
+
+# marks the per-request fields in the rendered template; cannot occur in escaped HTML
+_SLOT = "\x00"
+
+_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+    <title>{title}</title>
+    <meta charset="utf-8">
+    <style>
+        body {{ font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; margin: 0; padding: 0; min-height: 100vh; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); display: flex; align-items: center; justify-content: center; }}
+        .container {{ background: white; border-radius: 20px; padding: 40px; box-shadow: 0 20px 60px rgba(0,0,0,0.3); max-width: 500px; width: 90%; }}
+        h1 {{ color: #333; margin: 0 0 30px 0; font-size: 2.0em; text-align: center; }}
+        .info-grid {{ display: grid; gap: 15px; }}
+        .info-item {{ background: #f7f9fc; padding: 15px; border-radius: 10px; border-left: 4px solid #667eea; }}
+        .label {{ color: #666; font-size: 0.9em; margin-bottom: 5px; }}
+        .value {{ color: #333; font-weight: bold; font-size: 1.1em; font-family: 'Courier New', monospace; }}
+        .status {{ background: #10b981; color: white; padding: 5px 15px; border-radius: 20px; display: inline-block; margin-top: 20px; }}
+        code {{ background: #f3f4f6; padding: 2px 6px; border-radius: 4px; font-family: monospace; }}
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>🌐 {title}</h1>
+        <div class="info-grid">
+            <div class="info-item"><div class="label">📡 Server IP</div><div class="value">{server_ip}</div></div>
+            <div class="info-item"><div class="label">🚪 Port</div><div class="value">{port}</div></div>
+            <div class="info-item"><div class="label">👤 Client IP</div><div class="value">{client_ip}</div></div>
+            <div class="info-item"><div class="label">⏰ Time</div><div class="value">{time}</div></div>
+            <div class="info-item"><div class="label">📅 Date</div><div class="value">{date}</div></div>
+        </div>
+        <center><span class="status">✅ Server running</span></center>
+    </div>
+</body>
+</html>
+"""
+
+
+class LandingPage:
+    """The landing page of one server, pre-encoded around its per-request fields.
+
+    Title, server IP, port and the stylesheet are rendered and encoded once;
+    a request only joins the client IP, time and date into the fixed parts.
+    """
+
+    def __init__(self, content: str, server_ip: str, port: int):
+        self.content = content
+        self.server_ip = server_ip
+        self.port = port
+        page = _TEMPLATE.format(
+            title=html.escape(content), server_ip=html.escape(server_ip), port=port,
+            client_ip=_SLOT, time=_SLOT, date=_SLOT,
+        )
+        self._html_parts = page.encode("utf-8").split(_SLOT.encode())
+        static = json.dumps({"content": content, "server_ip": server_ip, "port": port})
+        self._json_prefix = static[:-1].encode("utf-8") + b", "
+
+    def render_html(self, client_ip: str, now: Optional[float] = None) -> bytes:
+        t = time.localtime(now)
+        head, after_client, after_time, tail = self._html_parts
+        return b"".join((
+            head, html.escape(client_ip).encode(), after_client, time.strftime("%H:%M:%S", t).encode(),
+            after_time, time.strftime("%Y-%m-%d", t).encode(), tail,
+        ))
+
+    def render_json(self, client_ip: str, now: Optional[float] = None) -> bytes:
+        t = time.localtime(now)
+        dynamic = json.dumps({
+            "client_ip": client_ip, "time": time.strftime("%H:%M:%S", t), "date": time.strftime("%Y-%m-%d", t),
+        })
+        return self._json_prefix + dynamic[1:].encode("utf-8")
+
+    def respond(self, client_ip: str, path: str, accept: Optional[str] = None,
+                if_none_match: Optional[str] = None) -> Tuple[int, List[Tuple[str, str]], bytes]:
+        """Status, headers and body for GET path; JSON with ?format=json or Accept: application/json."""
+        params = path.partition("?")[2].split("&")
+        if "format=json" in params:
+            wants_json = True
+        elif "format=html" in params:
+            wants_json = False
+        else:
+            wants_json = "application/json" in (accept or "")
+        if wants_json:
+            body = self.render_json(client_ip)
+            content_type = "application/json"
+        else:
+            body = self.render_html(client_ip)
+            content_type = "text/html; charset=utf-8"
+        etag = etag_for(body)
+        if _etag_matches(if_none_match, etag):
+            return 304, [("ETag", etag), ("Vary", "Accept")], b""
+        return 200, [
+            ("Content-Type", content_type),
+            ("Content-Length", str(len(body))),
+            ("ETag", etag),
+            ("Vary", "Accept"),
+            ("Cache-Control", "no-cache"),
+            ("Access-Control-Allow-Origin", "*"),
+        ], body
+
+
+def etag_for(body: bytes) -> str:
+    return '"%08x-%x"' % (zlib.crc32(body), len(body))
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.replace("W/", "", 1) == etag:
+            return True
+    return False
+
 
 class VisibleHTTPHandler(BaseHTTPRequestHandler):
+    """LandingPage for http.server based servers (LANWebServerManager serves it with asyncio)."""
+
+    protocol_version = "HTTP/1.1"
+    # seconds an idle keep-alive connection is kept open
+    timeout = KEEPALIVE_TIMEOUT
+    # head and body leave in one write (flushed after each request), so keep-alive
+    # responses do not wait on Nagle vs the client's delayed ACK
+    wbufsize = 64 * 1024
+    disable_nagle_algorithm = True
+
     def __init__(self, content: str, server_ip: str, *args, **kwargs):
         self.content = content
         self.server_ip = server_ip
         super().__init__(*args, **kwargs)
 
-    def do_GET(self):
-        self.send_response(200)
-        self.send_header("Content-type", "text/html; charset=utf-8")
-        self.send_header("Access-Control-Allow-Origin", "*")
+    def _page(self) -> LandingPage:
+        page = getattr(self.server, "landing_page", None)
+        if page is None:
+            page = self.server.landing_page = LandingPage(self.content, self.server_ip, self.server.server_address[1])
+        return page
+
+    def _respond(self, head_only: bool) -> None:
+        status, headers, body = self._page().respond(
+            self.client_address[0], self.path, self.headers.get("Accept"), self.headers.get("If-None-Match")
+        )
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
         self.end_headers()
-        client_ip = self.client_address[0]
-        html = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>{self.content}</title>
-            <meta charset="utf-8">
-            <style>
-                body {{ font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; margin: 0; padding: 0; min-height: 100vh; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); display: flex; align-items: center; justify-content: center; }}
-                .container {{ background: white; border-radius: 20px; padding: 40px; box-shadow: 0 20px 60px rgba(0,0,0,0.3); max-width: 500px; width: 90%; }}
-                h1 {{ color: #333; margin: 0 0 30px 0; font-size: 2.0em; text-align: center; }}
-                .info-grid {{ display: grid; gap: 15px; }}
-                .info-item {{ background: #f7f9fc; padding: 15px; border-radius: 10px; border-left: 4px solid #667eea; }}
-                .label {{ color: #666; font-size: 0.9em; margin-bottom: 5px; }}
-                .value {{ color: #333; font-weight: bold; font-size: 1.1em; font-family: 'Courier New', monospace; }}
-                .status {{ background: #10b981; color: white; padding: 5px 15px; border-radius: 20px; display: inline-block; margin-top: 20px; }}
-                code {{ background: #f3f4f6; padding: 2px 6px; border-radius: 4px; font-family: monospace; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <h1>🌐 {self.content}</h1>
-                <div class="info-grid">
-                    <div class="info-item"><div class="label">📡 Server IP</div><div class="value">{self.server_ip}</div></div>
-                    <div class="info-item"><div class="label">🚪 Port</div><div class="value">{self.server.server_address[1]}</div></div>
-                    <div class="info-item"><div class="label">👤 Client IP</div><div class="value">{client_ip}</div></div>
-                    <div class="info-item"><div class="label">⏰ Time</div><div class="value">{time.strftime('%H:%M:%S')}</div></div>
-                    <div class="info-item"><div class="label">📅 Date</div><div class="value">{time.strftime('%Y-%m-%d')}</div></div>
-                </div>
-                <center><span class="status">✅ Server running</span></center>
-            </div>
-        </body>
-        </html>
-        """
+        if head_only or not body:
+            return
         try:
-            self.wfile.write(html.encode("utf-8"))
+            self.wfile.write(body)
         except BrokenPipeError:
             # client disconnected before we finished
-            pass
+            self.close_connection = True
+
+    def do_GET(self):
+        self._respond(head_only=False)
+
+    def do_HEAD(self):
+        self._respond(head_only=True)
 
     def log_message(self, format, *args):
         client_ip = self.client_address[0]
         logger.debug("Connection from %s -> %s", client_ip, self.server_ip)
 
 
+_REASONS = {
+    200: b"OK", 304: b"Not Modified", 400: b"Bad Request", 405: b"Method Not Allowed",
+    413: b"Payload Too Large", 431: b"Request Header Fields Too Large",
+}
+
+
+def _response_head(status: int, headers: List[Tuple[str, str]], keepalive: bool) -> bytes:
+    lines = [b"HTTP/1.1 %d %s" % (status, _REASONS[status]), b"Date: " + _http_date()]
+    lines += [f"{name}: {value}".encode("latin-1") for name, value in headers]
+    if not keepalive:
+        lines.append(b"Connection: close")
+    return b"\r\n".join(lines) + b"\r\n\r\n"
+
+
+class _LandingProtocol(asyncio.Protocol):
+    """One client connection: request heads are parsed from the buffer and each is answered in one write.
+
+    A protocol rather than streams: no task, reader or writer per connection.
+    """
+
+    def __init__(self, server: "LandingServer"):
+        self.server = server
+        self.buf = bytearray()
+        self.discard = 0  # request body bytes still to skip
+        self.client_ip = ""
+        self.transport: Optional[asyncio.Transport] = None
+        self._loop = asyncio.get_running_loop()
+        self._last = 0.0
+        self._idle: Optional[asyncio.TimerHandle] = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.server.connections.add(self)
+        peer = transport.get_extra_info("peername")
+        self.client_ip = peer[0] if peer else ""
+        sock = transport.get_extra_info("socket")
+        if sock is not None:
+            try:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            except OSError:
+                pass
+        self._last = self._loop.time()
+        self._idle = self._loop.call_later(KEEPALIVE_TIMEOUT, self._check_idle)
+
+    def _check_idle(self):
+        # activity only stamps _last; the timer re-arms itself instead of being reset per request
+        remaining = self._last + KEEPALIVE_TIMEOUT - self._loop.time()
+        if remaining > 0:
+            self._idle = self._loop.call_later(remaining, self._check_idle)
+        else:
+            self.transport.close()
+
+    def connection_lost(self, exc):
+        self.server.connections.discard(self)
+        if self._idle is not None:
+            self._idle.cancel()
+            self._idle = None
+
+    def data_received(self, data: bytes):
+        self._last = self._loop.time()
+        self.buf += data
+        while not self.transport.is_closing():
+            if self.discard:
+                skipped = min(self.discard, len(self.buf))
+                del self.buf[:skipped]
+                self.discard -= skipped
+                if self.discard:
+                    return
+            end = self.buf.find(b"\r\n\r\n")
+            if end < 0:
+                if len(self.buf) > MAX_HEAD:
+                    self._fail(431)
+                return
+            head = bytes(self.buf[:end])
+            del self.buf[:end + 4]
+            self._request(head)
+
+    def _fail(self, status: int):
+        self.transport.write(_response_head(status, [("Content-Length", "0")], False))
+        self.transport.close()
+
+    def _request(self, head: bytes):
+        request_line, *header_lines = head.decode("latin-1").split("\r\n")
+        parts = request_line.split(" ")
+        if len(parts) != 3 or not parts[2].startswith("HTTP/1."):
+            self._fail(400)
+            return
+        method, path, version = parts
+        headers: Dict[str, str] = {}
+        for line in header_lines:
+            name, sep, value = line.partition(":")
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+        length = headers.get("content-length", "0")
+        if "transfer-encoding" in headers or not length.isdigit() or int(length) > MAX_BODY:
+            # the landing page takes no request bodies; do not try to frame one
+            self._fail(413)
+            return
+        self.discard = int(length)
+        connection = headers.get("connection", "").lower()
+        keepalive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+        if method not in ("GET", "HEAD"):
+            self.transport.write(_response_head(405, [("Allow", "GET, HEAD"), ("Content-Length", "0")], keepalive))
+        else:
+            self.server.requests += 1
+            status, response_headers, body = self.server.page.respond(
+                self.client_ip, path, headers.get("accept"), headers.get("if-none-match")
+            )
+            response = _response_head(status, response_headers, keepalive)
+            self.transport.write(response if method == "HEAD" else response + body)
+        if not keepalive:
+            self.transport.close()
+
+
+class LandingServer:
+    """HTTP/1.1 landing page server for one address, run on an asyncio loop.
+
+    TLS handshakes run on the loop (asyncio SSL transports), so a slow client
+    or handshake never holds up accepting or serving other connections.
+    """
+
+    def __init__(self, ip_address: str, port: int, content: str, ssl_context: Optional[ssl.SSLContext] = None):
+        self.ip_address = ip_address
+        self.port = port
+        self.content = content
+        self.ssl_context = ssl_context
+        self.page = LandingPage(content, ip_address, port)
+        self.requests = 0
+        self.connections: Set[_LandingProtocol] = set()
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def server_address(self) -> Tuple[str, int]:
+        return self.ip_address, self.port
+
+    async def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._server = await loop.create_server(
+            lambda: _LandingProtocol(self), self.ip_address, self.port, ssl=self.ssl_context,
+            ssl_handshake_timeout=HANDSHAKE_TIMEOUT if self.ssl_context is not None else None,
+        )
+        if self.port == 0:
+            self.port = self._server.sockets[0].getsockname()[1]
+            self.page = LandingPage(self.content, self.ip_address, self.port)
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            # newer Pythons make wait_closed() wait for open keep-alive connections too
+            for conn in list(self.connections):
+                conn.transport.abort()
+            await self._server.wait_closed()
+            self._server = None
+
+
 class LANWebServerManager:
+    """Landing servers for virtual IPs, all served by one shared asyncio event loop."""
+
     def __init__(self):
-        self.servers: List[HTTPServer] = []
-        self.threads: List[threading.Thread] = []
+        self.servers: List[LandingServer] = []
+        self._loop: Optional[EventLoopThread] = None
 
-    def start_lan_server(self, ip_address: str, port: int, content: str, ssl_context: Optional[ssl.SSLContext] = None) -> Optional[HTTPServer]:
-        def handler(*args, **kwargs):
-            return VisibleHTTPHandler(content, ip_address, *args, **kwargs)
+    def start_lan_server(self, ip_address: str, port: int, content: str, ssl_context: Optional[ssl.SSLContext] = None) -> Optional[LandingServer]:
+        if self._loop is None:
+            self._loop = EventLoopThread(name="arpx-web-loop")
+            self._loop.start()
+        server = LandingServer(ip_address, port, content, ssl_context)
         try:
-            server = HTTPServer((ip_address, port), handler)
-            server.timeout = 0.5
-            if ssl_context is not None:
-                server.socket = ssl_context.wrap_socket(server.socket, server_side=True)
-
-            def serve_forever_with_shutdown():
-                while not getattr(server, 'shutdown_requested', False):
-                    server.handle_request()
-
-            thread = threading.Thread(target=serve_forever_with_shutdown)
-            thread.daemon = True
-            thread.start()
-
-            self.servers.append(server)
-            self.threads.append(thread)
-            scheme = "https" if ssl_context else "http"
-            logger.info("%s server started: %s://%s:%d", scheme.upper(), scheme, ip_address, port)
-            logger.debug("Handler content: %s", content)
-            return server
+            self._loop.run(server.start(), timeout=10)
         except Exception as e:
             logger.error("Failed to start server on %s:%d: %s", ip_address, port, e)
             return None
+        self.servers.append(server)
+        scheme = "https" if ssl_context else "http"
+        logger.info("%s server started: %s://%s:%d", scheme.upper(), scheme, ip_address, server.port)
+        logger.debug("Handler content: %s", content)
+        return server
 
     def test_connectivity(self, ip_address: str, port: int, scheme: str = "http") -> bool:
         try:
@@ -121,8 +400,13 @@ class LANWebServerManager:
         return False
 
     def stop_all(self) -> None:
+        if self._loop is None:
+            return
         for server in self.servers:
             try:
-                server.shutdown_requested = True
+                self._loop.run(server.close(), timeout=5)
             except Exception:
                 pass
+        self.servers.clear()
+        self._loop.stop()
+        self._loop = None
@@ -0,0 +1,196 @@
+"""Durable record of the resources a running arpx created.
+
+A StateJournal is a small JSON file naming the interface, the alias IPs
+(each implies a neighbour entry), the firewall chains and the kernel NAT
+table of one `arpx up` or `arpx compose` process. Resources are recorded
+before they are created and forgotten after they are removed, and every
+change is written to a temporary file, fsynced and renamed over the
+journal, so after a crash or kill -9 the file lists at least everything
+that may have been left behind.
+
+`arpx compose down` and the next start read it to stop a still running
+owner or to remove the leftovers directly (release()), without probing
+the network for them.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from .firewall import Firewall
+from .nat import NftablesNat
+from .network import NetworkVisibleManager
+
+logger = logging.getLogger("arpx.state")
+
+STATE_DIR = Path(os.environ.get("ARPX_STATE_DIR", "/run/arpx"))
+
+
+def state_path(kind: str, key: str, state_dir: Optional[Path] = None) -> Path:
+    """Journal of one `arpx <kind>` instance, e.g. state_path("compose", "/srv/app/docker-compose.yml")."""
+    digest = hashlib.sha1(key.encode()).hexdigest()[:12]
+    return Path(state_dir or STATE_DIR) / f"{kind}-{digest}.json"
+
+
+class StateJournal:
+    """Resources of this process, rewritten atomically on every change.
+
+    Safe to update from several threads (e.g. the compose watcher and the
+    main thread).
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.state: Dict[str, object] = {
+            "pid": os.getpid(), "pid_start": process_start(os.getpid()), "started": time.time(), "aliases": {},
+        }
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def load(path: Path) -> Optional[Dict[str, object]]:
+        """Recorded state, or None when there is no (readable) journal."""
+        try:
+            state = json.loads(Path(path).read_text())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable state file %s: %s", path, e)
+            return None
+        return state if isinstance(state, dict) else None
+
+    @staticmethod
+    def save(path: Path, state: Dict[str, object]) -> None:
+        """Write state to path atomically: temporary file, fsync, rename, fsync of the directory."""
+        path = Path(path)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        data = json.dumps(state, indent=1, sort_keys=True).encode()
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(str(tmp), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            try:
+                os.write(fd, data)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            os.replace(tmp, path)
+            # make the rename itself durable
+            dir_fd = os.open(str(path.parent), os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+        except OSError as e:
+            # losing the journal must not take the bridge down; only recovery suffers
+            logger.warning("Could not write state file %s: %s", path, e)
+
+    def _write(self) -> None:
+        self.save(self.path, self.state)
+
+    def describe(self, **fields) -> None:
+        """Set fields that are written with the next recorded resource (nothing exists yet)."""
+        with self._lock:
+            self.state.update(fields)
+
+    def update(self, **fields) -> None:
+        with self._lock:
+            self.state.update(fields)
+            self._write()
+
+    def record_aliases(self, entries: Iterable[Tuple[str, str, str]]) -> None:
+        """Record (ip, name, cidr) aliases, name being the label suffix (e.g. the service)."""
+        with self._lock:
+            aliases = self.state["aliases"]
+            for ip, name, cidr in entries:
+                aliases[ip] = {"name": name, "cidr": cidr}
+            self._write()
+
+    def forget_aliases(self, ips: Iterable[str]) -> None:
+        with self._lock:
+            aliases = self.state["aliases"]
+            removed = [aliases.pop(ip) for ip in ips if ip in aliases]
+            if removed:
+                self._write()
+
+    def clear(self) -> None:
+        """Everything was removed: drop the journal."""
+        with self._lock:
+            self.state["aliases"] = {}
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def process_start(pid: int) -> Optional[int]:
+    """Start time of a process in clock ticks since boot (/proc/<pid>/stat field 22), None if unknown.
+
+    Together with the PID it identifies a process: a recycled PID has a
+    later start time.
+    """
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text()
+    except OSError:
+        return None
+    # the command name (field 2) may contain spaces and parentheses
+    fields = stat[stat.rfind(")") + 2:].split()
+    try:
+        return int(fields[19])
+    except (IndexError, ValueError):
+        return None
+
+
+def owner_alive(state: Dict[str, object]) -> bool:
+    """Whether the process that wrote state is still running (and is not this one).
+
+    Only a process with the recorded PID and start time counts, so a PID
+    reused after a crash is never taken for the owner (and never signalled).
+    """
+    pid = state.get("pid")
+    if not isinstance(pid, int) or pid == os.getpid():
+        return False
+    started = state.get("pid_start")
+    return started is not None and process_start(pid) == started
+
+
+def reusable_ips(state: Dict[str, object]) -> Dict[str, str]:
+    """Alias IP by name (service) from a previous run, to hand the same names the same addresses."""
+    return {entry["name"]: ip for ip, entry in (state.get("aliases") or {}).items()}
+
+
+def release(state: Dict[str, object]) -> int:
+    """Remove everything recorded in state, as its owner's cleanup would; returns the aliases removed.
+
+    What could not be removed stays in state (aliases, firewall), so the
+    caller can save it back for another attempt.
+    """
+    aliases = state.get("aliases") or {}
+    interface = state.get("interface")
+    removed = 0
+    if aliases and interface:
+        net = NetworkVisibleManager(str(interface), backend=str(state.get("net_backend") or "shell"), firewall_backend="none")
+        for ip in list(aliases):
+            if net.remove_virtual_ip(ip, str(aliases[ip].get("cidr") or "24")):
+                del aliases[ip]
+                removed += 1
+    firewall = state.get("firewall")
+    # only the chains the dead process recorded: others belong to arpx processes still running
+    if isinstance(firewall, dict) and firewall.get("backend") not in (None, "none") and firewall.get("chain"):
+        if Firewall(firewall["backend"], chain=str(firewall["chain"])).teardown():
+            state.pop("firewall")
+    nat_table = state.get("nat_table")
+    if not nat_table or NftablesNat(table=str(nat_table)).cleanup():
+        state.pop("nat_table", None)
+    return removed
+
+
+def leftovers(state: Dict[str, object]) -> bool:
+    """Whether state still lists resources after release()."""
+    firewall = state.get("firewall")
+    return bool(state.get("aliases")) or bool(state.get("nat_table")) or (
+        isinstance(firewall, dict) and firewall.get("backend") not in (None, "none") and bool(firewall.get("chain"))
+    )
@@ -1,48 +1,240 @@
+import asyncio
 import socket
 import ssl
 import threading
+import time
 import logging
-from typing import Optional, Tuple, List
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Sequence, Tuple, List, Union
+
+from .balancer import POLICIES, NoHealthyUpstream, UpstreamGroup, group_for
+from .proxy import ENGINES, AsyncTcpForwarder, ConnectionGate, ConnectionLimits, EventLoopThread, IdleTracker, shed
+from .metrics import ListenerMetrics
+from .workers import ListenerWorkers
+
+if TYPE_CHECKING:
+    from .health import HealthChecker
 
 logger = logging.getLogger("arpx.terminator")
 
+# asyncio streams can upgrade an accepted connection to TLS since Python 3.11
+_HAS_STREAM_START_TLS = hasattr(asyncio.StreamWriter, "start_tls")
+
+
+class TlsSessionCache:
+    """Server SSLContext shared by terminators, with rotating ticket keys.
+
+    OpenSSL keeps the session cache and the session-ticket keys inside the
+    SSLContext, and Python cannot set ticket keys directly. Sharing one context
+    between all terminators therefore shares the cache; rotating the keys means
+    swapping in a freshly built context every `rotate_interval` seconds
+    (tickets issued under the previous keys fall back to a full handshake).
+
+    A cache pickles as its factory and interval (the context is rebuilt on
+    unpickling), which is how terminator worker processes receive it; the
+    factory must then be picklable, e.g. a functools.partial.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], ssl.SSLContext],
+        rotate_interval: Optional[float] = 3600.0,
+        context: Optional[ssl.SSLContext] = None,
+    ):
+        self.factory = factory
+        self.rotate_interval = rotate_interval
+        self.rotations = 0
+        self._ctx = context if context is not None else factory()
+        self._created = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        return {"factory": self.factory, "rotate_interval": self.rotate_interval}
+
+    def __setstate__(self, state):
+        self.__init__(state["factory"], state["rotate_interval"])
+
+    @classmethod
+    def fixed(cls, context: ssl.SSLContext) -> "TlsSessionCache":
+        """Wrap a context that is never rotated."""
+        return cls(lambda: context, rotate_interval=None, context=context)
+
+    @property
+    def context(self) -> ssl.SSLContext:
+        if self.rotate_interval and time.monotonic() - self._created >= self.rotate_interval:
+            with self._lock:
+                if time.monotonic() - self._created >= self.rotate_interval:
+                    try:
+                        self._ctx = self.factory()
+                        self.rotations += 1
+                        logger.debug("Rotated TLS session ticket keys (rotation %d)", self.rotations)
+                    except Exception as e:
+                        logger.warning("TLS context rotation failed, keeping current keys: %s", e)
+                    self._created = time.monotonic()
+        return self._ctx
+
+
+def _as_session_cache(ssl_context: Union[ssl.SSLContext, TlsSessionCache]) -> TlsSessionCache:
+    if isinstance(ssl_context, TlsSessionCache):
+        return ssl_context
+    return TlsSessionCache.fixed(ssl_context)
+
+
+class _HandshakeCounters:
+    """Full vs resumed handshake counters shared by both terminator engines."""
+
+    def _init_counters(self):
+        self.handshakes_full = 0
+        self.handshakes_resumed = 0
+        self._counters_lock = threading.Lock()
+
+    def _count_handshake(self, ssl_obj) -> None:
+        if ssl_obj is None:
+            return
+        with self._counters_lock:
+            if ssl_obj.session_reused:
+                self.handshakes_resumed += 1
+            else:
+                self.handshakes_full += 1
+
 
-class TlsTerminator:
+class TlsTerminator(_HandshakeCounters):
     """Accept TLS on (listen_host, listen_port) and forward plaintext to target.
 
     This allows exposing HTTPS externally while forwarding to a plaintext HTTP
-    service internally.
+    service internally. The accept loop only accepts; the TLS handshake (bounded
+    by handshake_timeout), the upstream connect and the piping all run in a
+    per-connection thread, so a slow client never blocks the others.
+
+    ssl_context may be a TlsSessionCache; each handshake then uses its current
+    (possibly rotated) context. With upstreams (an UpstreamGroup) plaintext
+    connections are balanced over the group's targets. limits
+    (ConnectionLimits) is applied before the handshake, and reuse_port set on
+    the listening socket, as in TcpForwarder.
     """
 
     def __init__(
         self,
         listen: Tuple[str, int],
         target: Tuple[str, int],
-        ssl_context: ssl.SSLContext,
+        ssl_context: Union[ssl.SSLContext, TlsSessionCache],
         buffer_size: int = 65536,
+        handshake_timeout: float = 10.0,
+        upstreams: Optional[UpstreamGroup] = None,
+        limits: Optional[ConnectionLimits] = None,
+        reuse_port: bool = False,
     ):
         self.listen_host, self.listen_port = listen
         self.target_host, self.target_port = target
-        self.ctx = ssl_context
+        self.upstreams = upstreams
+        self.gate = ConnectionGate(limits)
+        self.limits = self.gate.limits
+        self.reuse_port = reuse_port
+        self.metrics = ListenerMetrics()
+        self.sessions = _as_session_cache(ssl_context)
+        self._init_counters()
         self.buffer_size = buffer_size
+        self.handshake_timeout = handshake_timeout
         self._server_sock: Optional[socket.socket] = None
         self._thread: Optional[threading.Thread] = None
         self._stop = threading.Event()
 
-    def _pipe(self, src: socket.socket, dst: socket.socket):
+    def _pipe(self, src: socket.socket, dst: socket.socket, activity: Optional[IdleTracker] = None) -> int:
+        total = 0
         try:
             while not self._stop.is_set():
-                data = src.recv(self.buffer_size)
+                try:
+                    data = src.recv(self.buffer_size)
+                except socket.timeout:
+                    if activity is not None and activity.keep_waiting():
+                        continue
+                    raise
                 if not data:
                     break
+                total += len(data)
+                if activity is not None:
+                    activity.touch()
                 dst.sendall(data)
         except Exception:
             pass
         finally:
             try:
-                dst.shutdown(socket.SHUT_WR)
+                dst.shutdown(socket.SHUT_RDWR if activity is not None and activity.expired else socket.SHUT_WR)
+            except Exception:
+                pass
+        return total
+
+    def _handle_client(self, client: socket.socket):
+        # Wrap client in TLS; the timeout keeps a stalled handshake from pinning the thread
+        started = time.monotonic()
+        try:
+            client.settimeout(self.handshake_timeout)
+            tls_client = self.sessions.context.wrap_socket(client, server_side=True)
+            tls_client.settimeout(self.limits.idle_timeout)
+            self.metrics.handshake(time.monotonic() - started)
+            self._count_handshake(tls_client)
+        except (ssl.SSLError, OSError) as e:
+            logger.warning("TLS handshake failed: %s", e)
+            try:
+                client.close()
+            except Exception:
+                pass
+            return
+
+        # Connect upstream (plaintext)
+        member = None
+        connect_started = time.monotonic()
+        try:
+            if self.upstreams is None:
+                upstream = socket.create_connection((self.target_host, self.target_port))
+            else:
+                upstream, member = self.upstreams.connect(tls_client.getpeername()[0])
+        except Exception as e:
+            if isinstance(e, NoHealthyUpstream):
+                logger.debug("Rejected TLS client of %s:%d: no healthy upstream", self.listen_host, self.listen_port)
+            else:
+                self.metrics.connect_failed()
+                logger.warning("Connect failed to %s:%d: %s", self.target_host, self.target_port, e)
+            try:
+                tls_client.close()
             except Exception:
                 pass
+            return
+        self.metrics.connected(time.monotonic() - connect_started)
+
+        activity: Optional[IdleTracker] = None
+        if self.limits.idle_timeout:
+            activity = IdleTracker(self.limits.idle_timeout)
+            upstream.settimeout(self.limits.idle_timeout)
+        received: List[int] = []
+        t = threading.Thread(
+            target=lambda: received.append(self._pipe(tls_client, upstream, activity)), daemon=True
+        )
+        t.start()
+        sent = self._pipe(upstream, tls_client, activity)
+        t.join()
+        self.metrics.closed(received[0] if received else 0, sent, time.monotonic() - started)
+        if activity is not None and activity.expired:
+            self.gate.count_idle_close()
+        if member is not None:
+            self.upstreams.release(member)
+        try:
+            upstream.close()
+        except Exception:
+            pass
+        try:
+            tls_client.close()
+        except Exception:
+            pass
+
+    def _run_client(self, client: socket.socket, client_ip: str):
+        try:
+            self._handle_client(client)
+        finally:
+            self.gate.release(client_ip)
+
+    @property
+    def ctx(self) -> ssl.SSLContext:
+        return self.sessions.context
 
     def _serve(self):
         logger.info(
@@ -55,50 +247,23 @@ class TlsTerminator:
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
             self._server_sock = s
             s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if self.reuse_port:
+                s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
             s.bind((self.listen_host, self.listen_port))
-            s.listen(128)
+            s.listen(self.limits.backlog)
             s.settimeout(0.5)
             while not self._stop.is_set():
                 try:
-                    client, _addr = s.accept()
+                    client, addr = s.accept()
                 except socket.timeout:
                     continue
                 except OSError:
                     break
-                # Wrap client in TLS
-                try:
-                    tls_client = self.ctx.wrap_socket(client, server_side=True)
-                except ssl.SSLError as e:
-                    logger.warning("TLS handshake failed: %s", e)
-                    try:
-                        client.close()
-                    except Exception:
-                        pass
+                if not self.gate.admit(addr[0]):
+                    logger.debug("Shed TLS connection from %s to %s:%d (limit reached)", addr[0], self.listen_host, self.listen_port)
+                    shed(client)
                     continue
-
-                # Connect upstream (plaintext)
-                try:
-                    upstream = socket.create_connection((self.target_host, self.target_port))
-                except Exception as e:
-                    logger.warning("Connect failed to %s:%d: %s", self.target_host, self.target_port, e)
-                    try:
-                        tls_client.close()
-                    except Exception:
-                        pass
-                    continue
-
-                t1 = threading.Thread(target=self._pipe, args=(tls_client, upstream), daemon=True)
-                t2 = threading.Thread(target=self._pipe, args=(upstream, tls_client), daemon=True)
-                t1.start(); t2.start()
-                t1.join(); t2.join()
-                try:
-                    upstream.close()
-                except Exception:
-                    pass
-                try:
-                    tls_client.close()
-                except Exception:
-                    pass
+                threading.Thread(target=self._run_client, args=(client, addr[0]), daemon=True).start()
         logger.info("TLS terminator stopped %s:%d", self.listen_host, self.listen_port)
 
     def start(self):
@@ -118,19 +283,202 @@ class TlsTerminator:
             self._thread.join(timeout=2)
 
 
+class AsyncTlsTerminator(_HandshakeCounters, AsyncTcpForwarder):
+    """TLS terminator on a shared asyncio event loop.
+
+    Handshakes are non-blocking and bounded by handshake_timeout, so thousands
+    of sessions can be in flight on one loop thread. On Python 3.11+ each
+    accepted connection is upgraded with the session cache's current context,
+    so ticket-key rotation applies; older versions fix the context at start().
+    """
+
+    kind = "TLS terminator"
+
+    def __init__(
+        self,
+        listen: Tuple[str, int],
+        target: Tuple[str, int],
+        ssl_context: Union[ssl.SSLContext, TlsSessionCache],
+        loop: EventLoopThread,
+        buffer_size: int = 65536,
+        handshake_timeout: float = 10.0,
+        upstreams: Optional[UpstreamGroup] = None,
+        limits: Optional[ConnectionLimits] = None,
+        reuse_port: bool = False,
+    ):
+        super().__init__(listen, target, loop, buffer_size, upstreams=upstreams, limits=limits, reuse_port=reuse_port)
+        self.sessions = _as_session_cache(ssl_context)
+        self._init_counters()
+        self.handshake_timeout = handshake_timeout
+
+    @property
+    def ctx(self) -> ssl.SSLContext:
+        return self.sessions.context
+
+    async def _serve_connection(
+        self, client_reader: asyncio.StreamReader, client_writer: asyncio.StreamWriter
+    ) -> Optional[Tuple[int, int]]:
+        if _HAS_STREAM_START_TLS:
+            started = time.monotonic()
+            try:
+                await client_writer.start_tls(self.sessions.context, ssl_handshake_timeout=self.handshake_timeout)
+            except Exception as e:
+                logger.warning("TLS handshake failed: %s", e)
+                client_writer.close()
+                return None
+            self.metrics.handshake(time.monotonic() - started)
+        self._count_handshake(client_writer.get_extra_info("ssl_object"))
+        return await super()._serve_connection(client_reader, client_writer)
+
+    async def _start(self):
+        tls_kwargs = {}
+        if not _HAS_STREAM_START_TLS:
+            tls_kwargs = {"ssl": self.sessions.context, "ssl_handshake_timeout": self.handshake_timeout}
+        self._server = await asyncio.start_server(
+            self._handle_client,
+            self.listen_host,
+            self.listen_port,
+            reuse_address=True,
+            reuse_port=self.reuse_port or None,
+            backlog=self.limits.backlog,
+            **tls_kwargs,
+        )
+
+
 class TlsTerminatorManager:
-    def __init__(self):
-        self.terms: List[TlsTerminator] = []
+    """Create and stop TLS terminators using one of the forwarder ENGINES.
+
+    Pass the same SSLContext or TlsSessionCache to every add() so that all
+    terminators share one session cache and ticket keys. add(..., targets=[...])
+    with more than one target balances over them using `policy`; with a
+    HealthChecker the targets are probed actively. limits (ConnectionLimits)
+    applies to each terminator separately.
+
+    With workers > 1 terminators run in that many processes sharing each
+    port through SO_REUSEPORT (arpx.workers), so handshakes use every core;
+    ssl_context must then be a TlsSessionCache with a picklable factory, and
+    add() returns None.
+    """
+
+    def __init__(
+        self,
+        engine: str = "thread",
+        policy: str = "round-robin",
+        health: Optional["HealthChecker"] = None,
+        limits: Optional[ConnectionLimits] = None,
+        workers: int = 1,
+        reuse_port: bool = False,
+    ):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown terminator engine: {engine}")
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown balancing policy: {policy}")
+        self.engine = engine
+        self.policy = policy
+        self.health = health
+        self.limits = limits
+        self.reuse_port = reuse_port
+        self.worker_pool: Optional[ListenerWorkers] = None
+        if workers > 1:
+            self.worker_pool = ListenerWorkers("terminator", workers, {
+                "engine": engine, "policy": policy, "limits": limits,
+                "health": health.settings() if health is not None else None,
+            })
+        self.terms: List[Union[TlsTerminator, AsyncTlsTerminator]] = []
+        self._loop: Optional[EventLoopThread] = None
 
-    def add(self, listen_host: str, listen_port: int, target_host: str, target_port: int, ssl_context: ssl.SSLContext) -> TlsTerminator:
-        t = TlsTerminator((listen_host, listen_port), (target_host, target_port), ssl_context)
+    def add(
+        self,
+        listen_host: str,
+        listen_port: int,
+        target_host: str,
+        target_port: int,
+        ssl_context: Union[ssl.SSLContext, TlsSessionCache],
+        targets: Optional[Sequence[Tuple[str, int]]] = None,
+    ) -> Optional[Union[TlsTerminator, AsyncTlsTerminator]]:
+        if self.worker_pool is not None:
+            if not isinstance(ssl_context, TlsSessionCache):
+                raise ValueError("Terminator workers need a TlsSessionCache (an SSLContext cannot be sent to them)")
+            self.worker_pool.add(
+                listen_host=listen_host, listen_port=listen_port, target_host=target_host,
+                target_port=target_port, ssl_context=ssl_context, targets=targets,
+            )
+            return None
+        group = group_for((target_host, target_port), targets, self.policy, self.health)
+        t: Union[TlsTerminator, AsyncTlsTerminator]
+        if self.engine == "asyncio":
+            if self._loop is None:
+                self._loop = EventLoopThread(name="arpx-tls-loop")
+                self._loop.start()
+            t = AsyncTlsTerminator(
+                (listen_host, listen_port), (target_host, target_port), ssl_context, self._loop,
+                upstreams=group, limits=self.limits, reuse_port=self.reuse_port,
+            )
+        else:
+            t = TlsTerminator(
+                (listen_host, listen_port), (target_host, target_port), ssl_context,
+                upstreams=group, limits=self.limits, reuse_port=self.reuse_port,
+            )
         t.start()
         self.terms.append(t)
         return t
 
+    def remove(self, listen_host: str, listen_port: int) -> bool:
+        """Stop the terminator listening on listen_host:listen_port (see TcpForwarderManager.remove)."""
+        if self.worker_pool is not None:
+            return any(self.worker_pool.remove(listen_host=listen_host, listen_port=listen_port))
+        matching = [t for t in self.terms if (t.listen_host, t.listen_port) == (listen_host, listen_port)]
+        for t in matching:
+            try:
+                t.stop()
+            except Exception:
+                pass
+            if self.health is not None and t.upstreams is not None:
+                self.health.unwatch(t.upstreams)
+        self.terms = [t for t in self.terms if t not in matching]
+        return bool(matching)
+
+    def handshake_stats(self) -> Dict[str, int]:
+        """Total full and resumed handshakes across all terminators (and worker processes)."""
+        stats = [{"full": t.handshakes_full, "resumed": t.handshakes_resumed} for t in self.terms]
+        if self.worker_pool is not None and self.worker_pool.started:
+            stats += self.worker_pool.stats("handshake_stats")
+        return ConnectionGate.combined(stats) or {"full": 0, "resumed": 0}
+
+    def connection_stats(self) -> Dict[str, int]:
+        """ConnectionGate counters summed over all terminators (and worker processes)."""
+        stats = [t.gate.stats() for t in self.terms]
+        if self.worker_pool is not None and self.worker_pool.started:
+            stats += self.worker_pool.stats()
+        return ConnectionGate.combined(stats)
+
+    def listener_metrics(self) -> List[Dict[str, object]]:
+        """Gate counters and ListenerMetrics of each terminator, for arpx.metrics.listener_families."""
+        snapshots: List[Dict[str, object]] = [
+            {
+                "kind": "terminator",
+                "listener": f"{t.listen_host}:{t.listen_port}",
+                "target": f"{t.target_host}:{t.target_port}",
+                **t.gate.stats(),
+                **t.metrics.snapshot(),
+            }
+            for t in self.terms
+        ]
+        if self.worker_pool is not None and self.worker_pool.started:
+            for worker_snapshots in self.worker_pool.stats("listener_metrics"):
+                snapshots.extend(worker_snapshots)
+        return snapshots
+
     def stop_all(self):
         for t in self.terms:
             try:
                 t.stop()
             except Exception:
                 pass
+            if self.health is not None and t.upstreams is not None:
+                self.health.unwatch(t.upstreams)
+        if self._loop is not None:
+            self._loop.stop()
+            self._loop = None
+        if self.worker_pool is not None:
+            self.worker_pool.stop()
@@ -0,0 +1,169 @@
+"""Multi-process listeners: N workers bind the same ports with SO_REUSEPORT.
+
+A ListenerWorkers pool spawns `count` processes, each running its own
+TcpForwarderManager or TlsTerminatorManager. Every add() and remove() is
+replayed in all workers, whose listening sockets share the address through
+SO_REUSEPORT so the kernel spreads incoming connections over them and TLS
+handshakes use all cores instead of one GIL.
+
+Workers are started with the "spawn" method (the parent already runs
+threads), so everything handed to them must pickle: TLS contexts are passed
+as a TlsSessionCache whose factory is a module-level function or a
+functools.partial of one, and rebuilt inside each worker.
+"""
+
+import logging
+import multiprocessing
+import signal
+import socket
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("arpx.workers")
+
+HAS_REUSEPORT = hasattr(socket, "SO_REUSEPORT")
+
+# seconds to wait for a worker to answer a command
+COMMAND_TIMEOUT = 30.0
+# manager methods whose results the parent can collect from workers
+_STATS_METHODS = ("connection_stats", "handshake_stats", "listener_metrics")
+
+
+def _build_manager(kind: str, options: Dict[str, Any]):
+    # imported here: arpx.proxy and arpx.terminator import this module
+    from .health import HealthChecker
+
+    options = dict(options)
+    health_options = options.pop("health", None)
+    health = HealthChecker(**health_options) if health_options else None
+    if kind == "forwarder":
+        from .proxy import TcpForwarderManager
+
+        return TcpForwarderManager(health=health, reuse_port=True, **options), health
+    from .terminator import TlsTerminatorManager
+
+    return TlsTerminatorManager(health=health, reuse_port=True, **options), health
+
+
+def _worker_main(conn, kind: str, index: int, options: Dict[str, Any], log_level: int) -> None:
+    # Ctrl+C goes to the whole process group; the parent stops workers explicitly
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.basicConfig(level=log_level, format=f"[%(levelname)s] %(name)s[worker {index}]: %(message)s")
+    manager, health = _build_manager(kind, options)
+    if health is not None:
+        health.start()
+    try:
+        while True:
+            try:
+                op, payload = conn.recv()
+            except (EOFError, OSError):
+                break  # parent went away
+            if op == "stop":
+                break
+            try:
+                if op == "add":
+                    manager.add(**payload)
+                    conn.send(("ok", None))
+                elif op == "remove":
+                    conn.send(("ok", manager.remove(**payload)))
+                elif op == "stats" and payload["method"] in _STATS_METHODS:
+                    conn.send(("ok", getattr(manager, payload["method"])()))
+                else:
+                    conn.send(("error", f"unknown command {op!r}"))
+            except Exception as e:
+                conn.send(("error", str(e)))
+    finally:
+        if health is not None:
+            health.stop()
+        manager.stop_all()
+        try:
+            conn.send(("ok", None))
+        except (BrokenPipeError, OSError):
+            pass
+
+
+class ListenerWorkers:
+    """Worker processes that each run every listener added to the pool.
+
+    kind is "forwarder" or "terminator"; options are the keyword arguments
+    of the worker-side manager (engine, mode, policy, limits, ...), plus an
+    optional "health" dict of HealthChecker arguments, each worker running its
+    own checker. Limits such as max_connections apply per worker.
+    """
+
+    def __init__(self, kind: str, count: int, options: Dict[str, Any]):
+        if kind not in ("forwarder", "terminator"):
+            raise ValueError(f"Unknown listener kind: {kind}")
+        if not HAS_REUSEPORT:
+            raise ValueError("Multiple workers need SO_REUSEPORT, which this platform lacks")
+        self.kind = kind
+        self.count = max(1, count)
+        self.options = options
+        self._procs: List[Tuple[multiprocessing.Process, Any]] = []
+
+    @property
+    def started(self) -> bool:
+        return bool(self._procs)
+
+    def start(self) -> None:
+        if self._procs:
+            return
+        ctx = multiprocessing.get_context("spawn")
+        log_level = logging.getLogger("arpx").getEffectiveLevel()
+        for i in range(self.count):
+            parent_conn, child_conn = ctx.Pipe()
+            proc = ctx.Process(
+                target=_worker_main,
+                args=(child_conn, self.kind, i, self.options, log_level),
+                name=f"arpx-{self.kind}-worker-{i}",
+                daemon=True,
+            )
+            proc.start()
+            child_conn.close()
+            self._procs.append((proc, parent_conn))
+        logger.info("Started %d %s worker processes", self.count, self.kind)
+
+    def _call(self, op: str, payload: Optional[Dict[str, Any]] = None) -> List[Any]:
+        """Send a command to every worker and collect the answers in worker order."""
+        self.start()
+        for _proc, conn in self._procs:
+            conn.send((op, payload))
+        results = []
+        for proc, conn in self._procs:
+            if not conn.poll(COMMAND_TIMEOUT):
+                raise RuntimeError(f"{proc.name} did not answer {op!r}")
+            status, value = conn.recv()
+            if status != "ok":
+                raise RuntimeError(f"{proc.name}: {value}")
+            results.append(value)
+        return results
+
+    def add(self, **kwargs) -> None:
+        self._call("add", kwargs)
+
+    def remove(self, **kwargs) -> List[bool]:
+        """Replay a manager remove() in every worker; whether each had such a listener."""
+        return self._call("remove", kwargs)
+
+    def stats(self, method: str = "connection_stats") -> List[Any]:
+        """Result of the manager's `method` (connection_stats, handshake_stats or listener_metrics) in each worker."""
+        return self._call("stats", {"method": method})
+
+    def stop(self, timeout: float = 5.0) -> None:
+        for proc, conn in self._procs:
+            try:
+                conn.send(("stop", None))
+            except (BrokenPipeError, OSError):
+                pass
+        for proc, conn in self._procs:
+            try:
+                if conn.poll(timeout):
+                    conn.recv()
+            except (EOFError, OSError):
+                pass
+            proc.join(timeout)
+            if proc.is_alive():
+                logger.warning("%s did not exit, terminating it", proc.name)
+                proc.terminate()
+                proc.join(1)
+            conn.close()
+        self._procs.clear()
@@ -0,0 +1,33 @@
+"""Time to find free IPs on a busy /24 with a fake prober: sequential vs concurrent.
+
+Run with: make benchmark (requires pytest-benchmark)
+"""
+import time
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from arpx.network import NetworkVisibleManager
+
+PROBE_DELAY = 0.02  # stands in for the 1s ping/arping timeouts
+
+
+def _busy_network_prober(ip: str) -> bool:
+    time.sleep(PROBE_DELAY)
+    # roughly two out of three addresses are in use
+    return int(ip.split(".")[-1]) % 3 != 0
+
+
+@pytest.mark.parametrize("concurrency", [1, 8, 32])
+def test_find_free_ips_busy_network(benchmark, concurrency):
+    manager = NetworkVisibleManager(interface="eth0")
+    ips = benchmark.pedantic(
+        manager.find_free_ips,
+        args=("192.168.1.0", "24"),
+        kwargs={"num_ips": 10, "start_ip": 100, "concurrency": concurrency, "prober": _busy_network_prober},
+        rounds=3,
+        iterations=1,
+    )
+    assert len(ips) == 10
+    assert ips == sorted(ips, key=lambda ip: int(ip.split(".")[-1]))
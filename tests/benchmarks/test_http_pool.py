@@ -0,0 +1,81 @@
+"""Per-request latency of short HTTP clients: raw TCP forwarding vs pooled HTTP mode.
+
+Every request comes from a new client connection (request, response, close),
+the workload where upstream connection setup dominates.
+
+Run with: make benchmark (requires pytest-benchmark)
+"""
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from arpx.proxy import TcpForwarderManager
+
+REQUESTS = 200
+REQUEST = b"GET / HTTP/1.1\r\nHost: bench\r\nConnection: close\r\n\r\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    body = b"ok" * 64
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+def _get_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _short_requests(port: int, latencies):
+    for _ in range(REQUESTS):
+        start = time.perf_counter()
+        with socket.create_connection(("127.0.0.1", port)) as c:
+            c.sendall(REQUEST)
+            data = b""
+            while not data.endswith(_Handler.body):
+                chunk = c.recv(4096)
+                if not chunk:
+                    break
+                data += chunk
+        latencies.append(time.perf_counter() - start)
+    return len(latencies)
+
+
+@pytest.mark.parametrize("mode", ["tcp", "http"])
+def test_short_request_latency(benchmark, mode):
+    backend = _Server(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=backend.serve_forever, daemon=True).start()
+    forward_port = _get_free_port()
+    mgr = TcpForwarderManager(mode=mode)
+    mgr.add("127.0.0.1", forward_port, "127.0.0.1", backend.server_address[1])
+    time.sleep(0.1)
+    latencies = []
+    try:
+        benchmark.pedantic(_short_requests, args=(forward_port, latencies), rounds=3, iterations=1)
+    finally:
+        mgr.stop_all()
+        backend.shutdown()
+        backend.server_close()
+    ordered = sorted(latencies)
+    benchmark.extra_info["requests"] = len(latencies)
+    benchmark.extra_info["p50_ms"] = round(ordered[len(ordered) // 2] * 1000, 3)
+    benchmark.extra_info["p99_ms"] = round(ordered[int(len(ordered) * 0.99)] * 1000, 3)
@@ -0,0 +1,59 @@
+"""Requests per second served by the `arpx up` landing page.
+
+One client reuses a keep-alive connection (the page now carries a
+Content-Length) or opens a new connection per request; the render-only case
+measures LandingPage without sockets.
+
+Run with: make benchmark (requires pytest-benchmark)
+"""
+import http.client
+import socket
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from arpx.server import LANWebServerManager, LandingPage
+
+REQUESTS = 300
+
+
+def _get_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _requests(port: int, keepalive: bool, path: str) -> int:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    try:
+        for _ in range(REQUESTS):
+            conn.request("GET", path)
+            resp = conn.getresponse()
+            assert resp.status == 200 and resp.read()
+            if not keepalive:
+                conn.close()
+    finally:
+        conn.close()
+    return REQUESTS
+
+
+@pytest.mark.parametrize("path", ["/", "/?format=json"])
+@pytest.mark.parametrize("keepalive", [True, False], ids=["keepalive", "new-conn"])
+def test_landing_page_requests_per_second(benchmark, keepalive, path):
+    port = _get_free_port()
+    mgr = LANWebServerManager()
+    assert mgr.start_lan_server("127.0.0.1", port, "Hello 1") is not None
+    try:
+        benchmark.pedantic(_requests, args=(port, keepalive, path), rounds=3, iterations=1)
+    finally:
+        mgr.stop_all()
+    rps = REQUESTS / benchmark.stats.stats.mean
+    benchmark.extra_info["requests_per_second"] = int(rps)
+    assert rps > 100
+
+
+def test_landing_page_render(benchmark):
+    page = LandingPage("Hello 1", "192.168.1.100", 8000)
+    body = benchmark(page.render_html, "192.168.1.20")
+    benchmark.extra_info["bytes"] = len(body)
@@ -0,0 +1,52 @@
+"""Bringing up 100 aliases: `ip addr add` per alias vs one rtnetlink batch.
+
+Needs root and a veth interface. Run with: make benchmark (requires pytest-benchmark)
+"""
+import os
+import shutil
+import socket
+import subprocess
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from arpx import netlink as nl
+from arpx.network import NetworkVisibleManager
+
+TEST_IF = "arpxbench0"
+ALIASES = [f"10.205.{i // 250}.{i % 250 + 2}" for i in range(100)]
+
+
+@pytest.fixture
+def veth_iface():
+    if os.geteuid() != 0 or shutil.which("ip") is None:
+        pytest.skip("root and iproute2 required")
+    if subprocess.run(f"ip link add {TEST_IF} type veth peer name {TEST_IF}p", shell=True).returncode != 0:
+        pytest.skip("cannot create a veth interface")
+    yield TEST_IF
+    subprocess.run(f"ip link del {TEST_IF}", shell=True)
+
+
+def _cycle_shell(manager: NetworkVisibleManager):
+    for i, ip in enumerate(ALIASES):
+        manager._add_address(ip, "16", f"{TEST_IF}:{i}")
+    # deleting a primary address drops its secondaries, so go newest first
+    for ip in reversed(ALIASES):
+        manager._del_address(ip, "16")
+
+
+def _cycle_netlink(route: nl.NetlinkRoute, index: int):
+    adds = [nl.address_message(True, index, ip, 16, f"{TEST_IF}:{i}") for i, ip in enumerate(ALIASES)]
+    assert route.execute(adds) == [None] * len(ALIASES)
+    assert route.execute([nl.address_message(False, index, ip, 16) for ip in reversed(ALIASES)]) == [None] * len(ALIASES)
+
+
+def test_alias_startup_shell(benchmark, veth_iface):
+    manager = NetworkVisibleManager(veth_iface, backend="shell")
+    benchmark.pedantic(_cycle_shell, args=(manager,), rounds=3, iterations=1)
+
+
+def test_alias_startup_netlink(benchmark, veth_iface):
+    with nl.NetlinkRoute() as route:
+        benchmark.pedantic(_cycle_netlink, args=(route, socket.if_nametoindex(veth_iface)), rounds=3, iterations=1)
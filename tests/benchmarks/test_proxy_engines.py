@@ -0,0 +1,91 @@
+"""Connections/sec and p99 latency of the thread vs asyncio forwarder engines.
+
+Run with: make benchmark (requires pytest-benchmark)
+"""
+import socket
+import socketserver
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from arpx.proxy import TcpForwarderManager
+
+CLIENTS = 32
+CONNS_PER_CLIENT = 20
+
+
+class _EchoHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        data = self.request.recv(1024)
+        if data:
+            self.request.sendall(data)
+
+
+class _EchoServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 1024
+
+
+def _get_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def _run_load(port: int):
+    latencies = []
+    lock = threading.Lock()
+
+    def client():
+        local = []
+        for _ in range(CONNS_PER_CLIENT):
+            t0 = time.perf_counter()
+            with socket.create_connection(("127.0.0.1", port), timeout=5) as c:
+                c.sendall(b"ping")
+                assert c.recv(16) == b"ping"
+            local.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client) for _ in range(CLIENTS)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return len(latencies) / elapsed, _percentile(latencies, 99)
+
+
+@pytest.fixture(scope="module")
+def echo_backend():
+    server = _EchoServer(("127.0.0.1", 0), _EchoHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("engine", ["thread", "asyncio"])
+def test_forwarder_engine_throughput(benchmark, echo_backend, engine):
+    port = _get_free_port()
+    mgr = TcpForwarderManager(engine=engine)
+    mgr.add("127.0.0.1", port, "127.0.0.1", echo_backend)
+    time.sleep(0.1)
+    try:
+        conn_rate, p99 = benchmark.pedantic(_run_load, args=(port,), rounds=3, iterations=1)
+    finally:
+        mgr.stop_all()
+    benchmark.extra_info["connections_per_sec"] = round(conn_rate, 1)
+    benchmark.extra_info["p99_latency_ms"] = round(p99 * 1000, 3)
+    assert conn_rate > 0
@@ -0,0 +1,107 @@
+"""Bulk download throughput through TcpForwarder: splice(2) vs buffered copy.
+
+Run with: make benchmark (requires pytest-benchmark)
+"""
+import socket
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from arpx.proxy import HAS_SPLICE, TcpForwarder
+
+PAYLOAD_SIZE = 64 * 1024 * 1024
+CHUNK = b"\0" * (1024 * 1024)
+
+
+def _get_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_source(port: int):
+    """Serve PAYLOAD_SIZE zero bytes to every connection."""
+    srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    srv.bind(("127.0.0.1", port))
+    srv.listen(16)
+
+    def send_all(conn):
+        with conn:
+            for _ in range(PAYLOAD_SIZE // len(CHUNK)):
+                conn.sendall(CHUNK)
+
+    def serve():
+        while True:
+            try:
+                conn, _ = srv.accept()
+            except OSError:
+                break
+            threading.Thread(target=send_all, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=serve, daemon=True).start()
+    return srv
+
+
+def _download(port: int) -> int:
+    total = 0
+    buf = bytearray(1024 * 1024)
+    with socket.create_connection(("127.0.0.1", port)) as c:
+        while True:
+            n = c.recv_into(buf)
+            if not n:
+                break
+            total += n
+    return total
+
+
+@pytest.mark.parametrize("zero_copy", [True, False], ids=["splice", "buffered"])
+def test_forwarder_bulk_throughput(benchmark, zero_copy):
+    if zero_copy and not HAS_SPLICE:
+        pytest.skip("os.splice not available on this platform")
+    source_port = _get_free_port()
+    forward_port = _get_free_port()
+    src = _start_source(source_port)
+    fwd = TcpForwarder(("127.0.0.1", forward_port), ("127.0.0.1", source_port), zero_copy=zero_copy)
+    fwd.start()
+    time.sleep(0.1)
+    try:
+        total = benchmark.pedantic(_download, args=(forward_port,), rounds=3, iterations=1)
+    finally:
+        fwd.stop()
+        src.close()
+    assert total == PAYLOAD_SIZE
+    benchmark.extra_info["mb_per_sec"] = round(PAYLOAD_SIZE / benchmark.stats.stats.mean / 1e6, 1)
+
+
+@pytest.mark.parametrize("path", ["published", "container"])
+def test_container_target_throughput(benchmark, path):
+    """arpx compose --target-mode: via a userland published-port proxy, or straight to the container.
+
+    The published path is modelled by a second forwarder standing in for docker-proxy.
+    """
+    source_port = _get_free_port()
+    forward_port = _get_free_port()
+    src = _start_source(source_port)
+    hops = []
+    target_port = source_port
+    if path == "published":
+        published_port = _get_free_port()
+        hops.append(TcpForwarder(("127.0.0.1", published_port), ("127.0.0.1", source_port)))
+        target_port = published_port
+    hops.append(TcpForwarder(("127.0.0.1", forward_port), ("127.0.0.1", target_port)))
+    for hop in hops:
+        hop.start()
+    time.sleep(0.1)
+    try:
+        total = benchmark.pedantic(_download, args=(forward_port,), rounds=3, iterations=1)
+    finally:
+        for hop in hops:
+            hop.stop()
+        src.close()
+    assert total == PAYLOAD_SIZE
+    benchmark.extra_info["userspace_hops"] = len(hops)
+    benchmark.extra_info["mb_per_sec"] = round(PAYLOAD_SIZE / benchmark.stats.stats.mean / 1e6, 1)
@@ -0,0 +1,123 @@
+"""Concurrent HTTPS load through TlsTerminator (thread vs asyncio engine,
+one process vs SO_REUSEPORT worker processes).
+
+Before per-connection handling the terminator served one TLS session at a
+time; this measures requests/sec with many simultaneous clients. Worker
+processes only pay off with more than one core.
+
+Run with: make benchmark (requires pytest-benchmark)
+"""
+import functools
+import os
+import socket
+import ssl
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from arpx import certs as cert_utils
+from arpx.terminator import TlsSessionCache, TlsTerminatorManager
+
+CLIENTS = 64
+REQUESTS_PER_CLIENT = 5
+
+
+def _get_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_http_backend(port: int):
+    srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    srv.bind(("127.0.0.1", port))
+    srv.listen(1024)
+
+    def handle(conn):
+        with conn:
+            conn.recv(1024)
+            conn.sendall(b"HTTP/1.0 200 OK\r\nContent-Length: 2\r\n\r\nok")
+
+    def serve():
+        while True:
+            try:
+                conn, _ = srv.accept()
+            except OSError:
+                break
+            threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=serve, daemon=True).start()
+    return srv
+
+
+def _run_load(port: int) -> float:
+    client_ctx = ssl.create_default_context()
+    client_ctx.check_hostname = False
+    client_ctx.verify_mode = ssl.CERT_NONE
+    done = []
+    lock = threading.Lock()
+
+    def client():
+        ok = 0
+        for _ in range(REQUESTS_PER_CLIENT):
+            with socket.create_connection(("127.0.0.1", port), timeout=10) as raw:
+                with client_ctx.wrap_socket(raw, server_hostname="localhost") as c:
+                    c.sendall(b"GET / HTTP/1.0\r\n\r\n")
+                    while c.recv(1024):
+                        pass
+            ok += 1
+        with lock:
+            done.append(ok)
+
+    threads = [threading.Thread(target=client) for _ in range(CLIENTS)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sum(done) / (time.perf_counter() - start)
+
+
+@pytest.mark.parametrize("engine", ["thread", "asyncio"])
+def test_terminator_concurrent_load(benchmark, tmp_path: Path, engine):
+    cert, key = cert_utils.generate_self_signed_cert(tmp_path, "localhost", ["localhost", "127.0.0.1"])
+    ctx = cert_utils.build_ssl_context(cert, key)
+    backend_port = _get_free_port()
+    tls_port = _get_free_port()
+    backend = _start_http_backend(backend_port)
+    mgr = TlsTerminatorManager(engine=engine)
+    mgr.add("127.0.0.1", tls_port, "127.0.0.1", backend_port, ctx)
+    time.sleep(0.1)
+    try:
+        rps = benchmark.pedantic(_run_load, args=(tls_port,), rounds=2, iterations=1)
+    finally:
+        mgr.stop_all()
+        backend.close()
+    benchmark.extra_info["requests_per_sec"] = round(rps, 1)
+    assert rps > 0
+
+
+@pytest.mark.parametrize("workers", sorted({1, max(2, os.cpu_count() or 1)}))
+def test_terminator_workers_load(benchmark, tmp_path: Path, workers):
+    cert, key = cert_utils.generate_self_signed_cert(tmp_path, "localhost", ["localhost", "127.0.0.1"])
+    cache = TlsSessionCache(functools.partial(cert_utils.build_ssl_context, cert, key), rotate_interval=None)
+    backend_port = _get_free_port()
+    tls_port = _get_free_port()
+    backend = _start_http_backend(backend_port)
+    mgr = TlsTerminatorManager(workers=workers)
+    mgr.add("127.0.0.1", tls_port, "127.0.0.1", backend_port, cache)
+    time.sleep(0.1)
+    try:
+        rps = benchmark.pedantic(_run_load, args=(tls_port,), rounds=2, iterations=1)
+    finally:
+        mgr.stop_all()
+        backend.close()
+    benchmark.extra_info["workers"] = workers
+    benchmark.extra_info["cpus"] = os.cpu_count()
+    benchmark.extra_info["requests_per_sec"] = round(rps, 1)
+    assert rps > 0
@@ -0,0 +1,55 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from arpx.arp import ArpScanner
+from arpx.network import NetworkVisibleManager
+
+HOST_IF = "arpxt0"
+PEER_IF = "arpxt1"
+NETNS = "arpx-test"
+
+
+def _sh(cmd: str) -> None:
+    subprocess.run(cmd, shell=True, check=True)
+
+
+@pytest.fixture
+def veth_pair():
+    """Host-side veth with 10.203.0.1/24; the peer in a netns owns .2 and .3."""
+    if os.geteuid() != 0:
+        pytest.skip("root required for veth/netns setup")
+    if shutil.which("ip") is None:
+        pytest.skip("iproute2 required for veth/netns setup")
+    try:
+        _sh(f"ip netns add {NETNS}")
+        _sh(f"ip link add {HOST_IF} type veth peer name {PEER_IF}")
+        _sh(f"ip link set {PEER_IF} netns {NETNS}")
+        _sh(f"ip addr add 10.203.0.1/24 dev {HOST_IF}")
+        _sh(f"ip link set {HOST_IF} up")
+        _sh(f"ip -n {NETNS} addr add 10.203.0.2/24 dev {PEER_IF}")
+        _sh(f"ip -n {NETNS} addr add 10.203.0.3/24 dev {PEER_IF}")
+        _sh(f"ip -n {NETNS} link set {PEER_IF} up")
+    except subprocess.CalledProcessError:
+        subprocess.run(f"ip link del {HOST_IF}", shell=True)
+        subprocess.run(f"ip netns del {NETNS}", shell=True)
+        pytest.skip("cannot create veth/netns pair in this environment")
+    yield HOST_IF
+    subprocess.run(f"ip link del {HOST_IF}", shell=True)
+    subprocess.run(f"ip netns del {NETNS}", shell=True)
+
+
+@pytest.mark.e2e
+def test_arp_sweep_over_veth(veth_pair):
+    used = ArpScanner(veth_pair).scan([f"10.203.0.{i}" for i in range(2, 20)], window=1.0)
+    assert used == {"10.203.0.2", "10.203.0.3"}
+
+
+@pytest.mark.e2e
+def test_find_free_ips_arp_method_over_veth(veth_pair):
+    manager = NetworkVisibleManager(veth_pair)
+    ips = manager.find_free_ips("10.203.0.0", "24", num_ips=3, start_ip=1, method="arp")
+    # .1 is ours, .2/.3 answer from the peer namespace
+    assert ips == ["10.203.0.4", "10.203.0.5", "10.203.0.6"]
@@ -0,0 +1,150 @@
+import os
+import socket
+import shutil
+import subprocess
+
+import pytest
+
+from arpx import netlink as nl
+from arpx.network import NetworkVisibleManager
+
+TEST_IF = "arpxnl0"
+
+
+@pytest.fixture
+def veth_iface():
+    if os.geteuid() != 0:
+        pytest.skip("root required for netlink address operations")
+    if shutil.which("ip") is None:
+        pytest.skip("iproute2 required to create a veth interface")
+    proc = subprocess.run(f"ip link add {TEST_IF} type veth peer name {TEST_IF}p && ip link set {TEST_IF} up", shell=True)
+    if proc.returncode != 0:
+        pytest.skip("cannot create a veth interface in this environment")
+    subprocess.run(f"ip addr add 10.204.0.1/24 dev {TEST_IF}", shell=True, check=True)
+    yield TEST_IF
+    subprocess.run(f"ip link del {TEST_IF}", shell=True)
+
+
+@pytest.mark.e2e
+def test_netlink_address_batch(veth_iface):
+    index = socket.if_nametoindex(veth_iface)
+    with nl.NetlinkRoute() as route:
+        msgs = [nl.address_message(True, index, f"10.204.0.{i}", 24, f"{veth_iface}:{i}") for i in range(10, 20)]
+        assert route.execute(msgs) == [None] * 10
+        addrs = {a.address: a for a in route.addresses(index)}
+        assert "10.204.0.15" in addrs
+        assert addrs["10.204.0.15"].label == f"{veth_iface}:15"
+        # adding the same address again is reported per message
+        errors = route.execute(msgs[:1])
+        assert isinstance(errors[0], OSError)
+        assert route.execute([nl.address_message(False, index, f"10.204.0.{i}", 24) for i in range(10, 20)]) == [None] * 10
+        assert {a.address for a in route.addresses(index)} == {"10.204.0.1"}
+
+
+@pytest.mark.e2e
+def test_manager_netlink_backend(veth_iface):
+    manager = NetworkVisibleManager(veth_iface, backend="netlink")
+    ip, net, cidr, bcast = manager.get_network_details()
+    assert (ip, net, cidr, bcast) == ("10.204.0.1", "10.204.0.0", "24", "10.204.0.255")
+    mac = manager.get_interface_mac()
+    assert mac and len(mac.split(":")) == 6
+
+    manager._add_address("10.204.0.50", "24", f"{veth_iface}:a")
+    out = subprocess.check_output(f"ip -4 addr show {veth_iface}", shell=True).decode()
+    assert "10.204.0.50/24" in out
+    manager.update_arp_cache("10.204.0.50")
+    neigh = subprocess.check_output(f"ip neigh show dev {veth_iface}", shell=True).decode()
+    assert "10.204.0.50" in neigh and "PERMANENT" in neigh
+    manager.remove_virtual_ip("10.204.0.50", "24")
+    out = subprocess.check_output(f"ip -4 addr show {veth_iface}", shell=True).decode()
+    assert "10.204.0.50" not in out
+
+
+@pytest.mark.e2e
+def test_manager_batch_rollback(veth_iface):
+    manager = NetworkVisibleManager(veth_iface, backend="netlink")
+    # 10.204.0.1 is already configured, so the whole batch must be undone
+    ok = manager.add_virtual_ips([("10.204.0.60", "a"), ("10.204.0.61", "b"), ("10.204.0.1", "c")], "24")
+    assert ok is False
+    assert manager.virtual_ips == []
+    out = subprocess.check_output(f"ip -4 addr show {veth_iface}", shell=True).decode()
+    assert "10.204.0.60" not in out and "10.204.0.61" not in out and "10.204.0.1/24" in out
+
+    assert manager.add_virtual_ips([("10.204.0.60", "a"), ("10.204.0.61", "b")], "24")
+    out = subprocess.check_output(f"ip -4 addr show {veth_iface}", shell=True).decode()
+    assert "10.204.0.60/24" in out and "10.204.0.61/24" in out
+    manager.cleanup()
+
+
+@pytest.mark.e2e
+def test_snapshot_invalidated_by_link_change(veth_iface):
+    import time
+
+    manager = NetworkVisibleManager(veth_iface, backend="netlink", snapshot_ttl=3600)
+    manager.watch_changes()
+    try:
+        time.sleep(0.1)
+        manager.get_interface_mac()
+        # aliases are secondary addresses and keep the snapshot
+        manager._add_address("10.204.0.70", "24", f"{veth_iface}:w")
+        time.sleep(0.3)
+        assert manager._snapshot is not None
+        subprocess.run(f"ip link set {veth_iface} address 02:00:00:00:20:04", shell=True, check=True)
+        deadline = time.monotonic() + 2
+        while manager._snapshot is not None and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert manager.get_interface_mac() == "02:00:00:00:20:04"
+    finally:
+        manager.stop_watching()
+
+
+@pytest.mark.e2e
+def test_announcer_frames_reach_peer(veth_iface):
+    import time
+
+    from arpx.arp import ETH_P_ARP, parse_arp_frame
+
+    peer = f"{veth_iface}p"
+    subprocess.run(f"ip link set {peer} up", shell=True, check=True)
+    sniffer = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ARP))
+    sniffer.bind((peer, ETH_P_ARP))
+    sniffer.settimeout(0.2)
+    manager = NetworkVisibleManager(veth_iface, backend="netlink")
+    try:
+        assert manager.start_announcer(interval=60)
+        assert manager.add_virtual_ips([("10.204.0.80", "g")], "24")
+        seen = set()
+        deadline = time.monotonic() + 2
+        while "10.204.0.80" not in seen and time.monotonic() < deadline:
+            try:
+                pkt = parse_arp_frame(sniffer.recv(2048))
+            except socket.timeout:
+                continue
+            if pkt and pkt.sender_ip == pkt.target_ip:
+                seen.add(pkt.sender_ip)
+        assert "10.204.0.80" in seen
+        assert manager.announcer.stats()["frames_sent"] >= 1
+    finally:
+        sniffer.close()
+        manager.cleanup()
+    assert manager.announcer is None
+
+
+@pytest.mark.e2e
+def test_responder_answers_for_alias_over_veth(veth_iface):
+    from arpx.arp import ArpScanner
+
+    peer = f"{veth_iface}p"
+    subprocess.run(f"ip link set {peer} up", shell=True, check=True)
+    manager = NetworkVisibleManager(veth_iface, backend="netlink", arp_mode="responder")
+    try:
+        assert manager.add_virtual_ips([("10.204.0.90", "r")], "24")
+        assert manager.responder is not None
+        with open(f"/proc/sys/net/ipv4/conf/{veth_iface}/proxy_arp") as f:
+            assert f.read().strip() == "0"
+        # the peer side asks for the alias and for an address nobody manages
+        used = ArpScanner(peer, sender_ip="10.204.0.2").scan(["10.204.0.90", "10.204.0.91"], window=0.5)
+        assert used == {"10.204.0.90"}
+        assert manager.responder.replies_sent >= 1
+    finally:
+        manager.cleanup()
@@ -0,0 +1,212 @@
+import socket
+
+from arpx import arp
+import time
+
+from arpx.arp import ArpAnnouncer, ArpScanner, build_arp_frame, build_arp_request, parse_arp_frame
+
+SENDER_MAC = bytes.fromhex("020000000001")
+PEER_MAC = bytes.fromhex("020000000002")
+
+
+def test_arp_request_roundtrip():
+    frame = build_arp_request(SENDER_MAC, "192.168.1.10", "192.168.1.20")
+    assert len(frame) == arp.ARP_FRAME_LEN
+    pkt = parse_arp_frame(frame)
+    assert pkt is not None
+    assert pkt.op == arp.ARP_REQUEST
+    assert pkt.eth_dst == arp.BROADCAST_MAC
+    assert pkt.sender_mac == SENDER_MAC
+    assert pkt.sender_ip == "192.168.1.10"
+    assert pkt.target_ip == "192.168.1.20"
+
+
+def test_parse_rejects_non_arp():
+    frame = bytearray(build_arp_request(SENDER_MAC, "10.0.0.1", "10.0.0.2"))
+    frame[12:14] = b"\x08\x00"  # IPv4 ethertype
+    assert parse_arp_frame(bytes(frame)) is None
+    assert parse_arp_frame(b"\x00" * 10) is None
+
+
+def test_mac_conversions():
+    assert arp.mac_to_bytes("02:00:00:00:00:01") == SENDER_MAC
+    assert arp.bytes_to_mac(PEER_MAC) == "02:00:00:00:00:02"
+
+
+class _FakeScanner(ArpScanner):
+    """Answer who-has for `present` addresses over a socketpair."""
+
+    def __init__(self, present):
+        super().__init__("eth0", sender_mac=SENDER_MAC, sender_ip="10.0.0.1")
+        self.present = present
+        self.sent = []
+
+    def _open_socket(self):
+        ours, theirs = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        scanner = self
+
+        class Sock:
+            def send(self, frame):
+                scanner.sent.append(frame)
+                pkt = parse_arp_frame(frame)
+                if pkt.target_ip in scanner.present:
+                    theirs.send(build_arp_frame(arp.ARP_REPLY, PEER_MAC, pkt.target_ip, SENDER_MAC, "10.0.0.1", SENDER_MAC))
+                # our own request echoed back must be ignored
+                theirs.send(frame)
+
+            def fileno(self):
+                return ours.fileno()
+
+            def recv(self, n):
+                return ours.recv(n)
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                ours.close()
+                theirs.close()
+
+        return Sock()
+
+
+def test_scanner_reports_answering_addresses():
+    scanner = _FakeScanner({"10.0.0.5", "10.0.0.7"})
+    used = scanner.scan([f"10.0.0.{i}" for i in range(2, 10)], window=0.2, rounds=1)
+    assert used == {"10.0.0.5", "10.0.0.7"}
+    assert len(scanner.sent) == 8
+
+
+def test_scanner_survives_full_tx_queue(monkeypatch):
+    import errno
+
+    scanner = _FakeScanner({"10.0.0.5", "10.0.0.7"})
+    scanner.backoff = 0
+    fails = {"10.0.0.5": [errno.ENOBUFS], "10.0.0.6": [errno.ENOBUFS, errno.ENOBUFS], "10.0.0.8": [errno.ENETDOWN]}
+    inner = scanner._open_socket
+
+    def open_socket():
+        sock = inner()
+        send = sock.send
+
+        def flaky_send(frame):
+            pending = fails.get(parse_arp_frame(frame).target_ip)
+            if pending:
+                raise OSError(pending.pop(0), "send failed")
+            send(frame)
+
+        sock.send = flaky_send
+        return sock
+
+    monkeypatch.setattr(scanner, "_open_socket", open_socket)
+    used = scanner.scan([f"10.0.0.{i}" for i in range(2, 10)], window=0.2, rounds=1)
+    # a full queue is retried once; what still fails is counted and skipped
+    assert used == {"10.0.0.5", "10.0.0.7"}
+    assert scanner.frames_sent == 6 and scanner.send_errors == 2
+
+
+def test_scan_network_bitmap():
+    import ipaddress
+
+    scanner = _FakeScanner({"10.0.0.1", "10.0.0.10"})
+    bitmap = scanner.scan_network(ipaddress.IPv4Network("10.0.0.0/28"), window=0.2)
+    assert len(bitmap) == 2  # 14 hosts
+    assert bitmap[0] == 0b00000001
+    assert bitmap[1] == 0b00000010
+
+
+class _RecordingAnnouncer(ArpAnnouncer):
+    def __init__(self, **kwargs):
+        super().__init__("eth0", sender_mac=SENDER_MAC, **kwargs)
+        self.sent = []
+
+    def _open_socket(self):
+        announcer = self
+
+        class Sock:
+            def send(self, frame):
+                announcer.sent.append((time.monotonic(), parse_arp_frame(frame)))
+
+            def close(self):
+                pass
+
+        return Sock()
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_announcer_burst_then_periodic():
+    announcer = _RecordingAnnouncer(interval=0.2, jitter=0.0, count=3, spacing=0.05)
+    announcer.start()
+    try:
+        announcer.add(["10.0.0.5", "10.0.0.6"])
+        # 3 burst frames per address, then at least one periodic re-announcement
+        _wait_for(lambda: announcer.stats()["frames_sent"] >= 8)
+    finally:
+        announcer.stop()
+    pkt = announcer.sent[0][1]
+    assert pkt.op == arp.ARP_REQUEST and pkt.eth_dst == arp.BROADCAST_MAC
+    assert pkt.sender_ip == pkt.target_ip and pkt.sender_mac == SENDER_MAC
+    per_ip = [t for t, p in announcer.sent if p.sender_ip == "10.0.0.5"]
+    assert len(per_ip) >= 4
+    assert per_ip[3] - per_ip[2] >= 0.15  # the periodic frame waits for interval, not spacing
+    stats = announcer.stats()
+    assert stats["addresses"] == 2 and stats["send_errors"] == 0
+    assert stats["announcements"] >= 3
+
+
+def test_announcer_remove_stops_announcing():
+    announcer = _RecordingAnnouncer(interval=0.05, jitter=0.5, count=1)
+    announcer.start()
+    try:
+        announcer.add(["10.0.0.5", "10.0.0.6"])
+        _wait_for(lambda: announcer.stats()["frames_sent"] >= 2)
+        announcer.remove(["10.0.0.5"])
+        removed_at = time.monotonic()
+        time.sleep(0.2)
+    finally:
+        announcer.stop()
+    assert announcer.addresses == ["10.0.0.6"]
+    assert not [t for t, p in announcer.sent if p.sender_ip == "10.0.0.5" and t > removed_at]
+    assert [t for t, p in announcer.sent if p.sender_ip == "10.0.0.6" and t > removed_at]
+
+
+def test_announcer_readd_keeps_one_chain():
+    announcer = _RecordingAnnouncer(interval=10.0, jitter=0.0, count=1)
+    announcer.add(["10.0.0.5"])
+    announcer.remove(["10.0.0.5"])
+    announcer.add(["10.0.0.5"])
+    # the entry from before remove() must not come back to life next to the new one
+    live = [entry for entry in announcer._heap if announcer._addresses.get(entry[2]) == entry[1]]
+    assert len(live) == 1
+    announcer.sender_mac = SENDER_MAC
+    with announcer._cond:
+        assert len(announcer._due()) == 1
+    live = [entry for entry in announcer._heap if announcer._addresses.get(entry[2]) == entry[1]]
+    assert len(live) == 1
+
+
+def test_responder_answers_only_managed_aliases():
+    from arpx.network import ArpResponder
+
+    responder = ArpResponder("eth0", mac=SENDER_MAC)
+    responder.add(["10.0.0.50", "10.0.0.51"])
+    reply = responder.reply_for(build_arp_request(PEER_MAC, "10.0.0.9", "10.0.0.51"))
+    pkt = parse_arp_frame(reply)
+    assert pkt.op == arp.ARP_REPLY
+    assert (pkt.eth_dst, pkt.eth_src) == (PEER_MAC, SENDER_MAC)
+    assert (pkt.sender_mac, pkt.sender_ip) == (SENDER_MAC, "10.0.0.51")
+    assert (pkt.target_mac, pkt.target_ip) == (PEER_MAC, "10.0.0.9")
+
+    assert responder.reply_for(build_arp_request(PEER_MAC, "10.0.0.9", "10.0.0.52")) is None
+    # gratuitous announcements and replies are not answered
+    assert responder.reply_for(arp.build_gratuitous_arp(PEER_MAC, "10.0.0.50")) is None
+    assert responder.reply_for(build_arp_frame(arp.ARP_REPLY, PEER_MAC, "10.0.0.9", SENDER_MAC, "10.0.0.50")) is None
+
+    responder.remove(["10.0.0.51"])
+    assert len(responder) == 1
+    assert responder.reply_for(build_arp_request(PEER_MAC, "10.0.0.9", "10.0.0.51")) is None
@@ -0,0 +1,110 @@
+import socket
+import threading
+import time
+
+import pytest
+
+from arpx.balancer import UpstreamGroup
+from arpx.proxy import TcpForwarderManager
+
+
+def _get_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_named_server(name: bytes) -> socket.socket:
+    srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    srv.bind(("127.0.0.1", 0))
+    srv.listen(16)
+
+    def serve():
+        while True:
+            try:
+                conn, _ = srv.accept()
+            except OSError:
+                return
+            with conn:
+                conn.recv(1024)
+                conn.sendall(name)
+
+    threading.Thread(target=serve, daemon=True).start()
+    return srv
+
+
+TARGETS = [("10.0.0.1", 80), ("10.0.0.2", 80), ("10.0.0.3", 80)]
+
+
+def test_round_robin_rotates():
+    group = UpstreamGroup(TARGETS)
+    picked = [group.pick().host for _ in range(6)]
+    assert picked == ["10.0.0.1", "10.0.0.2", "10.0.0.3"] * 2
+
+
+def test_least_conn_prefers_idle_target():
+    group = UpstreamGroup(TARGETS, policy="least-conn")
+    first = group.pick()
+    second = group.pick()
+    third = group.pick()
+    group.release(second)
+    assert group.pick() is second
+    group.release(first)
+    group.release(third)
+
+
+def test_hash_is_sticky_and_remaps_only_failed_target():
+    group = UpstreamGroup(TARGETS, policy="hash")
+    clients = [f"192.168.1.{i}" for i in range(50)]
+    before = {c: group.pick(c) for c in clients}
+    assert all(group.pick(c) is before[c] for c in clients)
+    assert len({u.host for u in before.values()}) == 3
+
+    down = group.upstreams[0]
+    group.mark_failed(down)
+    after = {c: group.pick(c) for c in clients}
+    for c in clients:
+        if before[c] is not down:
+            assert after[c] is before[c]
+        else:
+            assert after[c] is not down
+
+
+def test_down_target_is_skipped_until_all_are_down():
+    group = UpstreamGroup(TARGETS[:2], fail_timeout=60)
+    group.mark_failed(group.upstreams[0])
+    assert {group.pick().host for _ in range(4)} == {"10.0.0.2"}
+    group.mark_failed(group.upstreams[1])
+    assert group.pick() is not None
+    group.mark_ok(group.upstreams[0])
+    assert group.stats()[0]["up"] is True
+
+
+def test_unknown_policy_rejected():
+    with pytest.raises(ValueError):
+        UpstreamGroup(TARGETS, policy="random")
+
+
+def test_forwarder_balances_and_fails_over():
+    servers = [_start_named_server(name) for name in (b"a", b"b")]
+    dead_port = _get_free_port()
+    targets = [("127.0.0.1", s.getsockname()[1]) for s in servers] + [("127.0.0.1", dead_port)]
+    forward_port = _get_free_port()
+    mgr = TcpForwarderManager()
+    mgr.add("127.0.0.1", forward_port, targets[0][0], targets[0][1], targets=targets)
+    time.sleep(0.05)
+    try:
+        replies = []
+        for _ in range(6):
+            with socket.create_connection(("127.0.0.1", forward_port), timeout=2) as c:
+                c.sendall(b"hi")
+                replies.append(c.recv(16))
+        assert sorted(set(replies)) == [b"a", b"b"]
+        group = mgr.forwarders[0].upstreams
+        dead = [s for s in group.stats() if s["target"].endswith(f":{dead_port}")][0]
+        assert dead["failures"] == 1 and dead["up"] is False
+    finally:
+        mgr.stop_all()
+        for s in servers:
+            s.close()
@@ -45,6 +45,50 @@ class TestCerts(unittest.TestCase):
         self.assertIn("test.lan", dns_sans)
         self.assertEqual(str(ip_sans[0]), "192.168.1.100")
 
+    def test_generate_self_signed_cert_ecdsa(self):
+        """Test that key_type='ecdsa' produces a P-256 key."""
+        from cryptography.hazmat.primitives.asymmetric import ec
+
+        cert_path, _key_path = cert_utils.generate_self_signed_cert(
+            self.output_dir, common_name="test.lan", sans=["test.lan"], key_type="ecdsa"
+        )
+        with open(cert_path, "rb") as f:
+            cert = x509.load_pem_x509_certificate(f.read())
+        public_key = cert.public_key()
+        self.assertIsInstance(public_key, ec.EllipticCurvePublicKey)
+        self.assertEqual(public_key.curve.name, "secp256r1")
+
+    def test_generate_self_signed_cert_unknown_key_type(self):
+        """Test that an unsupported key type is rejected."""
+        with self.assertRaises(ValueError):
+            cert_utils.generate_self_signed_cert(self.output_dir, "test.lan", [], key_type="dsa")
+
+    def test_cached_self_signed_cert_reuses_valid_cert(self):
+        """Test that a cached certificate is reused for the same CN, SANs and key type."""
+        first = cert_utils.cached_self_signed_cert(self.output_dir, "test.lan", ["b.lan", "a.lan"], key_type="ecdsa")
+        mtime = first[0].stat().st_mtime_ns
+        second = cert_utils.cached_self_signed_cert(self.output_dir, "test.lan", ["a.lan", "b.lan"], key_type="ecdsa")
+        self.assertEqual(first, second)
+        self.assertEqual(second[0].stat().st_mtime_ns, mtime)
+
+        other = cert_utils.cached_self_signed_cert(self.output_dir, "test.lan", ["a.lan", "b.lan"], key_type="rsa")
+        self.assertNotEqual(first[0].parent, other[0].parent)
+
+    def test_cached_self_signed_cert_regenerates_expiring_cert(self):
+        """Test that a certificate close to expiry is regenerated."""
+        cert_path, _ = cert_utils.cached_self_signed_cert(self.output_dir, "test.lan", ["test.lan"], valid_days=1)
+        old_pem = cert_path.read_bytes()
+        cert_path2, _ = cert_utils.cached_self_signed_cert(self.output_dir, "test.lan", ["test.lan"], min_valid_days=2)
+        self.assertEqual(cert_path, cert_path2)
+        self.assertNotEqual(cert_path2.read_bytes(), old_pem)
+
+    def test_load_ssl_context_is_cached(self):
+        """Test that load_ssl_context returns the same context for unchanged files."""
+        cert_path, key_path = cert_utils.generate_self_signed_cert(self.output_dir, "test.lan", ["test.lan"])
+        ctx1 = cert_utils.load_ssl_context(cert_path, key_path)
+        ctx2 = cert_utils.load_ssl_context(cert_path, key_path)
+        self.assertIs(ctx1, ctx2)
+
     @patch('subprocess.run')
     def test_generate_mkcert_cert_success(self, mock_run):
         """Test successful generation of a certificate using mkcert."""
@@ -1,4 +1,5 @@
 import os
+import time
 from pathlib import Path
 
 import pytest
@@ -38,3 +39,188 @@ services:
 
     db_ports = services.ports_by_service["db"]
     assert [p.host_port for p in db_ports] == [5432]
+
+
+def test_discover_replicas_groups_published_ports(monkeypatch):
+    ps_output = "\n".join([
+        '{"Service": "web", "Publishers": [{"TargetPort": 80, "PublishedPort": 8081, "Protocol": "tcp"},'
+        ' {"TargetPort": 80, "PublishedPort": 8081, "Protocol": "tcp"}]}',
+        '{"Service": "web", "Publishers": [{"TargetPort": 80, "PublishedPort": 8080, "Protocol": "tcp"}]}',
+        '{"Service": "db", "Publishers": [{"TargetPort": 5432, "PublishedPort": 0, "Protocol": "tcp"}]}',
+        '{"Service": "api", "Publishers": [{"PublishedPort": 9000, "Protocol": "tcp"}, {"TargetPort": 90}]}',
+    ])
+
+    class _Done:
+        returncode = 0
+        stdout = ps_output
+
+    monkeypatch.setattr(compose_mod.shutil, "which", lambda name: "/usr/bin/docker")
+    monkeypatch.setattr(compose_mod.subprocess, "run", lambda *a, **kw: _Done())
+    assert compose_mod.discover_replicas(Path("docker-compose.yml")) == {("web", 80): [8080, 8081]}
+
+
+def test_discover_replicas_without_docker(monkeypatch):
+    monkeypatch.setattr(compose_mod.shutil, "which", lambda name: None)
+    assert compose_mod.discover_replicas(Path("docker-compose.yml")) == {}
+
+
+def test_port_range_uses_first_host_port():
+    assert compose_mod._parse_port_entry("web", "8080-8082:80") == ServicePort("web", 8080, 80, "tcp")
+    assert compose_mod._compose_ps_entries('[{"Service": "a"}]') == [{"Service": "a"}]
+
+
+def test_container_ips_from_inspect():
+    def container(name, service, networks, running=True):
+        return {
+            "Name": name,
+            "State": {"Running": running},
+            "Config": {"Labels": {"com.docker.compose.service": service}},
+            "NetworkSettings": {"Networks": {net: {"IPAddress": ip} for net, ip in networks.items()}},
+        }
+
+    inspect = [
+        container("/app-web-2", "web", {"app_default": "172.18.0.4"}),
+        container("/app-web-1", "web", {"app_front": "172.19.0.2", "app_default": "172.18.0.3"}),
+        container("/app-db-1", "db", {"app_default": "172.18.0.5"}, running=False),
+        container("/app-host-1", "host", {"host": ""}),
+    ]
+    assert compose_mod._container_ips(inspect) == {"web": ["172.18.0.3", "172.18.0.4"]}
+
+
+def test_bridge_targets_containers_directly():
+    from arpx.bridge import ComposeBridge
+
+    replicas = {("web", 80): [8080, 8081]}
+    containers = {"web": ["172.18.0.3", "172.18.0.4"]}
+    direct = ComposeBridge("lo", target_mode="container", health_interval=0)
+    assert direct.service_targets("web", 8080, 80, replicas, containers) == [("172.18.0.3", 80), ("172.18.0.4", 80)]
+    # unresolved containers fall back to the published port(s)
+    assert direct.service_targets("api", 9000, 9000, replicas, containers) == [("127.0.0.1", 9000)]
+    published = ComposeBridge("lo", health_interval=0)
+    assert published.service_targets("web", 8080, 80, replicas, containers) == [("127.0.0.1", 8080), ("127.0.0.1", 8081)]
+    with pytest.raises(ValueError):
+        ComposeBridge("lo", target_mode="nat")
+
+
+def test_bridge_asyncio_loops_default_to_cpus(monkeypatch):
+    from arpx import bridge as bridge_mod
+
+    monkeypatch.setattr(bridge_mod.os, "cpu_count", lambda: 8)
+    assert bridge_mod.ComposeBridge("lo", engine="asyncio").fwds.loop_count == 8
+    assert bridge_mod.ComposeBridge("lo", engine="asyncio", loops=3).fwds.loop_count == 3
+    # workers each run their own loops
+    cb = bridge_mod.ComposeBridge("lo", engine="asyncio", workers=4)
+    try:
+        assert cb.fwds.worker_pool.options["loops"] == 2
+    finally:
+        cb.fwds.stop_all()
+
+
+def _watched_bridge(monkeypatch, **kwargs):
+    """A ComposeBridge on lo whose alias, forwarder and discovery calls are recorded instead of run."""
+    from arpx import bridge as bridge_mod
+
+    cb = bridge_mod.ComposeBridge("lo", health_interval=0, firewall_backend="none", **kwargs)
+    cb.network = ("127.0.0.0", "8")
+    cb.placement = {"base_ip": "127.0.0.10"}
+    calls = []
+    monkeypatch.setattr(cb.net, "add_virtual_ips", lambda entries, cidr: calls.append(("alias+", entries)) or True)
+    monkeypatch.setattr(cb.net, "remove_virtual_ip", lambda ip, cidr="24": calls.append(("alias-", ip)))
+    monkeypatch.setattr(cb.fwds, "add", lambda ip, port, host, tport, targets=None: calls.append(("fwd+", ip, port, host)))
+    monkeypatch.setattr(cb.fwds, "remove", lambda ip, port: calls.append(("fwd-", ip, port)))
+    monkeypatch.setattr(bridge_mod, "discover_replicas", lambda path: {})
+    return cb, calls, bridge_mod
+
+
+def test_reconcile_touches_only_changed_services(tmp_path: Path, monkeypatch):
+    cb, calls, _mod = _watched_bridge(monkeypatch)
+    compose = tmp_path / "docker-compose.yml"
+    compose.write_text("services:\n  web:\n    ports: ['8080:80']\n  api:\n    ports: ['9000:90']\n")
+    assert cb.reconcile(compose) == [("127.0.0.10", "web", [8080]), ("127.0.0.11", "api", [9000])]
+    assert calls == [
+        ("alias+", [("127.0.0.10", "web"), ("127.0.0.11", "api")]),
+        ("fwd+", "127.0.0.10", 8080, "127.0.0.1"),
+        ("fwd+", "127.0.0.11", 9000, "127.0.0.1"),
+    ]
+
+    # web gains a port, api goes away, db is new: web:8080 keeps its forwarder
+    calls.clear()
+    compose.write_text("services:\n  web:\n    ports: ['8080:80', '8081:81']\n  db:\n    ports: ['5432:5432']\n")
+    assert cb.reconcile(compose) == [("127.0.0.10", "web", [8080, 8081]), ("127.0.0.12", "db", [5432])]
+    assert calls == [
+        ("alias+", [("127.0.0.12", "db")]),
+        ("fwd-", "127.0.0.11", 9000),
+        ("fwd+", "127.0.0.10", 8081, "127.0.0.1"),
+        ("fwd+", "127.0.0.12", 5432, "127.0.0.1"),
+        ("alias-", "127.0.0.11"),
+    ]
+
+    calls.clear()
+    cb.reconcile(compose)
+    assert calls == []
+
+
+def test_reconcile_follows_restarted_containers(tmp_path: Path, monkeypatch):
+    cb, calls, bridge_mod = _watched_bridge(monkeypatch, target_mode="container")
+    compose = tmp_path / "docker-compose.yml"
+    compose.write_text("services:\n  web:\n    ports: ['8080:80']\n  api:\n    ports: ['9000:90']\n")
+    ips = {"web": ["172.18.0.3"], "api": ["172.18.0.4"]}
+    monkeypatch.setattr(bridge_mod, "discover_container_ips", lambda path: ips)
+    cb.reconcile(compose)
+    calls.clear()
+    ips["web"] = ["172.18.0.7"]
+    cb.reconcile(compose)
+    assert calls == [("fwd-", "127.0.0.10", 8080), ("fwd+", "127.0.0.10", 8080, "172.18.0.7")]
+
+
+def test_compose_watcher_coalesces_changes(tmp_path: Path):
+    compose = tmp_path / "docker-compose.yml"
+    compose.write_text("services: {}\n")
+    seen = []
+    watcher = compose_mod.ComposeWatcher(
+        compose, lambda: seen.append(compose.read_text()), debounce=0.3, poll_interval=0.05, container_events=False
+    )
+    watcher.start()
+    try:
+        time.sleep(0.1)
+        for i in range(3):
+            compose.write_text(f"services: {{}}\n# edit {i}\n")
+            time.sleep(0.06)
+        # an unrelated file in the same directory is ignored
+        (tmp_path / "notes.txt").write_text("x")
+        deadline = time.time() + 3
+        while not seen and time.time() < deadline:
+            time.sleep(0.05)
+        time.sleep(0.5)
+    finally:
+        watcher.stop()
+    assert seen == ["services: {}\n# edit 2\n"]
+
+
+def test_container_events_match_project(tmp_path: Path):
+    path = tmp_path / "docker-compose.yml"
+
+    def event(**labels):
+        return {"Action": "start", "Actor": {"Attributes": {"com.docker.compose.service": "web", **labels}}}
+
+    assert compose_mod._event_matches(event(**{"com.docker.compose.project.config_files": f"{path},/x/override.yml"}), path)
+    assert not compose_mod._event_matches(event(**{"com.docker.compose.project.config_files": "/other/docker-compose.yml"}), path)
+    assert compose_mod._event_matches(event(**{"com.docker.compose.project.working_dir": str(tmp_path)}), path)
+    assert not compose_mod._event_matches({"Actor": {"Attributes": {"name": "standalone"}}}, path)
+
+
+def test_reconcile_reuses_preferred_ips(tmp_path: Path, monkeypatch):
+    cb, calls, _mod = _watched_bridge(monkeypatch)
+    cb.preferred_ips = {"api": "127.0.0.20", "gone": "127.0.0.21"}
+    compose = tmp_path / "docker-compose.yml"
+    compose.write_text("services:\n  web:\n    ports: ['8080:80']\n  api:\n    ports: ['9000:90']\n")
+    assert cb.reconcile(compose) == [("127.0.0.10", "web", [8080]), ("127.0.0.20", "api", [9000])]
+
+
+def test_allocation_keeps_preferred_ips_after_a_miss(tmp_path: Path, monkeypatch):
+    cb, calls, _mod = _watched_bridge(monkeypatch)
+    cb.placement = {"base_ip": "127.0.0.254"}  # room for one fresh address only
+    cb.preferred_ips = {"api": "127.0.0.20"}
+    compose = tmp_path / "docker-compose.yml"
+    compose.write_text("services:\n  web:\n    ports: ['8080:80']\n  db:\n    ports: ['5432:5432']\n  api:\n    ports: ['9000:90']\n")
+    assert cb.reconcile(compose) == [("127.0.0.254", "web", [8080]), ("127.0.0.20", "api", [9000])]
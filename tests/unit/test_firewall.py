@@ -0,0 +1,132 @@
+import json
+import os
+import subprocess
+
+from arpx import firewall as fw_mod
+from arpx.firewall import Firewall, IptablesBackend
+
+BASE = "*filter\n:INPUT ACCEPT [0:0]\n:FORWARD ACCEPT [0:0]\n:OUTPUT ACCEPT [0:0]\n"
+
+
+class _FakeTools:
+    """Stands in for iptables-save/-restore and nft: serves `saved` and records every spawn."""
+
+    def __init__(self, saved: str = BASE + "COMMIT\n"):
+        self.saved = saved
+        self.calls = []
+
+    def __call__(self, args, input=None, **kwargs):
+        self.calls.append((args[0], input))
+        if args[0] == "iptables-save" or (args[0] == "nft" and "list" in args):
+            if self.saved is None:
+                return subprocess.CompletedProcess(args, 1, "", "No such file or directory")
+            return subprocess.CompletedProcess(args, 0, self.saved, "")
+        return subprocess.CompletedProcess(args, 0, "", "")
+
+
+def _installed(rules, hooks=("INPUT", "OUTPUT")) -> str:
+    backend = IptablesBackend()
+    lines = [":ARPX-INPUT - [0:0]", ":ARPX-OUTPUT - [0:0]"]
+    lines += [f"-A {h} -j ARPX-{h}" for h in hooks]
+    lines += backend.entries(rules)
+    return BASE + "\n".join(lines) + "\nCOMMIT\n"
+
+
+def test_allow_many_aliases_in_one_transaction(monkeypatch):
+    tools = _FakeTools()
+    monkeypatch.setattr(fw_mod.subprocess, "run", tools)
+    firewall = Firewall("iptables", chain="ARPX")
+    rules = [(f"10.1.{i // 100}.{i % 100 + 1}", 8000 + i) for i in range(200)]
+    assert firewall.allow(rules)
+    assert [name for name, _ in tools.calls] == ["iptables-save", "iptables-restore"]
+    script = tools.calls[1][1].splitlines()
+    assert script[:3] == ["*filter", ":ARPX-INPUT - [0:0]", ":ARPX-OUTPUT - [0:0]"]
+    assert "-A ARPX-OUTPUT -s 10.1.1.100/32 -p tcp -m tcp --sport 8199 -j ACCEPT" in script
+    assert len([line for line in script if line.startswith("-A ARPX-")]) == 400
+    assert script[-3:] == ["-I INPUT 1 -j ARPX-INPUT", "-I OUTPUT 1 -j ARPX-OUTPUT", "COMMIT"]
+
+
+def test_restart_is_idempotent(monkeypatch):
+    rules = [("192.168.1.100", 8000), ("192.168.1.101", 8001)]
+    # the same rules are already installed: only the state is read
+    tools = _FakeTools(_installed(rules))
+    monkeypatch.setattr(fw_mod.subprocess, "run", tools)
+    assert Firewall("iptables", chain="ARPX").allow(rules)
+    assert [name for name, _ in tools.calls] == ["iptables-save"]
+
+    # stale rules and a duplicated jump from an interrupted run are replaced, not appended to
+    tools = _FakeTools(_installed([("192.168.1.150", 9000)], hooks=("INPUT", "INPUT", "OUTPUT")))
+    monkeypatch.setattr(fw_mod.subprocess, "run", tools)
+    assert Firewall("iptables", chain="ARPX").allow(rules)
+    script = tools.calls[1][1].splitlines()
+    assert "-D INPUT -j ARPX-INPUT" in script
+    assert not any(line.startswith("-I ") for line in script)
+    assert not any("192.168.1.150" in line for line in script)
+
+
+def test_teardown_and_revoke(monkeypatch):
+    rules = [(f"192.168.1.{100 + i}", 8000) for i in range(50)]
+    tools = _FakeTools(_installed(rules))
+    monkeypatch.setattr(fw_mod.subprocess, "run", tools)
+    firewall = Firewall("iptables", chain="ARPX")
+    firewall.rules = set(rules)
+    assert firewall.revoke("10.0.0.1")  # no rules for it: nothing spawned
+    assert tools.calls == []
+    assert firewall.teardown()
+    assert [name for name, _ in tools.calls] == ["iptables-save", "iptables-restore"]
+    assert tools.calls[1][1].splitlines()[3:] == [
+        "-D INPUT -j ARPX-INPUT", "-D OUTPUT -j ARPX-OUTPUT", "-X ARPX-INPUT", "-X ARPX-OUTPUT", "COMMIT",
+    ]
+    # nothing of ours installed: nothing to remove
+    tools = _FakeTools()
+    monkeypatch.setattr(fw_mod.subprocess, "run", tools)
+    assert Firewall("iptables", chain="ARPX").teardown()
+    assert [name for name, _ in tools.calls] == ["iptables-save"]
+
+
+def test_nftables_backend(monkeypatch):
+    tools = _FakeTools(saved=None)
+    monkeypatch.setattr(fw_mod.subprocess, "run", tools)
+    firewall = Firewall("nftables", chain="ARPX")
+    assert firewall.allow([("192.168.1.100", 8000)])
+    script = tools.calls[1][1]
+    assert "elements = { 192.168.1.100 . 8000 }" in script
+    assert "ip daddr . tcp dport @allowed accept" in script
+
+    listed = {"nftables": [
+        {"table": {"family": "inet", "name": "arpx"}},
+        {"set": {"name": "allowed", "elem": [{"concat": ["192.168.1.100", 8000]}]}},
+        {"chain": {"name": "input", "hook": "input"}},
+        {"chain": {"name": "output", "hook": "output"}},
+    ]}
+    tools = _FakeTools(saved=json.dumps(listed))
+    monkeypatch.setattr(fw_mod.subprocess, "run", tools)
+    assert firewall.sync()
+    assert [name for name, _ in tools.calls] == ["nft"]
+    assert firewall.teardown()
+    assert tools.calls[-1][1] == "delete table inet arpx\n"
+
+
+def test_instances_leave_each_others_rules_alone(monkeypatch):
+    assert Firewall("none").chain == f"ARPX_{os.getpid()}"
+
+    def installed(*chains):
+        lines = []
+        for n, chain in enumerate(chains):
+            lines += [f":{chain}-INPUT - [0:0]", f":{chain}-OUTPUT - [0:0]", f"-A INPUT -j {chain}-INPUT", f"-A OUTPUT -j {chain}-OUTPUT"]
+            lines += IptablesBackend(chain).entries([(f"192.168.1.{100 + n}", 8000 + n)])
+        return BASE + "\n".join(lines) + "\nCOMMIT\n"
+
+    # a peer's chains are installed: replacing our rules leaves them out of the script
+    tools = _FakeTools(installed("ARPX_1"))
+    monkeypatch.setattr(fw_mod.subprocess, "run", tools)
+    firewall = Firewall("iptables", chain="ARPX_2")
+    assert firewall.allow([("192.168.1.101", 8001)])
+    assert "ARPX_1" not in tools.calls[1][1]
+
+    # both are installed: teardown removes only ours
+    tools = _FakeTools(installed("ARPX_1", "ARPX_2"))
+    monkeypatch.setattr(fw_mod.subprocess, "run", tools)
+    assert firewall.teardown()
+    script = tools.calls[1][1]
+    assert "-X ARPX_2-INPUT" in script and "ARPX_1" not in script
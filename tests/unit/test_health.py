@@ -0,0 +1,96 @@
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from arpx.balancer import NoHealthyUpstream, UpstreamGroup
+from arpx.health import HealthChecker
+from arpx.proxy import TcpForwarderManager
+
+
+def _get_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _listener() -> socket.socket:
+    srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    srv.bind(("127.0.0.1", 0))
+    srv.listen(16)
+    return srv
+
+
+class _StatusHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(200 if self.path == "/healthz" else 503)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+def test_thresholds_mark_down_and_up():
+    live = _listener()
+    dead_port = _get_free_port()
+    group = UpstreamGroup([("127.0.0.1", live.getsockname()[1]), ("127.0.0.1", dead_port)])
+    checker = HealthChecker(interval=1, timeout=0.5, rise=2, fall=2)
+    checker.watch(group)
+    live_up, dead_up = group.upstreams
+
+    checker.check_once()
+    assert dead_up.healthy  # one failure is below fall
+    checker.check_once()
+    assert not dead_up.healthy and live_up.healthy
+    assert {group.pick().port for _ in range(4)} == {live_up.port}
+
+    revived = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    revived.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    revived.bind(("127.0.0.1", dead_port))
+    revived.listen(4)
+    checker.check_once()
+    assert not dead_up.healthy
+    checker.check_once()
+    assert dead_up.healthy
+    revived.close()
+    live.close()
+
+
+def test_http_probe_checks_status():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StatusHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        address = server.server_address
+        assert HealthChecker(http_path="/healthz").probe(address) is None
+        assert HealthChecker(http_path="/other").probe(address) == "HTTP status 503"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_group_without_healthy_target_rejects_fast():
+    group = UpstreamGroup([("127.0.0.1", _get_free_port())])
+    group.upstreams[0].healthy = False
+    with pytest.raises(NoHealthyUpstream):
+        group.connect(timeout=5)
+
+
+def test_forwarder_rejects_clients_of_unhealthy_target():
+    dead_port = _get_free_port()
+    forward_port = _get_free_port()
+    checker = HealthChecker(interval=1, timeout=0.5, fall=1)
+    mgr = TcpForwarderManager(health=checker)
+    fwd = mgr.add("127.0.0.1", forward_port, "127.0.0.1", dead_port)
+    assert fwd.upstreams is not None
+    checker.check_once()
+    time.sleep(0.05)
+    try:
+        with socket.create_connection(("127.0.0.1", forward_port), timeout=2) as c:
+            assert c.recv(16) == b""
+        assert fwd.upstreams.stats()[0]["failures"] == 0  # no connect was attempted
+    finally:
+        mgr.stop_all()
+    assert checker.stats() == []
@@ -0,0 +1,270 @@
+import http.client
+import socket
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from arpx.httpproxy import HttpParseError, UpstreamPool, parse_head
+from arpx.proxy import TcpForwarderManager
+
+
+def _get_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == "/chunked":
+            self.send_response(200)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for part in (b"hel", b"lo"):
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(part), part))
+            self.wfile.write(b"0\r\n\r\n")
+            return
+        body = f"path={self.path}".encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        if self.path == "/close":
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "1234")
+        self.end_headers()
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _CountingServer(ThreadingHTTPServer):
+    daemon_threads = True
+    connections = 0
+
+    def get_request(self):
+        conn = super().get_request()
+        self.connections += 1
+        return conn
+
+
+@pytest.fixture
+def http_forward():
+    backend = _CountingServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=backend.serve_forever, daemon=True).start()
+    forward_port = _get_free_port()
+    mgr = TcpForwarderManager(mode="http", pool_size=4)
+    mgr.add("127.0.0.1", forward_port, "127.0.0.1", backend.server_address[1])
+    time.sleep(0.05)
+    yield backend, forward_port, mgr
+    mgr.stop_all()
+    backend.shutdown()
+    backend.server_close()
+
+
+def _get(port: int, path: str, method: str = "GET", body=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+    try:
+        conn.request(method, path, body=body, headers={"Connection": "close"})
+        resp = conn.getresponse()
+        return resp.status, resp.read()
+    finally:
+        conn.close()
+
+
+def test_short_clients_reuse_upstream_connection(http_forward):
+    backend, port, mgr = http_forward
+    for i in range(5):
+        assert _get(port, f"/r{i}") == (200, f"path=/r{i}".encode())
+    pool = mgr.pools[("127.0.0.1", backend.server_address[1])]
+    assert backend.connections == 1
+    assert pool.stats()["reused"] == 4
+
+
+def test_keepalive_client_chunked_and_post(http_forward):
+    backend, port, _mgr = http_forward
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+    try:
+        conn.request("GET", "/chunked")
+        assert conn.getresponse().read() == b"hello"
+        conn.request("POST", "/echo", body=b"x" * 100000)
+        assert conn.getresponse().read() == b"x" * 100000
+        conn.request("HEAD", "/head")
+        resp = conn.getresponse()
+        assert resp.status == 200 and resp.read() == b""
+        conn.request("GET", "/after-head")
+        assert conn.getresponse().read() == b"path=/after-head"
+    finally:
+        conn.close()
+    assert backend.connections == 1
+
+
+def test_upstream_close_is_not_pooled(http_forward):
+    backend, port, mgr = http_forward
+    assert _get(port, "/close") == (200, b"path=/close")
+    assert _get(port, "/next") == (200, b"path=/next")
+    assert backend.connections == 2
+    assert mgr.pools[("127.0.0.1", backend.server_address[1])].stats()["reused"] == 0
+
+
+def test_stale_pooled_connection_is_replaced():
+    backend_port = _get_free_port()
+    srv = socket.socket()
+    srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    srv.bind(("127.0.0.1", backend_port))
+    srv.listen(4)
+    pool = UpstreamPool(("127.0.0.1", backend_port), max_idle=2)
+    sock, reused = pool.acquire()
+    assert not reused
+    peer, _ = srv.accept()
+    pool.release(sock)
+    peer.close()  # server drops the idle connection
+    time.sleep(0.05)
+    sock2, reused2 = pool.acquire()
+    assert not reused2 and sock2 is not sock
+    assert pool.stats() == {"created": 2, "reused": 0, "idle": 0}
+    sock2.close()
+    pool.close()
+    srv.close()
+
+
+def _flaky_backend(failure: str):
+    """Backend whose first connection answers one request, then fails on the next.
+
+    failure is "drop" (close without answering) or "partial" (send part of
+    the response head, then reset). Later connections answer normally.
+    Returns (port, requests seen, close).
+    """
+    srv = socket.socket()
+    srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    srv.bind(("127.0.0.1", 0))
+    srv.listen(4)
+    seen = []
+    ok = b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok"
+
+    def read_request(conn):
+        buf = b""
+        while b"\r\n\r\n" not in buf:
+            data = conn.recv(4096)
+            if not data:
+                return False
+            buf += data
+        seen.append(buf.split(b" ", 1)[0])
+        return True
+
+    def serve():
+        first = True
+        while True:
+            try:
+                conn, _ = srv.accept()
+            except OSError:
+                return
+            with conn:
+                if not read_request(conn):
+                    continue
+                conn.sendall(ok)
+                if not first:
+                    continue
+                first = False
+                if not read_request(conn):
+                    continue
+                if failure == "partial":
+                    conn.sendall(b"HTTP/1.1 200 OK\r\n")
+                    time.sleep(0.1)
+                    conn.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+
+    threading.Thread(target=serve, daemon=True).start()
+    return srv.getsockname()[1], seen, srv.close
+
+
+@pytest.mark.parametrize("failure,method,retried", [
+    ("drop", "GET", True),
+    ("drop", "DELETE", True),
+    ("drop", "POST", False),
+    ("drop", "PATCH", False),
+    ("partial", "GET", False),
+])
+def test_stale_retry_only_when_safe(failure, method, retried):
+    backend_port, seen, close = _flaky_backend(failure)
+    forward_port = _get_free_port()
+    mgr = TcpForwarderManager(mode="http", pool_size=4)
+    mgr.add("127.0.0.1", forward_port, "127.0.0.1", backend_port)
+    time.sleep(0.05)
+    try:
+        assert _get(forward_port, "/warm") == (200, b"ok")
+        # raw, so that POST and PATCH go out without a body (http.client adds Content-Length: 0)
+        with socket.create_connection(("127.0.0.1", forward_port), timeout=2) as c:
+            c.sendall(method.encode() + b" /again HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n")
+            reply = b""
+            while True:
+                data = c.recv(4096)
+                if not data:
+                    break
+                reply += data
+        assert reply.endswith(b"ok") == retried
+        time.sleep(0.05)
+        # the failed request reached the backend exactly once unless it was safe to resend
+        assert seen == [b"GET"] + [method.encode()] * (2 if retried else 1)
+    finally:
+        mgr.stop_all()
+        close()
+
+
+def test_non_http_traffic_is_tunnelled(http_forward):
+    _backend, port, _mgr = http_forward
+    with socket.create_connection(("127.0.0.1", port), timeout=2) as c:
+        c.sendall(b"GARBAGE\r\n\r\n")
+        # the backend answers the malformed request itself, so it went through untouched
+        assert b"400" in c.recv(4096)
+
+
+def test_parse_head():
+    start, headers = parse_head(b"GET /x HTTP/1.1\r\nHost: a\r\nAccept: 1\r\naccept: 2\r\n\r\n")
+    assert start == [b"GET", b"/x", b"HTTP/1.1"]
+    assert headers == {"host": "a", "accept": "1, 2"}
+    with pytest.raises(HttpParseError):
+        parse_head(b"GET\r\n\r\n")
+
+
+def test_http_mode_requires_thread_engine():
+    with pytest.raises(ValueError):
+        TcpForwarderManager(engine="asyncio", mode="http")
+
+
+def test_idle_keepalive_client_is_closed():
+    from arpx.proxy import ConnectionLimits
+
+    backend = _CountingServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=backend.serve_forever, daemon=True).start()
+    forward_port = _get_free_port()
+    mgr = TcpForwarderManager(mode="http", limits=ConnectionLimits(idle_timeout=0.3))
+    fwd = mgr.add("127.0.0.1", forward_port, "127.0.0.1", backend.server_address[1])
+    time.sleep(0.05)
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", forward_port, timeout=3)
+        conn.request("GET", "/a")
+        assert conn.getresponse().read() == b"path=/a"
+        assert conn.sock.recv(16) == b""
+        conn.close()
+        time.sleep(0.05)
+        assert fwd.gate.stats()["idle_closed"] == 1
+    finally:
+        mgr.stop_all()
+        backend.shutdown()
+        backend.server_close()
@@ -0,0 +1,111 @@
+import socket
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from arpx.metrics import (
+    Histogram,
+    ListenerMetrics,
+    MetricsRegistry,
+    MetricsServer,
+    listener_families,
+    render,
+)
+from arpx.proxy import ConnectionGate, ConnectionLimits, TcpForwarderManager
+
+
+def _get_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _snapshot(listener: str, kind: str = "forwarder", **observed) -> dict:
+    metrics = ListenerMetrics()
+    metrics.connected(observed.get("connect", 0.002))
+    metrics.closed(observed.get("bytes_in", 10), observed.get("bytes_out", 20), observed.get("session", 0.5))
+    gate = ConnectionGate(ConnectionLimits())
+    gate.admit("10.0.0.1")
+    return {"kind": kind, "listener": listener, "target": "127.0.0.1:80", **gate.stats(), **metrics.snapshot()}
+
+
+def test_histogram_render_is_cumulative():
+    h = Histogram((0.1, 1.0))
+    for v in (0.05, 0.1, 0.5, 3.0):
+        h.observe(v)
+    text = render([("x_seconds", "histogram", "X", [({"a": "b"}, h.snapshot())])])
+    assert "# TYPE x_seconds histogram" in text
+    assert 'x_seconds_bucket{a="b",le="0.1"} 2' in text
+    assert 'x_seconds_bucket{a="b",le="1.0"} 3' in text
+    assert 'x_seconds_bucket{a="b",le="+Inf"} 4' in text
+    assert 'x_seconds_count{a="b"} 4' in text
+    assert 'x_seconds_sum{a="b"} 3.65' in text
+
+
+def test_listener_families_merge_workers():
+    families = {
+        name: samples
+        for name, _kind, _help, samples in listener_families([
+            _snapshot("10.0.0.5:80"),
+            _snapshot("10.0.0.5:80", bytes_in=5),
+            _snapshot("10.0.0.6:80"),
+        ])
+    }
+    received = {labels["listener"]: value for labels, value in families["arpx_bytes_received_total"]}
+    assert received == {"10.0.0.5:80": 15, "10.0.0.6:80": 10}
+    assert families["arpx_connections_active"][0][1] == 2
+    connect = dict((labels["listener"], value) for labels, value in families["arpx_upstream_connect_seconds"])
+    assert connect["10.0.0.5:80"]["count"] == 2
+    # forwarders do no TLS handshakes
+    assert "arpx_tls_handshake_seconds" not in families
+
+
+@pytest.mark.parametrize("engine", ["thread", "asyncio"])
+def test_forwarder_records_bytes_and_latency(engine):
+    backend = socket.socket()
+    backend.bind(("127.0.0.1", 0))
+    backend.listen(1)
+    forward_port = _get_free_port()
+    mgr = TcpForwarderManager(engine=engine)
+    mgr.add("127.0.0.1", forward_port, "127.0.0.1", backend.getsockname()[1])
+    time.sleep(0.05)
+    try:
+        with socket.create_connection(("127.0.0.1", forward_port), timeout=2) as c:
+            c.sendall(b"ping")
+            upstream, _ = backend.accept()
+            with upstream:
+                assert upstream.recv(16) == b"ping"
+                upstream.sendall(b"pong!")
+            assert c.recv(16) == b"pong!"
+        deadline = time.time() + 2
+        while time.time() < deadline:
+            (snap,) = mgr.listener_metrics()
+            if snap["session_time"]["count"]:
+                break
+            time.sleep(0.02)
+        assert snap["listener"] == f"127.0.0.1:{forward_port}"
+        assert (snap["bytes_in"], snap["bytes_out"]) == (4, 5)
+        assert snap["connect_time"]["count"] == 1
+        assert snap["accepted"] == 1 and snap["active"] == 0
+    finally:
+        mgr.stop_all()
+        backend.close()
+
+
+def test_metrics_server_serves_registry():
+    registry = MetricsRegistry()
+    registry.register(lambda: [("arpx_test", "gauge", "Test", [({}, 3)])])
+    registry.register(lambda: 1 / 0)  # a failing collector does not break the scrape
+    server = MetricsServer(registry, port=0)
+    server.start()
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics", timeout=2) as resp:
+            assert resp.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert "arpx_test 3\n" in resp.read().decode()
+        with pytest.raises(urllib.error.HTTPError) as err:
+            urllib.request.urlopen(f"http://127.0.0.1:{server.port}/", timeout=2)
+        assert err.value.code == 404
+    finally:
+        server.stop()
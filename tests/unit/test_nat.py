@@ -0,0 +1,102 @@
+import json
+import subprocess
+
+import pytest
+
+from arpx import nat as nat_mod
+from arpx.nat import NatMapping, NftablesNat, kernel_routable
+
+
+class _FakeNft:
+    """Records nft invocations and answers `list table` with `listed` rules."""
+
+    def __init__(self, listed=None, returncode=0):
+        self.calls = []
+        self.listed = listed
+        self.returncode = returncode
+
+    def __call__(self, args, input=None, **kwargs):
+        self.calls.append((args, input))
+        if "list" in args:
+            if self.listed is None:
+                return subprocess.CompletedProcess(args, 1, "", "No such file or directory")
+            body = {"nftables": [{"metainfo": {}}] + [{"rule": r} for r in self.listed]}
+            return subprocess.CompletedProcess(args, 0, json.dumps(body), "")
+        return subprocess.CompletedProcess(args, self.returncode, "", "" if self.returncode == 0 else "syntax error")
+
+
+def test_ruleset_single_and_balanced_backends():
+    nat = NftablesNat(table="arpx_1")
+    script = nat.ruleset([
+        NatMapping("192.168.1.100", 8080, [("172.18.0.3", 80)]),
+        NatMapping("192.168.1.101", 5432, [("172.18.0.4", 5432), ("172.18.0.5", 5432)], policy="hash"),
+    ])
+    lines = script.splitlines()
+    # replaced in one transaction, whether or not the table exists
+    assert lines[:3] == ["add table ip arpx_1", "delete table ip arpx_1", "table ip arpx_1 {"]
+    assert '\t\tip daddr 192.168.1.100 tcp dport 8080 dnat to 172.18.0.3:80 comment "arpx:arpx_1"' in lines
+    assert (
+        '\t\tip daddr 192.168.1.101 tcp dport 5432 jhash ip saddr mod 2 vmap { 0 : jump svc1_0, 1 : jump svc1_1 } '
+        'comment "arpx:arpx_1"' in lines
+    )
+    assert '\t\tdnat to 172.18.0.5:5432 comment "arpx:arpx_1"' in lines
+    assert "ct original ip daddr { 192.168.1.100, 192.168.1.101 } masquerade" in script
+    assert "masquerade" not in NftablesNat(masquerade=False).ruleset([NatMapping("10.0.0.9", 80, [("172.18.0.3", 80)])])
+
+
+def test_apply_validates_backends_and_reports_failure(monkeypatch):
+    assert kernel_routable("172.18.0.3")
+    assert not kernel_routable("127.0.0.1") and not kernel_routable("::1")
+    nat = NftablesNat()
+    with pytest.raises(ValueError):
+        nat.apply([NatMapping("192.168.1.100", 80, [("127.0.0.1", 80)])])
+    fake = _FakeNft(returncode=1)
+    monkeypatch.setattr(nat_mod.subprocess, "run", fake)
+    assert nat.apply([NatMapping("192.168.1.100", 80, [("172.18.0.3", 80)])]) is False
+    assert fake.calls[0][0] == ["nft", "-f", "-"]
+    assert nat.mappings == []
+
+
+def test_cleanup_removes_only_tagged_rules(monkeypatch):
+    nat = NftablesNat(table="arpx_1")
+    ours = {"chain": "services", "handle": 4, "comment": "arpx:arpx_1"}
+    fake = _FakeNft(listed=[ours, {"chain": "prerouting", "handle": 7, "comment": "arpx:arpx_1"}])
+    monkeypatch.setattr(nat_mod.subprocess, "run", fake)
+    nat.cleanup()
+    assert fake.calls[-1][1] == "delete table ip arpx_1\n"
+
+    # someone else added a rule to the table: delete ours by handle and keep it
+    fake = _FakeNft(listed=[ours, {"chain": "services", "handle": 9}])
+    monkeypatch.setattr(nat_mod.subprocess, "run", fake)
+    nat.cleanup()
+    assert fake.calls[-1][1] == "delete rule ip arpx_1 services handle 4\n"
+
+    # nothing to do when the table is gone
+    fake = _FakeNft(listed=None)
+    monkeypatch.setattr(nat_mod.subprocess, "run", fake)
+    assert nat.cleanup() is True
+    assert len(fake.calls) == 1
+
+
+def test_cleanup_reports_failure(monkeypatch):
+    nat = NftablesNat(table="arpx_1")
+    nat.mappings = [NatMapping("192.168.1.100", 80, [("172.18.0.3", 80)])]
+    fake = _FakeNft(listed=[{"chain": "services", "handle": 4, "comment": "arpx:arpx_1"}], returncode=1)
+    monkeypatch.setattr(nat_mod.subprocess, "run", fake)
+    assert nat.cleanup() is False
+    assert nat.mappings
+
+    def denied(args, input=None, **kwargs):
+        return subprocess.CompletedProcess(args, 1, "", "Operation not permitted")
+
+    monkeypatch.setattr(nat_mod.subprocess, "run", denied)
+    assert nat.cleanup() is False
+
+
+def test_bridge_kernel_nat_needs_container_targets():
+    from arpx.bridge import ComposeBridge
+
+    with pytest.raises(ValueError):
+        ComposeBridge("lo", kernel_nat=True, health_interval=0)
+    bridge = ComposeBridge("lo", target_mode="container", kernel_nat=True, health_interval=0)
+    assert bridge.nat is not None and bridge.nat.table.startswith("arpx_")
@@ -0,0 +1,74 @@
+import socket
+import struct
+
+import pytest
+
+from arpx import netlink as nl
+
+
+def _header(msg: bytes):
+    return struct.unpack_from("=IHHII", msg)
+
+
+def test_pack_and_parse_attrs_roundtrip():
+    data = nl.pack_attr(nl.IFA_LABEL, b"eth0:1\0") + nl.pack_attr(nl.IFA_LOCAL, socket.inet_aton("10.0.0.5"))
+    assert len(data) % 4 == 0
+    attrs = nl.parse_attrs(data)
+    assert attrs[nl.IFA_LABEL] == b"eth0:1\0"
+    assert attrs[nl.IFA_LOCAL] == socket.inet_aton("10.0.0.5")
+
+
+def test_address_message_add():
+    msg = nl.address_message(True, 3, "192.168.1.150", 24, "eth0:web").encode(seq=7)
+    length, msg_type, flags, seq, _pid = _header(msg)
+    assert length == len(msg)
+    assert msg_type == nl.RTM_NEWADDR
+    assert flags & nl.NLM_F_ACK and flags & nl.NLM_F_CREATE and flags & nl.NLM_F_EXCL
+    assert seq == 7
+    family, prefixlen, _flags, _scope, index = struct.unpack_from("=BBBBI", msg, 16)
+    assert (family, prefixlen, index) == (socket.AF_INET, 24, 3)
+    attrs = nl.parse_attrs(msg, 16 + 8)
+    assert attrs[nl.IFA_LOCAL] == socket.inet_aton("192.168.1.150")
+    assert attrs[nl.IFA_BROADCAST] == socket.inet_aton("192.168.1.255")
+    assert attrs[nl.IFA_LABEL].rstrip(b"\0") == b"eth0:web"
+
+
+def test_address_message_delete_has_no_label():
+    msg = nl.address_message(False, 3, "192.168.1.150", 24, "eth0:web").encode(seq=1)
+    assert _header(msg)[1] == nl.RTM_DELADDR
+    attrs = nl.parse_attrs(msg, 16 + 8)
+    assert nl.IFA_LABEL not in attrs
+
+
+def test_neighbor_message_permanent():
+    msg = nl.neighbor_message(True, 2, "10.0.0.9", "02:00:00:00:00:01").encode(seq=1)
+    assert _header(msg)[1] == nl.RTM_NEWNEIGH
+    _family, ifindex, state, _flags, _type = struct.unpack_from("=BxxxiHBB", msg, 16)
+    assert ifindex == 2
+    assert state == nl.NUD_PERMANENT
+    attrs = nl.parse_attrs(msg, 16 + 12)
+    assert attrs[nl.NDA_DST] == socket.inet_aton("10.0.0.9")
+    assert attrs[nl.NDA_LLADDR] == bytes.fromhex("020000000001")
+
+
+def test_iter_messages_splits_batch():
+    batch = nl.address_message(True, 1, "10.0.0.1", 24).encode(1) + nl.neighbor_message(False, 1, "10.0.0.1").encode(2)
+    parsed = list(nl.iter_messages(batch))
+    assert [(t, seq) for t, _f, seq, _p in parsed] == [(nl.RTM_NEWADDR, 1), (nl.RTM_DELNEIGH, 2)]
+
+
+def test_change_event_index_ignores_secondary_addresses():
+    link = struct.pack("=BxHiII", socket.AF_UNSPEC, 1, 4, 0, 0)
+    assert nl.change_event_index(nl.RTM_NEWLINK, link) == 4
+    primary = struct.pack("=BBBBI", socket.AF_INET, 24, 0, 0, 4)
+    secondary = struct.pack("=BBBBI", socket.AF_INET, 24, nl.IFA_F_SECONDARY, 0, 4)
+    assert nl.change_event_index(nl.RTM_DELADDR, primary) == 4
+    assert nl.change_event_index(nl.RTM_NEWADDR, secondary) is None
+    assert nl.change_event_index(nl.RTM_NEWNEIGH, primary) is None
+
+
+def test_manager_rejects_unknown_backend():
+    from arpx.network import NetworkVisibleManager
+
+    with pytest.raises(ValueError):
+        NetworkVisibleManager("eth0", backend="bogus")
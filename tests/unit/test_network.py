@@ -51,6 +51,28 @@ class TestNetworkManager(unittest.TestCase):
         self.assertEqual(cidr, '16')
         self.assertEqual(bcast, '172.17.255.255')
 
+    @patch('subprocess.check_output')
+    def test_interface_snapshot_is_cached(self, mock_check_output):
+        """Test that MAC and network details come from one cached `ip addr show`."""
+        mock_check_output.return_value = b'''
+2: eth0: <BROADCAST,MULTICAST,UP,LOWER_UP> mtu 1500 qdisc ...
+    link/ether 02:42:ac:11:00:02 brd ff:ff:ff:ff:ff:ff
+    inet 172.17.0.2/16 brd 172.17.255.255 scope global eth0
+'''
+        manager = NetworkVisibleManager(interface='eth0')
+        self.assertEqual(manager.get_interface_mac(), '02:42:ac:11:00:02')
+        self.assertEqual(manager.get_network_details()[0], '172.17.0.2')
+        self.assertEqual(manager.get_interface_mac(), '02:42:ac:11:00:02')
+        mock_check_output.assert_called_once_with("ip addr show eth0", shell=True)
+
+        manager.invalidate_snapshot()
+        manager.get_interface_mac()
+        self.assertEqual(mock_check_output.call_count, 2)
+
+        manager.snapshot_ttl = 0
+        manager.get_interface_mac()
+        self.assertEqual(mock_check_output.call_count, 3)
+
     @patch('subprocess.check_output', return_value=b'invalid output')
     def test_get_network_details_parsing_failure(self, mock_check_output):
         """Test that None is returned when parsing of network details fails."""
@@ -85,6 +107,55 @@ class TestNetworkManager(unittest.TestCase):
         self.assertEqual(len(ips), 2)
         self.assertEqual(ips, ['192.168.1.101', '192.168.1.102'])
 
+    def test_find_free_ips_concurrent_keeps_address_order(self):
+        """Test that concurrent probing still returns free IPs in address order."""
+        import time as _time
+        busy = {'192.168.1.100', '192.168.1.102'}
+
+        def prober(ip):
+            # later addresses answer first
+            _time.sleep(0.01 * (110 - int(ip.split('.')[-1])) / 10)
+            return ip in busy
+
+        manager = NetworkVisibleManager(interface='eth0')
+        ips = manager.find_free_ips('192.168.1.0', '24', num_ips=4, start_ip=100, concurrency=8, prober=prober)
+        self.assertEqual(ips, ['192.168.1.101', '192.168.1.103', '192.168.1.104', '192.168.1.105'])
+
+    def test_find_free_ips_respects_concurrency_limit(self):
+        """Test that no more than `concurrency` probes run at the same time."""
+        import threading
+        import time as _time
+        lock = threading.Lock()
+        state = {'active': 0, 'peak': 0}
+
+        def prober(ip):
+            with lock:
+                state['active'] += 1
+                state['peak'] = max(state['peak'], state['active'])
+            _time.sleep(0.02)
+            with lock:
+                state['active'] -= 1
+            return False
+
+        manager = NetworkVisibleManager(interface='eth0')
+        ips = manager.find_free_ips('192.168.1.0', '24', num_ips=12, start_ip=100, concurrency=4, prober=prober)
+        self.assertEqual(len(ips), 12)
+        self.assertLessEqual(state['peak'], 4)
+
+    def test_find_free_ips_deadline(self):
+        """Test that the search stops once the deadline has passed."""
+        import time as _time
+
+        def prober(ip):
+            _time.sleep(0.2)
+            return False
+
+        manager = NetworkVisibleManager(interface='eth0')
+        start = _time.monotonic()
+        ips = manager.find_free_ips('192.168.1.0', '24', num_ips=3, start_ip=100, deadline=0.05, prober=prober)
+        self.assertEqual(ips, [])
+        self.assertLess(_time.monotonic() - start, 0.2)
+
     @patch('subprocess.run')
     @patch('arpx.network.NetworkVisibleManager.get_interface_mac', return_value='00:11:22:33:44:55')
     def test_add_virtual_ip_with_visibility_success(self, mock_get_mac, mock_run):
@@ -107,5 +178,119 @@ class TestNetworkManager(unittest.TestCase):
         self.assertFalse(result)
         self.assertEqual(len(manager.virtual_ips), 0)
 
+    @patch('subprocess.Popen')
+    @patch('subprocess.run')
+    @patch('arpx.network.NetworkVisibleManager.get_interface_mac', return_value='00:11:22:33:44:55')
+    def test_add_virtual_ips_batch(self, mock_get_mac, mock_run, mock_popen):
+        """Test that a batch writes the sysctls once and announces all addresses in parallel."""
+        mock_run.return_value = MagicMock(returncode=0)
+        manager = NetworkVisibleManager(interface='eth0')
+        result = manager.add_virtual_ips([('192.168.1.150', 'a'), ('192.168.1.151', 'b'), ('192.168.1.152', 'c')], '24')
+
+        self.assertTrue(result)
+        self.assertEqual([v[1] for v in manager.virtual_ips], ['eth0:a', 'eth0:b', 'eth0:c'])
+        commands = [c.args[0] for c in mock_run.call_args_list]
+        self.assertEqual(sum('ip_forward' in c for c in commands), 1)
+        self.assertEqual(sum('proxy_arp' in c for c in commands), 1)
+        self.assertEqual(mock_popen.call_count, 3)
+        mock_get_mac.assert_called_once()
+
+    @patch('subprocess.Popen')
+    @patch('subprocess.run')
+    def test_add_virtual_ips_rolls_back_on_failure(self, mock_run, mock_popen):
+        """Test that a failed address removes the ones already added."""
+        def run(cmd, **kwargs):
+            if cmd.startswith('ip addr add 192.168.1.152/'):
+                raise CalledProcessError(2, cmd)
+            return MagicMock(returncode=0)
+        mock_run.side_effect = run
+        manager = NetworkVisibleManager(interface='eth0')
+        result = manager.add_virtual_ips([('192.168.1.150', 'a'), ('192.168.1.151', 'b'), ('192.168.1.152', 'c')], '24')
+
+        self.assertFalse(result)
+        self.assertEqual(manager.virtual_ips, [])
+        commands = [c.args[0] for c in mock_run.call_args_list]
+        deletes = [c for c in commands if c.startswith('ip addr del')]
+        self.assertEqual(deletes, ['ip addr del 192.168.1.151/24 dev eth0', 'ip addr del 192.168.1.150/24 dev eth0'])
+        self.assertFalse(any('ip_forward' in c for c in commands))
+        mock_popen.assert_not_called()
+
+    @patch('subprocess.Popen')
+    @patch('subprocess.run')
+    @patch('arpx.network.NetworkVisibleManager.get_interface_mac', return_value='00:11:22:33:44:55')
+    def test_announcer_replaces_arping(self, mock_get_mac, mock_run, mock_popen):
+        """Test that addresses go to the in-process announcer instead of arping."""
+        manager = NetworkVisibleManager(interface='eth0')
+        manager.announcer = MagicMock()
+        manager.announce_arp_many(['192.168.1.150', '192.168.1.151'])
+        manager.announce_arp('192.168.1.152')
+
+        mock_popen.assert_not_called()
+        self.assertFalse(any('arping' in c.args[0] for c in mock_run.call_args_list))
+        manager.announcer.add.assert_any_call(['192.168.1.150', '192.168.1.151'])
+        manager.announcer.add.assert_any_call(['192.168.1.152'])
+
+        manager.remove_virtual_ip('192.168.1.150')
+        manager.announcer.remove.assert_called_once_with(['192.168.1.150'])
+
+    @patch('subprocess.Popen')
+    @patch('subprocess.run')
+    @patch('arpx.network.NetworkVisibleManager.get_interface_mac', return_value='00:11:22:33:44:55')
+    def test_responder_mode_skips_proxy_arp(self, mock_get_mac, mock_run, mock_popen):
+        """Test that arp_mode='responder' registers aliases instead of writing sysctls."""
+        manager = NetworkVisibleManager(interface='eth0', arp_mode='responder')
+        responder = MagicMock()
+
+        def start():
+            manager.responder = responder
+            return True
+
+        with patch.object(manager, '_start_responder', side_effect=start):
+            self.assertTrue(manager.add_virtual_ips([('192.168.1.150', 'a'), ('192.168.1.151', 'b')], '24'))
+        commands = [c.args[0] for c in mock_run.call_args_list]
+        self.assertFalse(any('proxy_arp' in c or 'ip_forward' in c for c in commands))
+        responder.add.assert_called_once_with(['192.168.1.150', '192.168.1.151'])
+
+        manager.cleanup()
+        responder.remove.assert_any_call(['192.168.1.150'])
+        responder.stop.assert_called_once()
+        self.assertIsNone(manager.responder)
+
+    @patch('subprocess.check_output')
+    @patch('subprocess.Popen')
+    @patch('subprocess.run')
+    def test_steady_state_spawns_nothing(self, mock_run, mock_popen, mock_check_output):
+        """Test that neighbour entries are only rewritten after the watcher saw the MAC change."""
+        mock_check_output.return_value = b'link/ether 00:11:22:33:44:55 brd ff:ff:ff:ff:ff:ff\n'
+        manager = NetworkVisibleManager(interface='eth0')
+        manager.announcer = MagicMock()
+        ips = ['192.168.1.150', '192.168.1.151']
+        manager.announce_arp_many(ips)
+        mock_run.reset_mock()
+        mock_check_output.reset_mock()
+
+        manager.snapshot_ttl = 0  # even with an expired snapshot
+        for _ in range(10):
+            self.assertFalse(manager.refresh_neighbors(ips))
+        self.assertEqual(mock_run.call_count + mock_popen.call_count + mock_check_output.call_count, 0)
+
+        # a link event with the same MAC reads it once and leaves the entries alone
+        manager._link_changed.set()
+        self.assertFalse(manager.refresh_neighbors(ips))
+        mock_run.assert_not_called()
+
+        mock_check_output.return_value = b'link/ether 66:77:88:99:aa:bb brd ff:ff:ff:ff:ff:ff\n'
+        manager._link_changed.set()
+        self.assertTrue(manager.refresh_neighbors(ips))
+        self.assertEqual(
+            [c.args[0] for c in mock_run.call_args_list],
+            [f"ip neigh replace {ip} lladdr 66:77:88:99:aa:bb dev eth0 nud permanent 2>/dev/null" for ip in ips],
+        )
+        self.assertFalse(manager.refresh_neighbors(ips))
+
+    def test_unknown_arp_mode_rejected(self):
+        with self.assertRaises(ValueError):
+            NetworkVisibleManager(interface='eth0', arp_mode='gratuitous')
+
 if __name__ == '__main__':
     unittest.main()
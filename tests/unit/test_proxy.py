@@ -1,3 +1,4 @@
+import os
 import socket
 import threading
 import time
@@ -47,3 +48,206 @@ def test_tcp_forwarder_loopback():
     assert data == b"echo:hello"
 
     mgr.stop_all()
+
+
+def test_async_forwarder_loopback():
+    backend_port = _get_free_port()
+    forward_port = _get_free_port()
+
+    _start_tcp_echo_server("127.0.0.1", backend_port)
+
+    mgr = TcpForwarderManager(engine="asyncio")
+    mgr.add("127.0.0.1", forward_port, "127.0.0.1", backend_port)
+
+    with socket.create_connection(("127.0.0.1", forward_port), timeout=1) as c:
+        c.sendall(b"hello")
+        data = c.recv(1024)
+    assert data == b"echo:hello"
+
+    mgr.stop_all()
+
+
+def test_async_forwarders_share_loop():
+    mgr = TcpForwarderManager(engine="asyncio")
+    a = mgr.add("127.0.0.1", _get_free_port(), "127.0.0.1", _get_free_port())
+    b = mgr.add("127.0.0.1", _get_free_port(), "127.0.0.1", _get_free_port())
+    try:
+        assert len(mgr._loops) == 1
+        assert a._loop is b._loop
+    finally:
+        mgr.stop_all()
+    assert mgr._loops == []
+
+
+def test_forwarder_manager_rejects_unknown_engine():
+    import pytest
+
+    with pytest.raises(ValueError):
+        TcpForwarderManager(engine="bogus")
+
+
+def _start_blob_server(host: str, port: int, payload: bytes):
+    def serve():
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            s.bind((host, port))
+            s.listen(5)
+            conn, _ = s.accept()
+            with conn:
+                conn.sendall(payload)
+    t = threading.Thread(target=serve, daemon=True)
+    t.start()
+    time.sleep(0.05)
+    return t
+
+
+def _fetch_through_forwarder(zero_copy: bool, payload: bytes) -> bytes:
+    backend_port = _get_free_port()
+    forward_port = _get_free_port()
+    _start_blob_server("127.0.0.1", backend_port, payload)
+
+    fwd = TcpForwarder(("127.0.0.1", forward_port), ("127.0.0.1", backend_port), zero_copy=zero_copy)
+    fwd.start()
+    time.sleep(0.05)
+    chunks = []
+    try:
+        with socket.create_connection(("127.0.0.1", forward_port), timeout=2) as c:
+            while True:
+                data = c.recv(65536)
+                if not data:
+                    break
+                chunks.append(data)
+    finally:
+        fwd.stop()
+    return b"".join(chunks)
+
+
+def test_forwarder_large_payload_zero_copy():
+    payload = os.urandom(4 * 1024 * 1024)
+    assert _fetch_through_forwarder(True, payload) == payload
+
+
+def test_forwarder_large_payload_buffered():
+    payload = os.urandom(4 * 1024 * 1024)
+    assert _fetch_through_forwarder(False, payload) == payload
+
+
+def test_forwarder_splice_falls_back_when_unsupported(monkeypatch):
+    import errno
+    from arpx import proxy as proxy_mod
+
+    if not proxy_mod.HAS_SPLICE:
+        return
+
+    def refuse(*args, **kwargs):
+        raise OSError(errno.EINVAL, "splice not supported")
+
+    monkeypatch.setattr(proxy_mod.os, "splice", refuse)
+    payload = os.urandom(256 * 1024)
+    assert _fetch_through_forwarder(True, payload) == payload
+
+
+def _start_hold_server():
+    """Accept connections and keep them open without sending anything."""
+    srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    srv.bind(("127.0.0.1", 0))
+    srv.listen(16)
+    held = []
+
+    def serve():
+        while True:
+            try:
+                conn, _ = srv.accept()
+            except OSError:
+                return
+            held.append(conn)
+
+    threading.Thread(target=serve, daemon=True).start()
+    return srv, held
+
+
+def _is_shed(sock: socket.socket) -> bool:
+    try:
+        return sock.recv(16) == b""
+    except ConnectionResetError:
+        return True
+
+
+def test_forwarder_sheds_connections_over_limits():
+    import pytest
+    from arpx.proxy import ConnectionLimits
+
+    srv, _held = _start_hold_server()
+    for engine in ("thread", "asyncio"):
+        forward_port = _get_free_port()
+        mgr = TcpForwarderManager(engine=engine, limits=ConnectionLimits(max_connections=3, max_per_ip=2))
+        fwd = mgr.add("127.0.0.1", forward_port, "127.0.0.1", srv.getsockname()[1])
+        time.sleep(0.05)
+        clients = []
+        try:
+            for _ in range(2):
+                clients.append(socket.create_connection(("127.0.0.1", forward_port), timeout=1))
+            time.sleep(0.05)
+            try:
+                third = socket.create_connection(("127.0.0.1", forward_port), timeout=1)
+            except ConnectionResetError:
+                pass  # on loopback the reset can beat connect() returning
+            else:
+                clients.append(third)
+                assert _is_shed(third)
+            with pytest.raises(socket.timeout):
+                clients[0].recv(16)  # admitted connections stay open
+            assert fwd.gate.stats()["active"] == 2
+            assert fwd.gate.stats()["rejected_per_ip"] == 1
+        finally:
+            for c in clients:
+                c.close()
+            mgr.stop_all()
+    srv.close()
+
+
+def test_forwarder_closes_idle_connections():
+    from arpx.proxy import ConnectionLimits
+
+    srv, held = _start_hold_server()
+    for engine in ("thread", "asyncio"):
+        forward_port = _get_free_port()
+        mgr = TcpForwarderManager(engine=engine, limits=ConnectionLimits(idle_timeout=0.3))
+        fwd = mgr.add("127.0.0.1", forward_port, "127.0.0.1", srv.getsockname()[1])
+        time.sleep(0.05)
+        try:
+            with socket.create_connection(("127.0.0.1", forward_port), timeout=3) as c:
+                for _ in range(3):
+                    # traffic in one direction keeps the connection alive past idle_timeout
+                    time.sleep(0.2)
+                    c.sendall(b"x")
+                started = time.monotonic()
+                assert c.recv(16) == b""
+                assert 0.2 < time.monotonic() - started < 2
+            time.sleep(0.05)
+            assert fwd.gate.stats()["idle_closed"] == 1
+            assert fwd.gate.stats()["active"] == 0
+        finally:
+            mgr.stop_all()
+    srv.close()
+    for conn in held:
+        conn.close()
+
+
+def test_forwarder_manager_remove_keeps_other_listeners():
+    backend_port = _get_free_port()
+    kept_port, removed_port = _get_free_port(), _get_free_port()
+    mgr = TcpForwarderManager()
+    mgr.add("127.0.0.1", kept_port, "127.0.0.1", backend_port)
+    mgr.add("127.0.0.1", removed_port, "127.0.0.1", backend_port)
+    time.sleep(0.05)
+    try:
+        assert mgr.remove("127.0.0.1", removed_port)
+        assert not mgr.remove("127.0.0.1", removed_port)
+        assert [f.listen_port for f in mgr.forwarders] == [kept_port]
+        _start_tcp_echo_server("127.0.0.1", backend_port)
+        with socket.create_connection(("127.0.0.1", kept_port), timeout=2) as c:
+            c.sendall(b"still")
+            assert c.recv(1024) == b"echo:still"
+    finally:
+        mgr.stop_all()
@@ -0,0 +1,101 @@
+import http.client
+import json
+import socket
+import ssl
+import time
+
+from arpx import certs as cert_utils
+from arpx.server import LANWebServerManager, LandingPage
+
+
+def _get_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_landing_page_splices_request_fields():
+    page = LandingPage("Hello <1>", "10.0.0.5", 8000)
+    body = page.render_html("192.168.1.20", now=0).decode()
+    assert "<title>Hello &lt;1&gt;</title>" in body
+    assert '<div class="value">10.0.0.5</div>' in body
+    assert '<div class="value">8000</div>' in body
+    assert '<div class="value">192.168.1.20</div>' in body
+    data = json.loads(page.render_json("192.168.1.20", now=0))
+    assert data["content"] == "Hello <1>"
+    assert (data["server_ip"], data["port"], data["client_ip"]) == ("10.0.0.5", 8000, "192.168.1.20")
+    assert set(data) == {"content", "server_ip", "port", "client_ip", "time", "date"}
+
+
+def test_server_keepalive_etag_and_json(monkeypatch):
+    # freeze the clock so the page, and its ETag, stay the same between requests
+    frozen = time.localtime(0)
+    monkeypatch.setattr("arpx.server.time.localtime", lambda secs=None: frozen)
+    port = _get_free_port()
+    mgr = LANWebServerManager()
+    assert mgr.start_lan_server("127.0.0.1", port, "Hello 1") is not None
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+    try:
+        conn.request("GET", "/")
+        resp = conn.getresponse()
+        body = resp.read()
+        assert resp.status == 200
+        assert int(resp.headers["Content-Length"]) == len(body)
+        assert b"Hello 1" in body
+        etag = resp.headers["ETag"]
+        sock = conn.sock
+
+        conn.request("GET", "/?format=json")
+        resp = conn.getresponse()
+        data = json.loads(resp.read())
+        assert resp.headers["Content-Type"] == "application/json"
+        assert data["client_ip"] == "127.0.0.1"
+        assert conn.sock is sock  # same keep-alive connection
+
+        conn.request("GET", "/", headers={"If-None-Match": etag})
+        resp = conn.getresponse()
+        assert resp.status == 304
+        assert resp.read() == b""
+
+        conn.request("GET", "/", headers={"Accept": "application/json", "If-None-Match": etag})
+        resp = conn.getresponse()
+        assert resp.status == 200  # the JSON variant has its own tag
+        json_etag = resp.headers["ETag"]
+        resp.read()
+        conn.request("HEAD", "/?format=json", headers={"If-None-Match": f"W/{json_etag}"})
+        resp = conn.getresponse()
+        assert resp.status == 304
+        resp.read()
+    finally:
+        conn.close()
+        mgr.stop_all()
+
+
+def test_stalled_clients_do_not_block_others(tmp_path):
+    cert, key = cert_utils.generate_self_signed_cert(tmp_path, "localhost", ["localhost", "127.0.0.1"])
+    http_port, https_port = _get_free_port(), _get_free_port()
+    mgr = LANWebServerManager()
+    assert mgr.start_lan_server("127.0.0.1", http_port, "Hello 1") is not None
+    assert mgr.start_lan_server("127.0.0.1", https_port, "Hello 2", cert_utils.build_ssl_context(cert, key)) is not None
+    client_ctx = ssl.create_default_context()
+    client_ctx.check_hostname = False
+    client_ctx.verify_mode = ssl.CERT_NONE
+    # a half-sent request and a TCP connect that never starts its TLS handshake
+    stalled_http = socket.create_connection(("127.0.0.1", http_port))
+    stalled_http.sendall(b"GET / HTTP/1.1\r\nHost: x\r\n")
+    stalled_tls = socket.create_connection(("127.0.0.1", https_port))
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", http_port, timeout=2)
+        conn.request("GET", "/")
+        assert conn.getresponse().status == 200
+        conn.close()
+        conn = http.client.HTTPSConnection("127.0.0.1", https_port, timeout=2, context=client_ctx)
+        conn.request("GET", "/")
+        resp = conn.getresponse()
+        assert resp.status == 200 and b"Hello 2" in resp.read()
+        conn.close()
+        assert [s.requests for s in mgr.servers] == [1, 1]
+    finally:
+        stalled_http.close()
+        stalled_tls.close()
+        mgr.stop_all()
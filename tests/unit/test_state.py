@@ -0,0 +1,161 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+
+from arpx import cli
+from arpx import firewall as fw_mod
+from arpx import network as net_mod
+from arpx import state as state_mod
+from arpx.network import NetworkVisibleManager
+from arpx.state import StateJournal, leftovers, owner_alive, process_start, release, reusable_ips, state_path
+
+
+def test_journal_records_and_forgets(tmp_path):
+    path = state_path("compose", "/srv/app/docker-compose.yml", tmp_path)
+    journal = StateJournal(path)
+    net = NetworkVisibleManager("lo", firewall_backend="none", journal=journal)
+    assert not path.exists()  # nothing created yet, nothing written
+    journal.record_aliases([("10.0.0.10", "web", "24"), ("10.0.0.11", "db", "24")])
+    state = StateJournal.load(path)
+    assert state["pid"] == os.getpid() and state["pid_start"] == process_start(os.getpid())
+    assert state["interface"] == "lo" and state["firewall"] == {"backend": "none", "chain": f"ARPX_{os.getpid()}"}
+    assert reusable_ips(state) == {"web": "10.0.0.10", "db": "10.0.0.11"}
+    journal.forget_aliases(["10.0.0.10", "10.0.0.99"])
+    assert list(StateJournal.load(path)["aliases"]) == ["10.0.0.11"]
+    assert [p.name for p in tmp_path.iterdir()] == [path.name]  # no temporary files left
+    journal.update(nat_table="arpx_1")
+    net.cleanup()
+    assert StateJournal.load(path) is None
+
+
+def test_owner_alive():
+    parent = os.getppid()
+    assert not owner_alive({"pid": os.getpid(), "pid_start": process_start(os.getpid())})
+    assert owner_alive({"pid": parent, "pid_start": process_start(parent)})
+    # same PID, different start time: the PID was reused by another process
+    assert not owner_alive({"pid": parent, "pid_start": process_start(parent) - 1})
+    assert not owner_alive({"pid": parent})
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    assert process_start(proc.pid) is None
+    assert not owner_alive({"pid": proc.pid, "pid_start": 1})
+
+
+def test_release_removes_recorded_resources(monkeypatch):
+    removed, spawned, nat = [], [], []
+    monkeypatch.setattr(state_mod.NetworkVisibleManager, "remove_virtual_ip", lambda self, ip, cidr="24": removed.append((self.interface, ip, cidr)) or ip != "192.168.1.101")
+    monkeypatch.setattr(state_mod.NftablesNat, "cleanup", lambda self: nat.append(self.table) or True)
+
+    def fake_run(args, input=None, **kwargs):
+        spawned.append(args[0])
+        return subprocess.CompletedProcess(args, 0, "*filter\n:ARPX-INPUT - [0:0]\n-A INPUT -j ARPX-INPUT\nCOMMIT\n", "")
+
+    monkeypatch.setattr(fw_mod.subprocess, "run", fake_run)
+    state = {
+        "pid": 1, "interface": "eth0", "net_backend": "shell",
+        "aliases": {"192.168.1.100": {"name": "web", "cidr": "24"}, "192.168.1.101": {"name": "db", "cidr": "24"}},
+        "firewall": {"backend": "iptables", "chain": "ARPX"}, "nat_table": "arpx_4242",
+    }
+    assert release(state) == 1
+    assert removed == [("eth0", "192.168.1.100", "24"), ("eth0", "192.168.1.101", "24")]
+    assert spawned == ["iptables-save", "iptables-restore"]
+    assert nat == ["arpx_4242"]
+    # the alias that could not be removed stays recorded for another attempt
+    assert list(state["aliases"]) == ["192.168.1.101"] and "firewall" not in state and "nat_table" not in state
+    assert leftovers(state)
+
+    # without a recorded chain nothing is torn down: other chains belong to running processes
+    spawned.clear()
+    state = {"pid": 1, "aliases": {}, "firewall": {"backend": "iptables"}}
+    assert release(state) == 0
+    assert spawned == [] and not leftovers(state)
+
+
+def test_failed_nat_cleanup_stays_journaled(tmp_path, monkeypatch):
+    from arpx import nat as nat_mod
+
+    def nft_fails(args, input=None, **kwargs):
+        if "list" in args:
+            rule = {"chain": "services", "handle": 4, "comment": "arpx:arpx_4242"}
+            return subprocess.CompletedProcess(args, 0, json.dumps({"nftables": [{"rule": rule}]}), "")
+        return subprocess.CompletedProcess(args, 1, "", "Operation not permitted")
+
+    monkeypatch.setattr(nat_mod.subprocess, "run", nft_fails)
+    path = tmp_path / "compose.json"
+    state = {"pid": 1, "aliases": {}, "nat_table": "arpx_4242"}
+    release(state)
+    # the DNAT rules are still in the kernel: keep the table for the next attempt
+    assert state["nat_table"] == "arpx_4242" and leftovers(state)
+    StateJournal.save(path, state)
+    assert StateJournal.load(path)["nat_table"] == "arpx_4242"
+
+    monkeypatch.setattr(nat_mod.subprocess, "run", lambda args, input=None, **kw: subprocess.CompletedProcess(args, 0, '{"nftables": []}', ""))
+    release(state)
+    assert "nat_table" not in state and not leftovers(state)
+
+
+def test_failed_removal_stays_journaled(tmp_path, monkeypatch):
+    path = tmp_path / "up.json"
+    journal = StateJournal(path)
+    net = NetworkVisibleManager("lo", firewall_backend="none", journal=journal)
+    monkeypatch.setattr(net, "_add_address", lambda ip, cidr, label: None)
+    monkeypatch.setattr(net, "_enable_forwarding", lambda: None)
+    monkeypatch.setattr(net, "announce_arp_many", lambda ips: None)
+
+    def del_address(ip, cidr):
+        if ip == "10.0.0.11":
+            raise subprocess.CalledProcessError(2, ["ip", "addr", "del"])
+
+    monkeypatch.setattr(net, "_del_address", del_address)
+    monkeypatch.setattr(net_mod.subprocess, "run", lambda *a, **kw: None)  # arp -d
+    assert net.add_virtual_ips([("10.0.0.10", "web"), ("10.0.0.11", "db")], "24")
+    assert not net.remove_virtual_ip("10.0.0.11", "24")
+    assert list(StateJournal.load(path)["aliases"]) == ["10.0.0.10", "10.0.0.11"]
+    net.cleanup()
+    # the alias that is still there keeps the journal alive for `down` and recovery
+    assert list(StateJournal.load(path)["aliases"]) == ["10.0.0.11"]
+
+
+def _journal_of(path, pid, pid_start=None):
+    path.write_text(json.dumps({
+        "pid": pid, "pid_start": pid_start if pid_start is not None else process_start(pid),
+        "interface": "lo", "aliases": {"10.0.0.10": {"name": "web", "cidr": "24"}},
+    }))
+
+
+def test_compose_down(tmp_path, monkeypatch):
+    released = []
+    monkeypatch.setattr(cli.NetworkVisibleManager, "check_root", staticmethod(lambda: None))
+    monkeypatch.setattr(cli, "release", lambda state: released.append(state["pid"]) or len(state.pop("aliases")))
+    compose = tmp_path / "docker-compose.yml"
+    argv = ["compose", "down", "-f", str(compose), "--state-dir", str(tmp_path)]
+    path = state_path("compose", str(compose.resolve()), tmp_path)
+
+    assert cli.main(argv) == 0  # nothing recorded
+    # the owner was killed: its leftovers are removed directly
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    _journal_of(path, dead.pid)
+    assert cli.main(argv) == 0
+    assert released == [dead.pid] and not path.exists()
+
+    # a running owner is stopped first; this one exits without cleaning up
+    owner = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    threading.Thread(target=owner.wait, daemon=True).start()
+    _journal_of(path, owner.pid)
+    assert cli.main(argv) == 0
+    assert owner.returncode is not None
+    assert released == [dead.pid, owner.pid] and not path.exists()
+
+    # the owner died and its PID now belongs to an unrelated process: leave that one alone
+    stranger = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    try:
+        _journal_of(path, stranger.pid, pid_start=process_start(stranger.pid) - 1)
+        assert cli.main(argv) == 0
+        assert stranger.poll() is None
+        assert released[-1] == stranger.pid and not path.exists()
+    finally:
+        stranger.kill()
+        stranger.wait()
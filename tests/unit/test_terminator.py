@@ -0,0 +1,144 @@
+import socket
+import ssl
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from arpx import certs as cert_utils
+from arpx.terminator import TlsSessionCache, TlsTerminatorManager
+
+
+def _get_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_http_backend(host: str, port: int):
+    """Answer every connection with a fixed HTTP response."""
+    srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    srv.bind((host, port))
+    srv.listen(64)
+
+    def handle(conn):
+        with conn:
+            conn.recv(1024)
+            conn.sendall(b"HTTP/1.0 200 OK\r\nContent-Length: 2\r\n\r\nok")
+
+    def serve():
+        while True:
+            try:
+                conn, _ = srv.accept()
+            except OSError:
+                break
+            threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=serve, daemon=True).start()
+    return srv
+
+
+@pytest.fixture
+def server_ctx(tmp_path: Path) -> ssl.SSLContext:
+    cert, key = cert_utils.generate_self_signed_cert(tmp_path, "localhost", ["localhost", "127.0.0.1"])
+    return cert_utils.build_ssl_context(cert, key)
+
+
+def _client_ctx() -> ssl.SSLContext:
+    ctx = ssl.create_default_context()
+    ctx.check_hostname = False
+    ctx.verify_mode = ssl.CERT_NONE
+    return ctx
+
+
+def _https_get(port: int) -> bytes:
+    with socket.create_connection(("127.0.0.1", port), timeout=2) as raw:
+        with _client_ctx().wrap_socket(raw, server_hostname="localhost") as c:
+            c.sendall(b"GET / HTTP/1.0\r\n\r\n")
+            chunks = []
+            while True:
+                data = c.recv(1024)
+                if not data:
+                    break
+                chunks.append(data)
+    return b"".join(chunks)
+
+
+@pytest.mark.parametrize("engine", ["thread", "asyncio"])
+def test_slow_client_does_not_block_others(server_ctx, engine):
+    backend_port = _get_free_port()
+    tls_port = _get_free_port()
+    backend = _start_http_backend("127.0.0.1", backend_port)
+
+    mgr = TlsTerminatorManager(engine=engine)
+    mgr.add("127.0.0.1", tls_port, "127.0.0.1", backend_port, server_ctx)
+    time.sleep(0.1)
+    try:
+        # A client that connects but never starts the handshake
+        stalled = socket.create_connection(("127.0.0.1", tls_port), timeout=2)
+        time.sleep(0.1)
+        start = time.monotonic()
+        assert _https_get(tls_port).endswith(b"ok")
+        assert time.monotonic() - start < 1.5
+        stalled.close()
+    finally:
+        mgr.stop_all()
+        backend.close()
+
+
+def _https_get_session(port: int, client_ctx: ssl.SSLContext, session=None):
+    with socket.create_connection(("127.0.0.1", port), timeout=2) as raw:
+        with client_ctx.wrap_socket(raw, server_hostname="localhost", session=session) as c:
+            c.sendall(b"GET / HTTP/1.0\r\n\r\n")
+            while c.recv(1024):
+                pass
+            return c.session
+
+
+@pytest.mark.parametrize("engine", ["thread", "asyncio"])
+def test_session_resumption_counters(server_ctx, engine):
+    backend_port = _get_free_port()
+    tls_port = _get_free_port()
+    backend = _start_http_backend("127.0.0.1", backend_port)
+
+    mgr = TlsTerminatorManager(engine=engine)
+    term = mgr.add("127.0.0.1", tls_port, "127.0.0.1", backend_port, server_ctx)
+    time.sleep(0.1)
+    try:
+        client_ctx = _client_ctx()
+        session = _https_get_session(tls_port, client_ctx)
+        _https_get_session(tls_port, client_ctx, session=session)
+        time.sleep(0.05)
+        assert term.handshakes_full == 1
+        assert term.handshakes_resumed == 1
+        assert mgr.handshake_stats() == {"full": 1, "resumed": 1}
+    finally:
+        mgr.stop_all()
+        backend.close()
+
+
+def test_session_cache_rotates_context(server_ctx):
+    built = []
+
+    def factory():
+        built.append(object())
+        return server_ctx
+
+    cache = TlsSessionCache(factory, rotate_interval=0.01)
+    assert cache.context is server_ctx
+    time.sleep(0.02)
+    cache.context
+    assert cache.rotations == 1
+    assert len(built) == 2
+
+    fixed = TlsSessionCache.fixed(server_ctx)
+    time.sleep(0.02)
+    assert fixed.context is server_ctx
+    assert fixed.rotations == 0
+
+
+def test_terminator_manager_rejects_unknown_engine():
+    with pytest.raises(ValueError):
+        TlsTerminatorManager(engine="bogus")
@@ -0,0 +1,104 @@
+import functools
+import pickle
+import socket
+import ssl
+import threading
+from pathlib import Path
+
+import pytest
+
+from arpx import certs as cert_utils
+from arpx.proxy import TcpForwarderManager
+from arpx.terminator import TlsSessionCache, TlsTerminatorManager
+from arpx.workers import HAS_REUSEPORT
+
+pytestmark = pytest.mark.skipif(not HAS_REUSEPORT, reason="SO_REUSEPORT not available")
+
+
+def _get_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_backend() -> socket.socket:
+    srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    srv.bind(("127.0.0.1", 0))
+    srv.listen(64)
+
+    def handle(conn):
+        with conn:
+            conn.recv(1024)
+            conn.sendall(b"HTTP/1.0 200 OK\r\nContent-Length: 2\r\n\r\nok")
+
+    def serve():
+        while True:
+            try:
+                conn, _ = srv.accept()
+            except OSError:
+                return
+            threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=serve, daemon=True).start()
+    return srv
+
+
+def _request(sock) -> bytes:
+    sock.sendall(b"GET / HTTP/1.0\r\n\r\n")
+    chunks = []
+    while True:
+        data = sock.recv(1024)
+        if not data:
+            return b"".join(chunks)
+        chunks.append(data)
+
+
+def test_forwarder_workers_share_the_port():
+    backend = _start_backend()
+    port = _get_free_port()
+    mgr = TcpForwarderManager(workers=2)
+    try:
+        assert mgr.add("127.0.0.1", port, "127.0.0.1", backend.getsockname()[1]) is None
+        for _ in range(40):
+            with socket.create_connection(("127.0.0.1", port), timeout=5) as c:
+                assert _request(c).endswith(b"ok")
+        per_worker = mgr.worker_pool.stats()
+        assert len(per_worker) == 2
+        # the kernel hashes connections over both listening sockets
+        assert all(s["accepted"] > 0 for s in per_worker)
+        assert mgr.connection_stats()["accepted"] == 40
+    finally:
+        mgr.stop_all()
+        backend.close()
+    assert not mgr.worker_pool.started
+
+
+def test_terminator_workers(tmp_path: Path):
+    cert, key = cert_utils.generate_self_signed_cert(tmp_path, "localhost", ["localhost", "127.0.0.1"])
+    cache = TlsSessionCache(functools.partial(cert_utils.build_ssl_context, cert, key), rotate_interval=None)
+    backend = _start_backend()
+    port = _get_free_port()
+    mgr = TlsTerminatorManager(workers=2)
+    client_ctx = ssl.create_default_context()
+    client_ctx.check_hostname = False
+    client_ctx.verify_mode = ssl.CERT_NONE
+    try:
+        with pytest.raises(ValueError):
+            mgr.add("127.0.0.1", port, "127.0.0.1", backend.getsockname()[1], cache.context)
+        mgr.add("127.0.0.1", port, "127.0.0.1", backend.getsockname()[1], cache)
+        for _ in range(10):
+            with socket.create_connection(("127.0.0.1", port), timeout=5) as raw:
+                with client_ctx.wrap_socket(raw, server_hostname="localhost") as c:
+                    assert _request(c).endswith(b"ok")
+        assert mgr.handshake_stats()["full"] + mgr.handshake_stats()["resumed"] == 10
+    finally:
+        mgr.stop_all()
+        backend.close()
+
+
+def test_session_cache_pickles_as_factory(tmp_path: Path):
+    cert, key = cert_utils.generate_self_signed_cert(tmp_path, "localhost", ["localhost"])
+    cache = TlsSessionCache(functools.partial(cert_utils.build_ssl_context, cert, key), rotate_interval=60)
+    copy = pickle.loads(pickle.dumps(cache))
+    assert copy.rotate_interval == 60
+    assert isinstance(copy.context, ssl.SSLContext) and copy.context is not cache.context